@@ -20,7 +20,7 @@ from pysgpp.extensions.datadriven.controller.InfoToFile import InfoToFile
 try:
     from pysgpp.extensions.datadriven.controller.InfoToGraph import InfoToGraph
 except ImportError: pass
-import gzip, copy
+import gzip, copy, glob, os
 
 
 ##
@@ -240,6 +240,31 @@ class CheckpointController(LearnerEventController):
         LearnerFormatter().serializeToFile(learnerMemento, learnerFilename)
 
 
+    ## Loads the memento of the Learner object from the checkpoint with given iteration
+    #@param iteration integer iteration number
+    #@return json object with the attributes of the Learner object
+    def loadLearnerMemento(self, iteration):
+        learnerFilename = self.composeName(iteration) + ".learner.gz"
+        return LearnerFormatter().deserializeFromFile(learnerFilename)
+
+
+    ## Determines the number of the last iteration with a complete checkpoint
+    #@param fold: the folding level, if n-fold cross-validation is used
+    #@return integer iteration number or None if no checkpoint exists
+    def getLastIteration(self, fold = None):
+        prefix = self.composeName(fold=fold) + "."
+        iterations = []
+        for learnerFilename in glob.glob(prefix + "*.learner.gz"):
+            iteration = learnerFilename[len(prefix):-len(".learner.gz")]
+            if not iteration.isdigit(): continue
+            iteration = int(iteration)
+            # a checkpoint is complete only if all of its files exist
+            if os.path.exists(self.composeName(iteration, fold) + ".grid.gz") and \
+                    os.path.exists(self.composeName(iteration, fold) + ".arff.gz"):
+                iterations.append(iteration)
+        return max(iterations) if len(iterations) > 0 else None
+
+
     def __getCOperatorType(self, iteration):
         # read data from file
         learnerFilename = self.composeName(iteration) + ".learner.gz"
@@ -11,6 +11,11 @@ from DataSpecification import DataSpecification
 
 import re
 import gzip
+import json
+import os
+
+import numpy as np
+
 from DataAdapter import DataAdapter
 from pysgpp import DataVector, DataMatrix
 
@@ -24,12 +29,21 @@ class ARFFAdapter(DataAdapter):
     ## Filename associated with data
     filename = None
 
+    ## Whether a binary cache file of the data should be used
+    useCache = None
+
+    ## Default number of data lines parsed at once
+    CHUNK_SIZE = 100000
+
 
     ## Constructor
     #
     # @param filename: Filename as String
-    def __init__(self, filename=""):
+    # @param useCache: if True, the parsed data is stored in a binary cache file
+    # next to the ARFF file, which is reused as long as the ARFF file is unchanged, default False
+    def __init__(self, filename="", useCache=False):
         self.filename = filename
+        self.useCache = useCache
     
     
     ## Store data into file
@@ -41,8 +55,6 @@ class ARFFAdapter(DataAdapter):
 
         fout = self.__gzOpen(self.filename, "w")
         dim = points.getNcols()
-        size = points.getNrows()
-        point = DataVector(dim)
         
         fout.write("@RELATION \"%s\"\n\n" % self.filename)
         
@@ -62,16 +74,12 @@ class ARFFAdapter(DataAdapter):
             
         fout.write("\n@DATA\n")
             
-
-        for row in xrange(size):
-            points.getRow(row, point)
-            lout = []
-            for col in xrange(dim):
-                lout.append(point[col])
-            if hasclass:
-                lout.append(values[row])
-            string = ",".join(str(i) for i in lout)
-            fout.write(string+"\n")
+        data = points.array().reshape(-1, dim)
+        if hasclass:
+            data = np.column_stack((data, np.asarray(values.array() if isinstance(values, DataVector) else values)))
+        # same number format as str() of floats
+        if data.shape[0] > 0:
+            np.savetxt(fout, data, fmt="%.12g", delimiter=",")
 
         fout.close()
 
@@ -81,9 +89,77 @@ class ARFFAdapter(DataAdapter):
     # @param name: String for category of data set (train or test), default "train"
     # @return DataContainer with data set
     def loadData(self, name = "train"):
+        points, values = self.loadArrays()
+        return DataContainer(points=np.ascontiguousarray(points, dtype=float),
+                             values=np.ascontiguousarray(values, dtype=float),
+                             name=name, filename=self.filename)
+
+
+    ## Reads dataset from file into numpy arrays
+    # If the binary cache is used and valid, the arrays are memory-mapped.
+    #
+    # @return tuple (numpy array points, numpy array values), values are zero if the file has no class attribute
+    def loadArrays(self):
+        if self.useCache:
+            cachedData = self.__loadCache()
+            if cachedData != None:
+                return cachedData
+
+        chunks = list(self.loadChunks())
+        if len(chunks) == 0:
+            points = np.zeros((0, self.__readHeaderOnly()[0]))
+            values = np.zeros((0,))
+        else:
+            points = np.vstack([chunk[0] for chunk in chunks])
+            values = np.concatenate([chunk[1] for chunk in chunks])
+        del chunks
+
+        if self.useCache:
+            self.__saveCache(points, values)
+        return points, values
+
+
+    ## Reads dataset from file chunk by chunk, such that files larger than
+    # the main memory can be processed
+    #
+    # @param chunkSize: maximal number of data points per chunk, default CHUNK_SIZE
+    # @return generator of tuples (numpy array points, numpy array values)
+    def loadChunks(self, chunkSize = None):
+        if chunkSize == None:
+            chunkSize = self.CHUNK_SIZE
         fin = self.__gzOpen(self.filename, "r")
-        data = []
-        classes = []
+        try:
+            # the header is read from the same numbered lines, such that the
+            # line numbers of the data lines are known for error messages
+            numberedLines = enumerate(fin, 1)
+            dim, hasclass = self.__readHeader(line for _, line in numberedLines)
+            numberOfColumns = dim + (1 if hasclass else 0)
+            lines, lineNumbers = [], []
+            for lineNumber, line in numberedLines:
+                sline = line.strip()
+                if sline.startswith("%") or len(sline) == 0:
+                    continue
+                lines.append(sline)
+                lineNumbers.append(lineNumber)
+                if len(lines) >= chunkSize:
+                    yield self.__splitColumns(self.parseLines(lines, lineNumbers=lineNumbers,
+                                                              numberOfColumns=numberOfColumns),
+                                              dim, hasclass)
+                    lines, lineNumbers = [], []
+            if len(lines) > 0:
+                yield self.__splitColumns(self.parseLines(lines, lineNumbers=lineNumbers,
+                                                          numberOfColumns=numberOfColumns),
+                                          dim, hasclass)
+        finally:
+            fin.close()
+
+
+    ## Reads the header of the ARFF file until the data section
+    #
+    # @param fin: file descriptor
+    # @return tuple (number of attributes without class, True if there is a class attribute)
+    def __readHeader(self, fin):
+        dim = 0
         hasclass = False
     
         # get the different section of ARFF-File
@@ -100,36 +176,74 @@ class ARFFAdapter(DataAdapter):
                 if value[1].startswith("class"):
                     hasclass = True
                 else:
-                    data.append([])
-        
-        #read in the data stored in the ARFF file
-        for line in fin:
-            sline = line.strip()
-            if sline.startswith("%") or len(sline) == 0:
-                continue
-    
-            values = sline.split(",")
-            if hasclass:
-                classes.append(float(values[-1]))
-                values = values[:-1]
-            for i in xrange(len(values)):
-                data[i].append(float(values[i]))
-                
-        # cleaning up and return
-        fin.close()
-        
-        dim = len(data)
-        size = len(data[0])
-        dataMatrix = DataMatrix(size, dim)
-        tempVector = DataVector(dim)
-        valuesVector = DataVector(size)
-        for rowIndex in xrange(size):
-            for colIndex in xrange(dim):
-                tempVector[colIndex] = data[colIndex][rowIndex]
-            dataMatrix.setRow(rowIndex, tempVector)
-            valuesVector[rowIndex] = classes[rowIndex]
-            
-        return DataContainer(points=dataMatrix, values=valuesVector, name=name, filename=self.filename)
+                    dim += 1
+
+        return dim, hasclass
+
+
+    def __readHeaderOnly(self):
+        fin = self.__gzOpen(self.filename, "r")
+        try:
+            return self.__readHeader(fin)
+        finally:
+            fin.close()
+
+
+    def __splitColumns(self, data, dim, hasclass):
+        if data.shape[1] != dim + (1 if hasclass else 0):
+            raise ValueError("Number of values in data line does not match the number of attributes")
+        if hasclass:
+            return data[:, :dim], data[:, dim]
+        else:
+            return data, np.zeros((data.shape[0],))
+
+
+    ## Returns the names of the binary cache file and its meta data file
+    #
+    # @return tuple of file names
+    def getCacheFilenames(self):
+        return self.filename + ".cache.npy", self.filename + ".cache.json"
+
+
+    def __loadCache(self):
+        cacheFilename, metaFilename = self.getCacheFilenames()
+        try:
+            fin = open(metaFilename, "r")
+            try:
+                meta = json.load(fin)
+            finally:
+                fin.close()
+            stat = os.stat(self.filename)
+            if meta["size"] != stat.st_size or meta["mtime"] != stat.st_mtime:
+                return None
+            data = np.load(cacheFilename, mmap_mode="r")
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+        return data[:, :-1], data[:, -1]
+
+
+    def __saveCache(self, points, values):
+        cacheFilename, metaFilename = self.getCacheFilenames()
+        try:
+            stat = os.stat(self.filename)
+            # the meta data file is written last, such that incomplete cache
+            # files are never used
+            if os.path.exists(metaFilename):
+                os.remove(metaFilename)
+            data = np.lib.format.open_memmap(cacheFilename, mode="w+", dtype=float,
+                                             shape=(points.shape[0], points.shape[1] + 1))
+            data[:, :-1] = points
+            data[:, -1] = values
+            data.flush()
+            del data
+            fout = open(metaFilename, "w")
+            try:
+                json.dump({"size" : stat.st_size, "mtime" : stat.st_mtime}, fout)
+            finally:
+                fout.close()
+        except (IOError, OSError):
+            # e.g. the directory is not writable, the data is not cached then
+            pass
 
 
     ## Loads attribute specification from file
@@ -12,6 +12,8 @@ from DataSpecification import DataSpecification
 import re
 import gzip
 import csv
+
+import numpy as np
 from DataAdapter import DataAdapter
 from pysgpp import DataVector, DataMatrix
 
@@ -86,66 +88,66 @@ class CSVAdapter(DataAdapter):
     # @param target_col optional number of target column. Default: -1
     # @return DataContainer with data set
     def loadData(self, name = "train", delimiter=',', target_col=-1):
+        points, values = self.loadArrays(delimiter, target_col)
+        return DataContainer(points=points, values=values, name=name, filename=self.filename)
+
+
+    ## Reads dataset from file into numpy arrays
+    #
+    # @param delimiter optional delimiter character. Default: ','
+    # @param target_col optional number of target column. Default: -1
+    # @return tuple (numpy array points, numpy array values)
+    def loadArrays(self, delimiter=',', target_col=-1):
+        chunks = list(self.loadChunks(delimiter=delimiter, target_col=target_col))
+        if len(chunks) == 0:
+            raise Exception('File does not contain any data.')
+        points = np.vstack([chunk[0] for chunk in chunks])
+        values = np.concatenate([chunk[1] for chunk in chunks])
+        return points, values
+
+
+    ## Reads dataset from file chunk by chunk, such that files larger than
+    # the main memory can be processed
+    #
+    # @param chunkSize: maximal number of data points per chunk, default 100000
+    # @param delimiter optional delimiter character. Default: ','
+    # @param target_col optional number of target column. Default: -1
+    # @return generator of tuples (numpy array points, numpy array values)
+    def loadChunks(self, chunkSize=100000, delimiter=',', target_col=-1):
         fin = self.__gzOpen(self.filename, "r")
-        reader = csv.reader(fin, delimiter = delimiter)
-        data = []
-        classes = []
-        hasclass = False
-        target_col = -1
-        
-        first_line = reader.next()
-        
-        # training set has to contain targets
-        if name == 'train':
-            if len(first_line) <= target_col: 
-                raise Exception('Target column does not match total column number.')
-            for i in xrange(len(first_line)-1):
-                data.append([])
-            hasclass = True
-        
-        # test set may contain target values
-        if name == 'test':
-            if len(first_line) > target_col: 
-                for i in xrange(len(first_line)-1):  data.append([])
-                hasclass = True
-            else:
-                for i in xrange(len(first_line)):  data.append([])
-                hasclass = False
-        
-        
-        # skip header if available
-        if first_line[0].isalpha():
-            pass
-        else:
-            line = first_line
-            if hasclass:
-                classes.append(float(line[target_col]))
-                line.remove(line[target_col])
-            for i in xrange(len(line)):
-                data[i].append(float(line[i]))
-        
-        for line in reader:
-            if hasclass:
-                classes.append(float(line[target_col]))
-                line.remove(line[target_col])
-            for i in xrange(len(line)):
-                data[i].append(float(line[i]))
-                
-        # cleaning up and return
-        fin.close()
-        
-        dim = len(data)
-        size = len(data[0])
-        dataMatrix = DataMatrix(size, dim)
-        tempVector = DataVector(dim)
-        valuesVector = DataVector(size)
-        for rowIndex in xrange(size):
-            for colIndex in xrange(dim):
-                tempVector[colIndex] = data[colIndex][rowIndex]
-            dataMatrix.setRow(rowIndex, tempVector)
-            valuesVector[rowIndex] = classes[rowIndex]
-            
-        return DataContainer(dataMatrix, valuesVector, name, self.filename)
+        try:
+            lines, lineNumbers = [], []
+            numberOfColumns = None
+            isFirstLine = True
+            for lineNumber, line in enumerate(fin, 1):
+                sline = line.strip()
+                if len(sline) == 0:
+                    continue
+                # skip header if available
+                if isFirstLine:
+                    isFirstLine = False
+                    if sline.split(delimiter)[0].isalpha():
+                        continue
+                # all chunks must have the number of columns of the first line
+                if numberOfColumns == None:
+                    numberOfColumns = sline.count(delimiter) + 1
+                lines.append(sline)
+                lineNumbers.append(lineNumber)
+                if len(lines) >= chunkSize:
+                    yield self.__splitTargetColumn(self.parseLines(lines, delimiter, lineNumbers,
+                                                                   numberOfColumns), target_col)
+                    lines, lineNumbers = [], []
+            if len(lines) > 0:
+                yield self.__splitTargetColumn(self.parseLines(lines, delimiter, lineNumbers,
+                                                               numberOfColumns), target_col)
+        finally:
+            fin.close()
+
+
+    def __splitTargetColumn(self, data, target_col):
+        if data.shape[1] <= target_col or data.shape[1] < -target_col:
+            raise Exception('Target column does not match total column number.')
+        return np.delete(data, target_col, axis=1), data[:, target_col]
 
 
     ## Loads attribute specification from file
@@ -3,10 +3,43 @@
 # use, please see the copyright notice provided with SG++ or at 
 # sgpp.sparsegrids.org
 
+import numpy as np
+
+
 ## Abstract class defines the interface for storing and loading of input data.
 class DataAdapter(object):
 
 
+    ## Parses a block of lines with numeric data at once
+    #
+    # @param lines: list of stripped strings with delimiter separated numbers, one data point per line
+    # @param delimiter: delimiter character, default: ','
+    # @param lineNumbers: list of the line numbers of the lines in the file for error messages, default: 1, 2, ...
+    # @param numberOfColumns: expected number of values per line, default: number of values of the first line
+    # @return numpy array with one row per line
+    def parseLines(self, lines, delimiter=",", lineNumbers=None, numberOfColumns=None):
+        if lineNumbers == None:
+            lineNumbers = xrange(1, len(lines) + 1)
+        if len(lines) == 0:
+            return np.zeros((0, 0 if numberOfColumns == None else numberOfColumns))
+        if numberOfColumns == None:
+            numberOfColumns = lines[0].count(delimiter) + 1
+
+        # check every line, as ragged lines could be reshaped to a wrong matrix
+        for line, lineNumber in zip(lines, lineNumbers):
+            if line.count(delimiter) + 1 != numberOfColumns:
+                raise ValueError("Data line %d contains %d values instead of %d" %
+                                 (lineNumber, line.count(delimiter) + 1, numberOfColumns))
+
+        data = np.fromstring(delimiter.join(lines), sep=delimiter)
+        if data.size != len(lines) * numberOfColumns:
+            for line, lineNumber in zip(lines, lineNumbers):
+                if np.fromstring(line, sep=delimiter).size != numberOfColumns:
+                    raise ValueError("Data line %d contains non-numeric values" % lineNumber)
+            raise ValueError("Data lines must contain %d numeric values each" % numberOfColumns)
+        return data.reshape(len(lines), numberOfColumns)
+
+
     ## Store data into file
     # as it is an abstract class, this function is not implemented!
     # 
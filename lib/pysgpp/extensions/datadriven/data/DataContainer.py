@@ -113,19 +113,9 @@ class DataContainer(object):
     # @param name: String for category name of data set, default: "train"
     # @return: DataContainer with entries from the given list
     def getDataSubsetByIndexList(self, indices, name="train"):
-        size = len(indices)
-        subset_points = DataMatrix(size, self.dim)
-        subset_values = DataVector(size)
-        row = DataVector(self.dim)
-        points = self.getPoints()
-        values = self.getValues()
-
-        i = 0
-        for index in indices:
-            points.getRow(index, row)
-            subset_points.setRow(i, row)
-            subset_values[i] = values[index]
-            i = i + 1
+        indices = np.asarray(indices, dtype=int)
+        subset_points = self.getPoints().array()[indices, :]
+        subset_values = self.getValues().array()[indices]
         return DataContainer(points=subset_points, values=subset_values, name=name)
 
     # Creates DataContainer only with train data set
@@ -157,6 +147,7 @@ class DataContainer(object):
     # param name: category name, default: "train"
     # param points: DataVector with points
     # param values: DataVector with values
+    # param dataDict: dictionary {(x_1, x_2, ..., x_d): value} of points and values, default: computed from points and values
     def __init__(self, **kwargs):
         self.points = {}
         self.values = {}
@@ -199,13 +190,12 @@ class DataContainer(object):
                         self.values[self.name] = DataVector(kwargs['values'])
 
                     # creating dictionary for fast search point -> value
-                    self.dataDict[self.name] = {}
-
-                    p = DataVector(self.points[self.name].getNcols())
-                    for i in xrange(self.points[self.name].getNrows()):
-                        self.points[self.name].getRow(i, p)
-                        key = tuple(p.array())
-                        self.dataDict[self.name][key] = self.values[self.name][i]
+                    if kwargs.get('dataDict', None) is not None:
+                        self.dataDict[self.name] = kwargs['dataDict']
+                    else:
+                        self.dataDict[self.name] = dict(zip(
+                            map(tuple, self.points[self.name].array().tolist()),
+                            self.values[self.name].array().tolist()))
 
                     self.size = self.points[self.name].getNrows()
                     self.dim = self.points[self.name].getNcols()
@@ -232,7 +222,9 @@ class DataContainer(object):
     # @param container: DataContainer that has to be combined with the called one
     # @return: new DataContainer with several data sets
     def combine(self, container):
-        newContainer = DataContainer(points=self.getPoints(), values=self.getValues(), name=self.name)
+        dataDict = self.dataDict.get(self.name, None)
+        newContainer = DataContainer(points=self.getPoints(), values=self.getValues(), name=self.name,
+                                     dataDict=dict(dataDict) if dataDict is not None else None)
         for k in self.points.keys():
             if k != self.name:
                 newContainer = newContainer.__setSubContainer(self.points[k], self.values[k], self.dataDict[k], self.specifications[k], k)
@@ -254,26 +246,9 @@ class DataContainer(object):
         if len(containerList) == 0:
             return None
 
-        # determine the total number of entries
-        size = 0
-        for container in containerList:
-            size += len(container.getValues())
-
-        dim = container.getPoints().getNcols()
-
-        # Copy data to the new DataVector's entry by entry
-        allPoints = DataMatrix(size, dim)
-        allValues = DataVector(size)
-        tmpVector = DataVector(dim)
-        i = 0
-        for container in containerList:
-            points = container.getPoints()
-            values = container.getValues()
-            for j in xrange(len(values)):
-                points.getRow(j, tmpVector)
-                allPoints.setRow(i, tmpVector)
-                allValues[i] = values[j]
-                i += 1
+        # Copy data to the new DataVector's at once
+        allPoints = np.vstack([container.getPoints().array() for container in containerList])
+        allValues = np.concatenate([container.getValues().array() for container in containerList])
 
         # return new DataContainer
         return DataContainer(points=allPoints, values=allValues)
@@ -0,0 +1,185 @@
+# Copyright (C) 2008-today The SG++ project
+# This file is part of the SG++ project. For conditions of distribution and
+# use, please see the copyright notice provided with SG++ or at
+# sgpp.sparsegrids.org
+
+from multiprocessing import Pool, cpu_count
+
+from pysgpp import DataVector, Grid
+
+
+## Learner whose folds are trained by the worker processes.
+# The variable is set before the workers are forked, such that every worker
+# owns a copy of the learner, its grid and the data sets of the folds.
+_learner = None
+
+
+## Trains one fold in a worker process
+#
+# @param fold: integer number of the fold
+# @return: dictionary with the results of the fold
+def _learnFold(fold):
+    return FoldScheduler(_learner).learnFold(fold)
+
+
+## The class trains the folds of the folding policy of a Learner
+# concurrently in a pool of worker processes or serially in the calling process.
+#
+# Every fold is trained by a fresh worker process with its own copy of the
+# initial grid of the learner. In the serial case, the initial state of the
+# learner is restored before every fold, such that the folds are trained
+# equally in both cases. After all folds are complete, the accuracy
+# values of the folds are appended in the order of the folds to the lists
+# of the learner (e.g. @link Learner.Learner.trainAccuracy trainAccuracy@endlink
+# and @link Learner.Learner.testAccuracy testAccuracy@endlink).
+#
+# If a @link python.controller.CheckpointController.CheckpointController
+# CheckpointController@endlink is attached to the learner, every fold
+# saves its checkpoints with its own fold number. When the learning is
+# restarted after a crash, the folds resume independently from their last
+# checkpoints.
+class FoldScheduler(object):
+
+    ##Learner object whose folds are trained
+    learner = None
+
+    ##Number of worker processes
+    numberOfProcesses = None
+
+    ##Names of the attributes of Learner with the per-iteration statistics
+    __STATISTICS_ATTRIBUTES = ['trainAccuracy', 'testAccuracy',
+                               'trainingOverall', 'testingOverall',
+                               'numberPoints']
+
+
+    ## Constructor
+    #
+    # @param learner: Learner object with folding policy
+    # @param numberOfProcesses: integer number of worker processes, default value None (number of CPUs), 1 for serial learning in the calling process
+    def __init__(self, learner, numberOfProcesses = None):
+        self.learner = learner
+        self.numberOfProcesses = numberOfProcesses if numberOfProcesses != None else cpu_count()
+
+
+    ## Learn all folds of the folding policy concurrently
+    #
+    # @return: list of DataVector alpha in different folds
+    def learnFolds(self):
+        global _learner
+        numberOfFolds = len(self.learner.foldingPolicy)
+        if numberOfFolds == 0: return []
+
+        if self.numberOfProcesses == 1:
+            results = self.learnFoldsSerially(numberOfFolds)
+        else:
+            _learner = self.learner
+            # every fold gets a new worker, since the learner is altered by
+            # learning a fold
+            pool = Pool(min(self.numberOfProcesses, numberOfFolds),
+                        maxtasksperchild=1)
+            try:
+                results = pool.map(_learnFold, range(numberOfFolds), chunksize=1)
+            finally:
+                pool.close()
+                pool.join()
+                _learner = None
+
+        alphas = []
+        for result in results:
+            for attrName in self.__STATISTICS_ATTRIBUTES:
+                getattr(self.learner, attrName).extend(result[attrName])
+            self.learner.iteration += result['iterations']
+            alphas.append(DataVector(result['alpha']))
+
+        # the learner holds the grid and the knowledge of the last fold
+        self.learner.setGrid(Grid.setMemento(results[-1]['grid']))
+        self.learner.alpha = alphas[-1]
+        self.learner.knowledge.update(self.learner.alpha)
+        return alphas
+
+
+    ## Learn the folds one after another in the calling process
+    #
+    # @param numberOfFolds: integer number of folds
+    # @return: list of dictionaries with the results of the folds
+    def learnFoldsSerially(self, numberOfFolds):
+        learner = self.learner
+        grid = learner.grid.createMemento()
+        alpha = learner.alpha
+        iteration = learner.iteration
+        statistics = dict([(attrName, getattr(learner, attrName))
+                           for attrName in self.__STATISTICS_ATTRIBUTES])
+
+        results = []
+        try:
+            for fold in xrange(numberOfFolds):
+                # start from the initial state as in a fresh worker process
+                learner.setGrid(Grid.setMemento(grid))
+                learner.alpha = DataVector(alpha) if alpha != None else None
+                learner.iteration = iteration
+                results.append(self.learnFold(fold))
+        finally:
+            learner.iteration = iteration
+            for attrName, values in statistics.items():
+                setattr(learner, attrName, values)
+        return results
+
+
+    ## Learn one fold, is called in the worker process (or by learnFoldsSerially)
+    #
+    # @param fold: integer number of the fold
+    # @return: dictionary with the grid, the alpha vector and the statistics of the fold
+    def learnFold(self, fold):
+        learner = self.learner
+        dataset = learner.foldingPolicy.getFold(fold)
+        startIteration = learner.iteration
+        for attrName in self.__STATISTICS_ATTRIBUTES:
+            setattr(learner, attrName, [])
+
+        resumed = False
+        for controller in self.getCheckpointControllers():
+            controller.fold = fold
+            if not resumed: resumed = self.restoreFold(controller)
+
+        # the stored checkpoint is the state before the refinement
+        if not (resumed and learner.stopPolicy.isTrainingComplete(learner)):
+            if resumed: learner.refineGrid()
+            learner.learnDataWithTest(dataset)
+
+        result = {'fold' : fold,
+                  'grid' : learner.grid.createMemento(),
+                  'alpha' : learner.alpha.array(),
+                  'iterations' : learner.iteration - startIteration}
+        for attrName in self.__STATISTICS_ATTRIBUTES:
+            result[attrName] = list(getattr(learner, attrName))
+        return result
+
+
+    ## Restore the state of the learner from the last checkpoint of the fold
+    #
+    # @param controller: CheckpointController object with set fold number
+    # @return: True if a checkpoint was found, otherwise False
+    def restoreFold(self, controller):
+        iteration = controller.getLastIteration()
+        if iteration == None: return False
+
+        learner = self.learner
+        learner.setGrid(controller.loadGrid(iteration))
+        learner.setLearnedKnowledge(controller.loadLearnedKnowledge(iteration))
+        learner.alpha = learner.knowledge.getAlphas()
+        learnerMemento = controller.loadLearnerMemento(iteration)
+        for attrName in self.__STATISTICS_ATTRIBUTES:
+            setattr(learner, attrName, list(learnerMemento.get(attrName, [])))
+        learner.iteration = iteration + 1
+        for controller in self.getCheckpointControllers():
+            controller.setLearner(learner)
+        return True
+
+
+    ## Returns the checkpoint controllers attached to the learner
+    #
+    # @return: list of CheckpointController objects
+    def getCheckpointControllers(self):
+        from pysgpp.extensions.datadriven.controller.CheckpointController import CheckpointController
+        return [controller for controller in self.learner.eventControllers
+                if isinstance(controller, CheckpointController)]
@@ -7,11 +7,13 @@
 from pysgpp import *
 from solver.CGSolver import CGSolver
 from folding.FoldingPolicy import FoldingPolicy
+from FoldScheduler import FoldScheduler
 import pysgpp.extensions.datadriven.utils.json as json
 from TrainingStopPolicy import TrainingStopPolicy
 from TrainingSpecification import TrainingSpecification
 from pysgpp.extensions.datadriven.data.DataContainer import DataContainer
 import types
+import numpy as np
 
 
 ## The class implements the routines common for classifier and regressor.
@@ -157,27 +159,50 @@ class Learner(object):
 
     ## Calculate the value of the function for given points
     #
-    # @param points: DataVector set of points
+    # @param points: DataMatrix or numpy array of points
+    # @param chunkSize: maximal number of points evaluated at once, default value None (all points at once)
     # @return: DataVector values
-    def applyData(self, points):
+    def applyData(self, points, chunkSize = None):
         self.notifyEventControllers(LearnerEvents.APPLICATION_STARTED)
-        # if learner is restored from checkpoint, you need to create new B Operator
-
-        if self.specification.getBOperator() == None:
-            # FIXME: createOperationB() does not exist
-            self.specification.setBOperator(self.grid.createOperationB())
-        size = points.getNrows()
-        dim = points.getNcols()
-        values = DataVector(size)
-        row = DataVector(dim)
-        opEval = createOperationEval(self.grid)
-        for i in xrange(size):
-            points.getRow(i, row)
-            values[i] = opEval.eval(self.knowledge.getAlphas(), row)
+        values = DataVector(self.predict(points, chunkSize))
         self.notifyEventControllers(LearnerEvents.APPLICATION_COMPLETE)
         return values
 
 
+    ## Calculate the value of the function for given points as numpy array
+    # The points are evaluated with one multiple evaluation operator per
+    # chunk of points, such that the memory stays bounded for large data sets.
+    #
+    # @param points: numpy array (one point per row) or DataMatrix of points
+    # @param chunkSize: maximal number of points evaluated at once, default value None (all points at once)
+    # @return: numpy array of values
+    def predict(self, points, chunkSize = None):
+        alpha = self.knowledge.getAlphas()
+
+        # evaluate DataMatrix objects without copying if no chunking is needed
+        if isinstance(points, DataMatrix):
+            if chunkSize == None or chunkSize <= 0 or chunkSize >= points.getNrows():
+                values = DataVector(points.getNrows())
+                createOperationMultipleEval(self.grid, points).mult(alpha, values)
+                return values.array()
+            points = points.array()
+
+        points = np.asarray(points, dtype=float)
+        if points.ndim == 1: points = points.reshape(1, -1)
+
+        size = points.shape[0]
+        if chunkSize == None or chunkSize <= 0: chunkSize = max(size, 1)
+        values = np.empty(size)
+
+        for start in xrange(0, size, chunkSize):
+            chunk = DataMatrix(np.ascontiguousarray(points[start:start + chunkSize]))
+            result = DataVector(chunk.getNrows())
+            createOperationMultipleEval(self.grid, chunk).mult(alpha, result)
+            values[start:start + chunkSize] = result.array()
+
+        return values
+
+
     ## Simple data learning
     #
     # @return: DataVector of alpha
@@ -206,16 +231,19 @@ class Learner(object):
 
     ## Learn data with cross-fold validation
     #
+    # Every fold is trained from the initial grid of the learner, both in
+    # serial and in concurrent learning. Afterwards, the learner holds the
+    # grid and the knowledge of the last fold.
+    #
+    # @param numberOfProcesses: integer number of processes learning the folds concurrently, default value 1 (serial learning), None for the number of CPUs
     # @return: list of DataVector alpha in different folds
-    def learnDataWithFolding(self,):
+    def learnDataWithFolding(self, numberOfProcesses = 1):
         self.notifyEventControllers(LearnerEvents.LEARNING_WITH_FOLDING_STARTED)
 
         self.specification.setBOperator(createOperationMultipleEval(self.grid,
                   self.dataContainer.getPoints(DataContainer.TRAIN_CATEGORY)))
 
-        alphas = []
-        for dataset in self.foldingPolicy:
-            alphas.append(self.learnDataWithTest(dataset))
+        alphas = FoldScheduler(self, numberOfProcesses).learnFolds()
 
         self.notifyEventControllers(LearnerEvents.LEARNING_WITH_FOLDING_COMPLETE)
         return alphas
@@ -8,6 +8,7 @@
 #############################################################################
 
 import solver
+from FoldScheduler import FoldScheduler
 from LearnedKnowledge import LearnedKnowledge
 from Learner import Learner, LearnerEvents
 from LearnerBuilder import LearnerBuilder
@@ -21,6 +22,7 @@ from Classifier import Classifier
 __all__ = ['folding'
            'formatter',
            'solver','Classifier',
+    'FoldScheduler',
     'LearnedKnowledge',
     'Learner',
     'LearnerBuilder',
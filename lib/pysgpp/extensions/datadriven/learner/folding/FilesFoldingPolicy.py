@@ -11,6 +11,8 @@ from FoldingPolicy import FoldingPolicy
 from pysgpp.extensions.datadriven.data.DataContainer import DataContainer
 import math
 
+import numpy as np
+
 ## Provides functionality for accomplishment of learning with cross-validation
 # by generating a set of training data/validation data pairs from the set of files
 # This class corresponds to the old doFoldf() method.
@@ -23,25 +25,30 @@ class FilesFoldingPolicy(FoldingPolicy):
     #@param level: Integer folding level, default value: 1. This parameter is used for compatibility only. The folding level will be set to the number of files.
     def __init__(self, dataContainer, level=1):
         FoldingPolicy.__init__(self,  dataContainer, level)
-        datasets = []
+        points = []
+        values = []
         fileCounter = 0
         # It is expected, that several files are stored in the data container
         # with category name "train0", "train1" etc. If the category name "trainN"
-        # doesn't exist and getDataSubsetByCategory() raises an Exception, it
-        # means, we've gathered all data sets.
-        while True:
-            try:
-                datasets.append(dataContainer.getDataSubsetByCategory(DataContainer.TRAIN_CATEGORY + str(fileCounter)))
-                fileCounter += 1
-            except:
-                break
+        # doesn't exist, it means, we've gathered all data sets.
+        while DataContainer.TRAIN_CATEGORY + str(fileCounter) in dataContainer.points:
+            category = DataContainer.TRAIN_CATEGORY + str(fileCounter)
+            points.append(dataContainer.getPoints(category).array())
+            values.append(dataContainer.getValues(category).array())
+            fileCounter += 1
 
         # as in the old doFoldf() method the folding level is determined by the
         # number of files:
         self.level = fileCounter
 
+        # all files are stored in one array, the folds are index ranges
+        if self.level > 0:
+            self.points = np.vstack(points)
+            self.values = np.concatenate(values)
+            self.size = self.points.shape[0]
+        self.seq = np.arange(self.size)
+        offsets = np.cumsum([0] + [len(x) for x in values])
+
         for step in xrange(self.level):
-            self.dataFold.append(
-                                 # merge all data containers except the one with number =step
-                                 DataContainer.merge(datasets[:step] + datasets[step+1:])
-                                 )
+            # train with all files except the one with number =step
+            self.addFold(np.arange(offsets[step], offsets[step+1]))
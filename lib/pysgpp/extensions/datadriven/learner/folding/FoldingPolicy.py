@@ -5,9 +5,17 @@
 
 import math
 
+import numpy as np
+
+from pysgpp.extensions.datadriven.data.DataContainer import DataContainer
+
 
 ## Abstract class for providing functionality for accomplishment of learning with cross-validation
 # by generating a set of training data/validation data pairs
+#
+# The folds are stored as arrays of indices into one numpy copy of the points
+# and values of the data set. The DataContainer of a fold is only created when
+# the fold is requested.
 class FoldingPolicy(object):
     
     ##Constructor
@@ -15,8 +23,8 @@ class FoldingPolicy(object):
     #@param dataset: DataContainer with data set
     #@param level: Integer folding level, default value: 1
     def __init__(self, dataset, level=1):
-        ##List of partitioned data sets
-        self.dataFold = []
+        ##List of index arrays of the validation subsets
+        self.validationIndices = []
         
         ##Folding level
         self.level = level
@@ -24,8 +32,14 @@ class FoldingPolicy(object):
         ##Dataset
         self.dataset = dataset
         
+        ##Points of the data set as numpy array, shared by all folds
+        self.points = dataset.getPoints().array()
+        
+        ##Values of the data set as numpy array, shared by all folds
+        self.values = dataset.getValues().array()
+        
         ##Size of dataset
-        self.size = dataset.getPoints().getNrows()
+        self.size = self.points.shape[0]
         
         ##Number of points in one subset
         self.window = int( math.ceil( float(self.size) / self.level ) ) #number of points in validation set
@@ -38,22 +52,60 @@ class FoldingPolicy(object):
     #
     # @return: the next subset
     def next(self):
-        for step in xrange(self.level):
-            yield self.dataFold[step]
+        for step in xrange(len(self)):
+            yield self.getFold(step)
         return
     
     
+    ##Returns the number of folds
+    #
+    # @return: integer number of folds
+    def __len__(self):
+        return len(self.validationIndices)
+    
+    
+    ## Adds a fold with given validation subset
+    #
+    # @param validationIndeces: list or numpy array of indices for validation subset
+    def addFold(self, validationIndeces):
+        self.validationIndices.append(np.asarray(validationIndeces, dtype=int))
+    
+    
+    ## Returns the indices of the train subset of a fold
+    # The indices are in the order of the sequence seq.
+    #
+    # @param step: integer number of the fold
+    # @return: numpy array of indices for train subset
+    def getTrainIndices(self, step):
+        isTrain = np.ones(self.size, dtype=bool)
+        isTrain[self.validationIndices[step]] = False
+        seq = np.asarray(self.seq, dtype=int)
+        return seq[isTrain[seq]]
+    
+    
+    ## Returns the partitioned data set of a fold
+    #
+    # @param step: integer number of the fold
+    # @return: DataContainer partitioned data set
+    def getFold(self, step):
+        return self.createFoldsets(self.validationIndices[step],
+                                   self.getTrainIndices(step))
+    
+    
     ## Create fold new data set
-    # Brings points given by validationIndeces together as test subset and the rest of points
-    # as train subset
+    # Brings points given by validationIndeces together as test subset and the points
+    # given by trainIndeces as train subset
     #
-    # @param dataContainer: DataContainer with points
-    # @param validationIndeces: list of indices for validation subset
+    # @param validationIndeces: numpy array of indices for validation subset
+    # @param trainIndeces: numpy array of indices for train subset
     # @return: DataContainer partitioned data set
-    def createFoldsets(self, dataContainer, validationIndeces):
-        foldContainerValidation = dataContainer.getDataSubsetByIndexList(validationIndeces, "test")
-        trainIndeces = [i for i in self.seq if i not in validationIndeces]
-        foldContainerTrain = dataContainer.getDataSubsetByIndexList(trainIndeces, "train")
+    def createFoldsets(self, validationIndeces, trainIndeces):
+        foldContainerValidation = DataContainer(points=self.points[validationIndeces],
+                                                values=self.values[validationIndeces],
+                                                name=DataContainer.TEST_CATEGORY)
+        foldContainerTrain = DataContainer(points=self.points[trainIndeces],
+                                           values=self.values[trainIndeces],
+                                           name=DataContainer.TRAIN_CATEGORY)
         return foldContainerTrain.combine(foldContainerValidation)
 
     
@@ -62,5 +114,3 @@ class FoldingPolicy(object):
     # iterates through subsets
     def __iter__(self):
         return self.next()
-            
-
@@ -8,6 +8,8 @@ import time
 import random
 import math
 
+import numpy as np
+
 from FoldingPolicy import FoldingPolicy
 
 ## Provides functionality for accomplishment of learning with cross-validation
@@ -32,6 +34,6 @@ class RandomFoldingPolicy(FoldingPolicy):
         self.random = random.seed(self.seed)
         self.seq = range(self.size)
         random.shuffle(self.seq, self.random)
+        self.seq = np.array(self.seq, dtype=int)
         for step in xrange(self.level):
-            validationIndeces = self.seq[ step * self.window : min((step+1) * self.window, self.size)]
-            self.dataFold.append(self.createFoldsets(dataContainer, validationIndeces))
+            self.addFold(self.seq[ step * self.window : min((step+1) * self.window, self.size)])
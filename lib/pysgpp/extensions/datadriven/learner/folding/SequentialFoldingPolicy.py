@@ -7,6 +7,8 @@
 import time
 import math
 
+import numpy as np
+
 from FoldingPolicy import FoldingPolicy
 from pysgpp.extensions.datadriven.data.ARFFAdapter import ARFFAdapter
 
@@ -22,7 +24,6 @@ class SequentialFoldingPolicy(FoldingPolicy):
     #@param level: Integer folding level, default value: 1
     def __init__(self, dataContainer, level):
         FoldingPolicy.__init__(self,  dataContainer, level)
-        self.seq = range(self.size)
+        self.seq = np.arange(self.size)
         for step in xrange(self.level):
-            validationIndeces = self.seq[ step * self.window : min((step+1) * self.window, self.size)]
-            self.dataFold.append(self.createFoldsets(dataContainer, validationIndeces))
+            self.addFold(self.seq[ step * self.window : min((step+1) * self.window, self.size)])
@@ -10,6 +10,8 @@
 from FoldingPolicy import FoldingPolicy
 import math
 
+import numpy as np
+
 
 ## Provides functionality for accomplishment of learning with cross-validation
 # by generating a set of training data/validation data pairs with equal distribution
@@ -24,18 +26,13 @@ class StratifiedFoldingPolicy(FoldingPolicy):
     #@param level: Integer folding level, default value: 1
     def __init__(self, dataContainer, level=1):
         FoldingPolicy.__init__(self,  dataContainer, level)
-        values = dataContainer.getValues()
-        self.seq = range(self.size)
-        indecesOfPositives = []
-        indecesOfNegatives = []
-        for i in xrange(self.size):
-            if values[i] < 0: indecesOfNegatives.append(i)
-            else: indecesOfPositives.append(i)
+        self.seq = np.arange(self.size)
+        indecesOfPositives = np.flatnonzero(self.values >= 0)
+        indecesOfNegatives = np.flatnonzero(self.values < 0)
         windowPos = int(math.floor(len(indecesOfPositives) / self.level))
         windowNeg = int(math.floor(len(indecesOfNegatives) / self.level))
         for step in xrange(self.level):
-            validationIndeces = indecesOfPositives[ step * windowPos : ((step+1) * windowPos if (step+1) < self.level else len(indecesOfPositives))] + \
-                                indecesOfNegatives[ step * windowNeg : ((step+1) * windowNeg if (step+1) < self.level else len(indecesOfNegatives))]
-            self.dataFold.append(self.createFoldsets(dataContainer, validationIndeces))
-            
-            
\ No newline at end of file
+            validationIndeces = np.concatenate((
+                indecesOfPositives[ step * windowPos : ((step+1) * windowPos if (step+1) < self.level else len(indecesOfPositives))],
+                indecesOfNegatives[ step * windowNeg : ((step+1) * windowNeg if (step+1) < self.level else len(indecesOfNegatives))]))
+            self.addFold(validationIndeces)
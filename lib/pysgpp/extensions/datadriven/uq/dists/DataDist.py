@@ -17,6 +17,7 @@ from pysgpp.extensions.datadriven.tools import readDataTrivial
 import os
 
 from Dist import Dist
+from pysgpp.extensions.datadriven.uq.operations.general import isMatrix
 import numpy as np
 
 
@@ -56,6 +57,10 @@ class DataDist(Dist):
             self.__bounds = bounds
 
     def pdf(self, p, *args, **kws):
+        if isMatrix(p):
+            counts = [self.__sampleToIndex.get(tuple(x), 0) for x in p]
+            return np.array(counts, dtype='float') / self.__n
+
         x = tuple(p)
         if x in self.__sampleToIndex:
             return float(self.__sampleToIndex[x]) / self.__n
@@ -63,10 +68,19 @@ class DataDist(Dist):
             return 0.
 
     def cdf(self, p, *args, **kws):
-        ans = np.ndarray(self.__dim, dtype='int')
-        for i, pi in enumerate(p):
-            ans[i] = np.sum([1. for qi in self.samples[:, i] if pi <= qi])
-        return ans
+        if isMatrix(p):
+            p = np.asarray(p)
+            ans = np.empty((p.shape[0], self.samples.shape[1]), dtype='int')
+            # compare chunks of rows with all samples at once, such that
+            # the boolean arrays stay small
+            chunkSize = max(1, 2 ** 24 // max(1, self.samples.size))
+            for start in xrange(0, p.shape[0], chunkSize):
+                ps = p[start:start + chunkSize]
+                ans[start:start + chunkSize] = \
+                    np.sum(ps[:, None, :] <= self.samples[None, :, :], axis=1)
+            return ans
+
+        return np.sum(np.asarray(p) <= self.samples, axis=0)
 
     def ppf(self, p, *args, **kws):
         raise NotImplementedError()
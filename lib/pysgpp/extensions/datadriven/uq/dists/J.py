@@ -17,6 +17,7 @@ from Dist import Dist
 from SGDEdist import SGDEdist
 import numpy as np
 from pysgpp.extensions.datadriven.uq.operations import discretizeFunction
+from pysgpp.extensions.datadriven.uq.operations.general import isMatrix
 
 
 class J(Dist):
@@ -43,7 +44,32 @@ class J(Dist):
         else:
             raise AttributeError('Not valid distributions')
 
+    def __getColumnBlocks(self, p):
+        """
+        Splits the given matrix into the column blocks of the marginal
+        distributions
+        @param p: numpy array, one point per row
+        @return: generator of column blocks, one-dimensional blocks are
+                 returned as vectors
+        """
+        for ix in self.__ixs:
+            if len(ix) == 1:
+                yield p[:, ix[0]]
+            else:
+                yield p[:, ix]
+
     def pdf(self, p, marginal=False):
+        if isMatrix(p):
+            # evaluate every marginal distribution for all points at once
+            ans = np.ndarray((p.shape[0], self.__n), dtype='float')
+            for i, x in enumerate(self.__getColumnBlocks(p)):
+                ans[:, i] = self.__dists[i].pdf(x)
+
+            if marginal:
+                return ans
+            else:
+                return np.prod(ans, axis=1)
+
         ans = np.ndarray(self.__n, dtype='float')
         for i, ix in enumerate(self.__ixs):
             if len(ix) == 1:
@@ -58,6 +84,13 @@ class J(Dist):
             return np.prod(ans, dtype='float')
 
     def cdf(self, p):
+        if isMatrix(p):
+            ans = np.ndarray(p.shape, dtype='float')
+            for i, x in enumerate(self.__getColumnBlocks(p)):
+                ans[:, self.__ixs[i]] = np.reshape(self.__dists[i].cdf(x),
+                                                   (p.shape[0], len(self.__ixs[i])))
+            return ans
+
         ans = np.ndarray(self.__n, dtype='float')
         for i, ix in enumerate(self.__ixs):
             if len(ix) == 1:
@@ -68,6 +101,13 @@ class J(Dist):
         return ans
 
     def ppf(self, p):
+        if isMatrix(p):
+            ans = np.ndarray(p.shape, dtype='float')
+            for i, x in enumerate(self.__getColumnBlocks(p)):
+                ans[:, self.__ixs[i]] = np.reshape(self.__dists[i].ppf(x),
+                                                   (p.shape[0], len(self.__ixs[i])))
+            return ans
+
         ans = np.ndarray(self.__n, dtype='float')
         for i, ix in enumerate(self.__ixs):
             if len(ix) == 1:
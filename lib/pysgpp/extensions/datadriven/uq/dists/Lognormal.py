@@ -45,19 +45,15 @@ class Lognormal(Dist):
         return cls(mu, sigma, a=a, b=b, *args, **kws)
 
     def pdf(self, x):
-        if self.__a <= x <= self.__b:
-            return self._dist.pdf(x)
-        else:
-            return 0.0
+        x = np.asarray(x, dtype='float')
+        return np.where((self.__a <= x) & (x <= self.__b),
+                        self._dist.pdf(x), 0.0)[()]
 
     def cdf(self, x):
-        if x < self.__a:
-            return 0.0
-        elif x > self.__b:
-            return 1.0
-        else:
-            x_unit = self._dist.cdf(x)
-            return self.__linearTrans.probabilisticToUnit(x_unit)
+        x = np.asarray(x, dtype='float')
+        x_unit = self.__linearTrans.probabilisticToUnit(self._dist.cdf(x))
+        return np.where(x < self.__a, 0.0,
+                        np.where(x > self.__b, 1.0, x_unit))[()]
 
     def ppf(self, x):
         x_prob = self.__linearTrans.unitToProbabilistic(x)
@@ -78,10 +74,10 @@ class Lognormal(Dist):
         while i < n:
             newSamples = self._dist.rvs(n - i)
             # check range
-            for sample in newSamples:
-                if self.__a <= sample <= self.__b:
-                    samples[i] = sample
-                    i += 1
+            newSamples = newSamples[(self.__a <= newSamples) &
+                                    (newSamples <= self.__b)]
+            samples[i:i + len(newSamples)] = newSamples
+            i += len(newSamples)
         return samples
 
     def getBounds(self):
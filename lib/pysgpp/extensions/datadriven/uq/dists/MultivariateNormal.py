@@ -56,11 +56,12 @@ class MultivariateNormal(Dist):
         self.L = np.linalg.cholesky(self.corr)
 
     def pdf(self, x):
-        if all([self.__a <= xi <= self.__b for xi in x]):
-            z = x - self.__mu
-            return self.norm * np.exp(-0.5 * np.dot(z, np.dot(self.cov_inv, z)))
-        else:
-            return 0.0
+        # x is either one point or a matrix with one point per row
+        x = np.asarray(x, dtype='float')
+        z = x - self.__mu
+        ans = self.norm * np.exp(-0.5 * np.sum(np.dot(z, self.cov_inv) * z, axis=-1))
+        isInside = np.all((self.__a <= x) & (x <= self.__b), axis=-1)
+        return np.where(isInside, ans, 0.0)[()]
 
     def rvs(self, n=1):
         # do a nataf transformation
@@ -71,20 +71,21 @@ class Normal(Dist):
         return cls(mu, sigma, a, b)
 
     def pdf(self, x):
-        if self.__a <= x <= self.__b:
-            return self._dist.pdf(x)
-        else:
-            return 0.0;
+        x = np.asarray(x, dtype='float')
+        return np.where((self.__a <= x) & (x <= self.__b),
+                        self._dist.pdf(x), 0.0)[()]
 
     def cdf(self, x):
-        if self.__a <= x <= self.__b:
+        x = np.asarray(x, dtype='float')
+        if np.all((self.__a <= x) & (x <= self.__b)):
             x_unit = self._dist.cdf(x)
             return self.__linearTrans.probabilisticToUnit(x_unit)
         else:
             raise AttributeError("normal: cdf - x out of range [%g, %g]" % (self.__a, self.__b))
 
     def ppf(self, x):
-        if 0.0 <= x <= 1.0:
+        x = np.asarray(x, dtype='float')
+        if np.all((0.0 <= x) & (x <= 1.0)):
             x_unit = self.__linearTrans.unitToProbabilistic(x)
             return self._dist.ppf(x_unit)
         else:
@@ -105,10 +106,10 @@ class Normal(Dist):
         while i < n:
             newSamples = self._dist.rvs(n - i)
             # check range
-            for sample in newSamples:
-                if self.__a <= sample <= self.__b:
-                    samples[i] = sample
-                    i += 1
+            newSamples = newSamples[(self.__a <= newSamples) &
+                                    (newSamples <= self.__b)]
+            samples[i:i + len(newSamples)] = newSamples
+            i += len(newSamples)
         return samples
 
     def getBounds(self):
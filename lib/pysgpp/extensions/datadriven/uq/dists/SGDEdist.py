@@ -3,8 +3,6 @@ from pysgpp.extensions.datadriven.tools import (readAlphaARFF,
                                                 readDataTrivial)
 from pysgpp import (createOperationQuadrature,
                     createOperationInverseRosenblattTransformation,
-                    createOperationInverseRosenblattTransformation1D,
-                    createOperationRosenblattTransformation1D,
                     createOperationRosenblattTransformation,
                     DataMatrix, DataVector, Grid,
                     SparseGridDensityEstimatorConfiguration,
@@ -43,6 +41,12 @@ class SGDEdist(EstimatedDist):
     The Sparse Grid Density Estimation (SGDE) distribution
     """
 
+    # tolerance for the difference of the tabulated cdfs of two successive
+    # levels in the one dimensional case (not a bound of the true error)
+    cdfTableTolerance = 1e-10
+    # maximal level of the table of the cdf in the one dimensional case
+    cdfTableMaxLevel = 20
+
     def __init__(self, grid,
                  alpha,
                  trainData=None,
@@ -64,6 +68,7 @@ class SGDEdist(EstimatedDist):
 
         self.config = config
         self.unitIntegrand = unitIntegrand
+        self.__cdfTable = None
 
         if learner is None and trainData is not None:
             trainData_vec = DataMatrix(trainData)
@@ -212,13 +217,95 @@ class SGDEdist(EstimatedDist):
             x_unit = x
 
         # evaluate the sparse grid density
-        fx = evalSGFunction(self.grid, self.alpha, x_unit)
+        fx = np.maximum(0, evalSGFunction(self.grid, self.alpha, x_unit))
 
         # if there is just one value given, extract it from the list
         if len(fx) == 1:
             fx = fx[0]
 
-        return max(0, fx)
+        return fx
+
+    def __tabulateCdf(self, level):
+        """
+        Tabulates the one dimensional density and its cdf on a
+        full grid of the given level in the unit interval. In between the
+        grid points, the density is interpolated linearly, such that the
+        cdf is piecewise quadratic.
+        @param level: int, level of the full grid
+        @return: tuple (density values, cdf values)
+        """
+        x = np.linspace(0, 1, 2 ** level + 1)
+        fx = evalSGFunctionMulti(self.grid, self.unnormalized_alpha,
+                                 x.reshape(len(x), 1))
+        fx = np.maximum(0, fx)
+        Fx = np.concatenate(([0.], np.cumsum((fx[:-1] + fx[1:]) / 2.))) / 2 ** level
+        return fx, Fx
+
+    def __getCdfTable(self):
+        """
+        Get the table of the cdf of the one dimensional density. The
+        table is computed once. It is refined until the cdf values of two
+        successive levels differ by less than cdfTableTolerance, which is
+        the case immediately for piecewise linear densities on levels at
+        least as large as the maximal level of the grid. The tolerance
+        compares successive levels, it is not a bound of the true error
+        of the cdf. If cdfTableMaxLevel is reached before, a warning with
+        the reached difference is issued.
+        @return: tuple (mesh width, density values, normalized cdf values)
+        """
+        if self.__cdfTable is None:
+            level = min(self.grid.getStorage().getMaxLevel() + 1,
+                        self.cdfTableMaxLevel)
+            fx, Fx = self.__tabulateCdf(level)
+            error = np.inf
+            while level < self.cdfTableMaxLevel:
+                fx_fine, Fx_fine = self.__tabulateCdf(level + 1)
+                error = np.max(np.abs(Fx_fine[::2] - Fx)) / Fx_fine[-1]
+                fx, Fx, level = fx_fine, Fx_fine, level + 1
+                if error < self.cdfTableTolerance:
+                    break
+
+            if not error < self.cdfTableTolerance:
+                warnings.warn("SGDEdist: the tabulated cdf did not converge "
+                              "up to level %i, the cdfs of the last two "
+                              "levels differ by %g (tolerance %g)" %
+                              (level, error, self.cdfTableTolerance))
+
+            # normalize the tabulated density
+            self.__cdfTable = (1. / 2 ** level, fx / Fx[-1], Fx / Fx[-1])
+
+        return self.__cdfTable
+
+    def __cdf1D(self, x_unit):
+        """
+        Cdf of the one dimensional density, computed for all the points
+        at once using the tabulated cdf
+        @param x_unit: numpy array, points in the unit interval
+        @return: numpy array, cdf values
+        """
+        h, fx, Fx = self.__getCdfTable()
+        x_unit = np.clip(x_unit, 0, 1)
+        k = np.clip(np.floor(x_unit / h).astype('int'), 0, len(Fx) - 2)
+        t = x_unit / h - k
+        return np.clip(Fx[k] + h * t * (fx[k] + (fx[k + 1] - fx[k]) * t / 2.), 0, 1)
+
+    def __ppf1D(self, u):
+        """
+        Inverse of the cdf of the one dimensional density, computed for
+        all the points at once by solving the quadratic equation of the
+        tabulated cdf in the corresponding cell
+        @param u: numpy array, values in [0, 1]
+        @return: numpy array, points in the unit interval
+        """
+        h, fx, Fx = self.__getCdfTable()
+        k = np.clip(np.searchsorted(Fx, u, side='right') - 1, 0, len(Fx) - 2)
+        # solve a * t^2 + b * t = c for t in [0, 1]
+        a = h * (fx[k + 1] - fx[k]) / 2.
+        b = h * fx[k]
+        c = u - Fx[k]
+        denominator = b + np.sqrt(np.maximum(0, b * b + 4 * a * c))
+        t = np.where(denominator > 0, 2 * c / np.where(denominator > 0, denominator, 1), 0.)
+        return (k + np.clip(t, 0, 1)) * h
 
     def cdf(self, x, shuffle=True):
         # convert the parameter to the right format
@@ -232,10 +319,7 @@ class SGDEdist(EstimatedDist):
 
         # do the transformation
         if self.dim == 1:
-            op = createOperationRosenblattTransformation1D(self.grid)
-            ans = np.ndarray(x.shape[0])
-            for i, xi in enumerate(x_unit[:, 0]):
-                ans[i] = op.doTransformation1D(self.unnormalized_alpha_vec, xi)
+            ans = self.__cdf1D(x_unit[:, 0])
             if len(ans) == 1:
                 return ans[0]
             else:
@@ -264,16 +348,13 @@ class SGDEdist(EstimatedDist):
 
         # do the transformation
         if self.dim == 1:
-            op = createOperationInverseRosenblattTransformation1D(self.grid)
-            x_unit = np.ndarray((x.shape[0], x.shape[1]))
-            for i, xi in enumerate(x[:, 0]):
-                x_unit[i, 0] = op.doTransformation1D(self.unnormalized_alpha_vec, xi)
+            x_unit = self.__ppf1D(x[:, 0]).reshape(x.shape)
 
             # transform the samples to the unit hypercube
             if self.trans is not None:
                 x_prob = self.trans.unitToProbabilisticMatrix(x_unit)
             else:
-                x_prob = x
+                x_prob = x_unit
 
             # extract the outcome
             if x_prob.shape[0] == 1 and x_prob.shape[1] == 1:
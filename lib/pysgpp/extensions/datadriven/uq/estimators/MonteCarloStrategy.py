@@ -40,6 +40,8 @@ class MonteCarloStrategy(SparseGridEstimationStrategy):
 
         self.__npaths = npaths
         self.__percentile = percentile
+        # maximal number of resampled function values held in memory
+        self.__blockSize = 10 ** 6
 
         # other stuff
         self.__isPositive = isPositive
@@ -47,7 +49,7 @@ class MonteCarloStrategy(SparseGridEstimationStrategy):
         self.verbose = True
 
 
-    def __getSamples(self, W, T, bootstrapping=False):
+    def __getSamples(self, W, T):
         if self.samples is None:
             # draw n samples
             ans = W.rvs(self.__n)
@@ -57,16 +59,8 @@ class MonteCarloStrategy(SparseGridEstimationStrategy):
             for Ti in T:
                 jointT.add(Ti, Ti.getSize())
 
-            for i in xrange(ans.shape[0]):
-                ans[i, :] = jointT.probabilisticToUnit(ans[i, :])
+            ans = jointT.probabilisticToUnitMatrix(ans)
         else:
-            # bootstrapping on the available samples
-            if bootstrapping:
-                ixs = np.random.randint(0, self.__n, self.__n)
-                dataSamples = self.samples[ixs, :]
-            else:
-                dataSamples = self.samples
-
             # check if there are samples for just a subset of the random
             # variables. If so, add the missing ones
             if self.__ixs is not None and len(self.__ixs) < W.getDim():
@@ -74,14 +68,52 @@ class MonteCarloStrategy(SparseGridEstimationStrategy):
                 ans = W.rvs(self.__n)
 
                 # replace the entries in the directions where we infact have
-                # data points available using bootstrapping
-                for i, sample in enumerate(dataSamples):
-                    # transform them to the unit hypercube
-                    ans[i, self.__ixs] = sample
-                    ans[i, :] = np.array([T[j].probabilisticToUnit(ans[i, j])
-                                          for j in xrange(len(T))])
+                # data points available and transform them to the unit
+                # hypercube
+                ans[:, self.__ixs] = self.samples
+                jointT = JointTransformation()
+                for Ti in T:
+                    jointT.add(Ti, Ti.getSize())
+
+                ans = jointT.probabilisticToUnitMatrix(ans)
+            else:
+                ans = self.samples
+
+        return ans
+
+
+    def __bootstrap(self, res, moments):
+        """
+        Bootstrapping of the given moments. The paths are generated by
+        resampling the function values, which are evaluated just once.
+        All the moments are computed on the same paths.
+        @param res: numpy array, function values at the samples
+        @param moments: list of functions which compute the moment for
+                        every row of a matrix of function values
+        @return: list of tuples (error, lower percentile, upper percentile),
+                 one for each moment
+        """
+        n = len(res)
+        values = np.zeros((len(moments), self.__npaths))
+
+        # resample the paths block wise to limit the memory consumption
+        npathsPerBlock = max(1, self.__blockSize // n)
+        for i in xrange(0, self.__npaths, npathsPerBlock):
+            j = min(i + npathsPerBlock, self.__npaths)
+            paths = res[np.random.randint(0, n, (j - i, n))]
+            for k, moment in enumerate(moments):
+                values[k, i:j] = moment(paths)
+
+        # error statistics
+        ans = []
+        for k in xrange(len(moments)):
+            if self.__npaths > 1:
+                lower_percentile = np.percentile(values[k, :], q=self.__percentile)
+                upper_percentile = np.percentile(values[k, :], q=100 - self.__percentile)
+                err = max(lower_percentile, upper_percentile)
             else:
-                ans = dataSamples
+                err = lower_percentile = upper_percentile = np.Inf
+            ans.append((err, lower_percentile, upper_percentile))
 
         return ans
 
@@ -97,26 +129,12 @@ class MonteCarloStrategy(SparseGridEstimationStrategy):
         """
         # init
         _, W, D = self._extractPDFforMomentEstimation(U, T)
-        moments = np.zeros(self.__npaths)
-        for i in xrange(self.__npaths):
-            samples = self.__getSamples(W, D, bootstrapping=True)
-            res = evalSGFunctionMulti(grid, alpha, samples)
-
-            # compute the moment
-            moments[i] = np.mean(res)
-
-        # error statistics
-        if self.__npaths > 1:
-            lower_percentile = np.percentile(moments, q=self.__percentile)
-            upper_percentile = np.percentile(moments, q=100 - self.__percentile)
-            err = max(lower_percentile, upper_percentile)
-        else:
-            err = lower_percentile = upper_percentile = np.Inf
-
-        # calculate moment
-        samples = self.__getSamples(W, D, bootstrapping=False)
+        samples = self.__getSamples(W, D)
         res = evalSGFunctionMulti(grid, alpha, samples)
 
+        err, lower_percentile, upper_percentile = \
+            self.__bootstrap(res, [lambda paths: np.mean(paths, axis=1)])[0]
+
         return {"value": np.mean(res),
                 "err": err,
                 "confidence_interval": (lower_percentile, upper_percentile)}
@@ -133,41 +151,12 @@ class MonteCarloStrategy(SparseGridEstimationStrategy):
         """
         # init
         _, W, D = self._extractPDFforMomentEstimation(U, T)
-        moments = np.zeros(self.__npaths)
-        for i in xrange(self.__npaths):
-            samples = self.__getSamples(W, D, bootstrapping=True)
-            res = evalSGFunctionMulti(grid, alpha, samples)
-
-            # compute the moment
-            moments[i] = np.sum((res - np.mean(res)) ** 2) / (len(res) - 1.)
-
-        # error statistics
-        if self.__npaths > 1:
-            lower_percentile = np.percentile(moments, q=self.__percentile)
-            upper_percentile = np.percentile(moments, q=100 - self.__percentile)
-            err = max(lower_percentile, upper_percentile)
-        else:
-            err = lower_percentile = upper_percentile = np.Inf
-
-        # calculate moment
-        samples = self.__getSamples(W, D, bootstrapping=False)
-
-#         plt.figure()
-#         plt.hist(samples[:, 0], normed=True, cumulative=False, label="histogram")
-#         plt.title("0: lognormal [%g, %g]" % (samples[:, 0].min(),
-#                                              samples[:, 0].max()))
-#         plt.figure()
-#         plt.hist(samples[:, 1], normed=True, cumulative=False, label="histogram")
-#         plt.title("0: beta [%g, %g]" % (samples[:, 1].min(),
-#                                         samples[:, 1].max()))
-#         plt.figure()
-#         plt.hist(samples[:, 2], normed=True, cumulative=False, label="histogram")
-#         plt.title("0: lognormal [%g, %g]" % (samples[:, 2].min(),
-#                                              samples[:, 2].max()))
-#         plt.show()
-
+        samples = self.__getSamples(W, D)
         res = evalSGFunctionMulti(grid, alpha, samples)
 
+        err, lower_percentile, upper_percentile = \
+            self.__bootstrap(res, [lambda paths: np.var(paths, axis=1, ddof=1)])[0]
+
         return {"value": np.sum((res - mean) ** 2) / (len(res) - 1.),
                 "err": err,
                 "confidence_interval": (lower_percentile, upper_percentile)}
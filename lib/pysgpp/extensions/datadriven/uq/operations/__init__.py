@@ -50,6 +50,8 @@ from sparse_grid import (bsplineBoundaryGridTypes,
                          hierarchize, dehierarchize, dehierarchizeList,
                          hierarchizeBruteForce,
                          hierarchizeEvalHierToTop,
+                         getHierarchicalDescendants,
+                         updateHierarchicalCoefficients,
                          balance,
                          estimateSurplus, estimateConvergence,
                          checkInterpolation,
@@ -10,3 +10,4 @@ from setGridPointsToZero import SetGridPointsToZero
 from localFullGridSearch import LocalFullGridCandidates
 from fullGridSearch import FullGridCandidates
 from findIntersectionsSubspaceBased import IntersectionSubspaceCandidates
+from overlappingSupportIndex import OverlappingSupportIndex
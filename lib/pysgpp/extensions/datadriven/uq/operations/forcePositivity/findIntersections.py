@@ -1,4 +1,5 @@
 from findCandidateSet import CandidateSet
+from overlappingSupportIndex import OverlappingSupportIndex
 from pysgpp import HashGridPoint, DataVector
 import numpy as np
 from pysgpp.extensions.datadriven.uq.operations.sparse_grid import \
@@ -51,18 +52,21 @@ class IntersectionCandidates(CandidateSet):
         for i, gpi in enumerate(gpsi):
             intersections[gpi] = set()
 
+        # index the supports such that just the grid points with
+        # overlapping supports are compared
+        supportIndex = OverlappingSupportIndex.fromLevelIndex(gpsi, numDims)
+
         newIntersections = {}
         cnt_intersections = 0
         for i, gpi in enumerate(gpsi):
             newIntersections[gpi] = True
 
-            for gpj in gpsi[(i + 1):]:
-                if haveOverlappingSupportByLevelIndex(gpi, gpj) and \
-                        not haveHierarchicalRelationshipByLevelIndex(gpi, gpj):
-                    intersections[gpi].add(gpj)
-                    intersections[gpj].add(gpi)
-                    cnt_intersections += 2
-
+            js = supportIndex.getOverlapping(*gpi, excludeRelatives=True)
+            for j in js[js > i]:
+                gpj = gpsi[j]
+                intersections[gpi].add(gpj)
+                intersections[gpj].add(gpi)
+                cnt_intersections += 2
                 costs += 1
 
         if self.verbose:
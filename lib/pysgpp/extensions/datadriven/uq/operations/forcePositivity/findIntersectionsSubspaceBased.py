@@ -1,4 +1,5 @@
 from findCandidateSet import CandidateSet
+from overlappingSupportIndex import OverlappingSupportIndex
 from pysgpp import HashGridPoint, DataVector
 import numpy as np
 from pysgpp.extensions.datadriven.uq.operations.sparse_grid import \
@@ -60,31 +61,37 @@ class IntersectionSubspaceCandidates(CandidateSet):
         while len(currentSubspaces) > 0:
             nextSubspaces = {}
             levels = currentSubspaces.keys()
-            for i in xrange(len(levels)):
-                levelk = levels[i]
-                gpsk = currentSubspaces[levelk]
-                for j in xrange(i + 1, len(levels)):
-                    levell = levels[j]
-                    gpsl = currentSubspaces[levell]
-                    for gpk in gpsk:
-                        for gpl in gpsl:
-                            if haveOverlappingSupportByLevelIndex(gpk, gpl) and \
-                                    not haveHierarchicalRelationshipByLevelIndex(gpk, gpl):
-                                # compute intersection
-                                self.findIntersection(gpintersection, (level, index),
-                                                      gpk, gpl)
-                                tlevel, tindex = tuple(level), tuple(index)
-                                if (tlevel, tindex) not in intersections:
-                                    intersections[tlevel, tindex] = HashGridPoint(gpintersection)
-                                    if (tlevel, tindex) not in alreadyChecked:
-                                        alreadyChecked[tlevel, tindex] = True
-                                        if tlevel not in nextSubspaces:
-                                            nextSubspaces[tlevel] = [(tlevel, tindex)]
-                                        else:
-                                            nextSubspaces[tlevel].append((tlevel, tindex))
-
-
-                            costs += 1
+
+            # index the supports of the grid points of all subspaces such
+            # that just the ones with overlapping supports are compared
+            gps, subspaceIds = [], []
+            for i, levelk in enumerate(levels):
+                gps += currentSubspaces[levelk]
+                subspaceIds += [i] * len(currentSubspaces[levelk])
+            supportIndex = OverlappingSupportIndex.fromLevelIndex(gps, numDims)
+
+            subspaceIds = np.array(subspaceIds)
+            for k, gpk in enumerate(gps):
+                ls = supportIndex.getOverlapping(*gpk, excludeRelatives=True)
+                # compare just with the grid points of the subsequent
+                # subspaces
+                for l in ls[subspaceIds[ls] > subspaceIds[k]]:
+                    gpl = gps[l]
+                    # compute intersection
+                    self.findIntersection(gpintersection, (level, index),
+                                          gpk, gpl)
+                    tlevel, tindex = tuple(level), tuple(index)
+                    if (tlevel, tindex) not in intersections:
+                        intersections[tlevel, tindex] = HashGridPoint(gpintersection)
+                        if (tlevel, tindex) not in alreadyChecked:
+                            alreadyChecked[tlevel, tindex] = True
+                            if tlevel not in nextSubspaces:
+                                nextSubspaces[tlevel] = [(tlevel, tindex)]
+                            else:
+                                nextSubspaces[tlevel].append((tlevel, tindex))
+
+
+                    costs += 1
             
             currentSubspaces = nextSubspaces
 
@@ -1,5 +1,6 @@
 from pysgpp import Grid, DataVector, createOperationEval, HashGridPoint
 from findCandidateSet import CandidateSet
+from overlappingSupportIndex import OverlappingSupportIndex
 import matplotlib.pyplot as plt
 import numpy as np
 from pysgpp.extensions.datadriven.uq.operations.sparse_grid import getBoundsOfSupport, \
@@ -272,9 +273,18 @@ class LocalFullGridCandidates(CandidateSet):
     def findIntersections(self, gpsi, gpsj, grid):
         overlappingGridPoints = {}
         costs = 0
+        # index the supports of gpsj, such that just the grid points with
+        # overlapping supports are compared
+        keys = gpsj.keys()
+        supportIndex = OverlappingSupportIndex.fromGridPoints([gpsj[j] for j in keys],
+                                                              self.numDims)
         for i, gpi in gpsi.items():
             del gpsj[i]
-            costs += self.findIntersectionsOfOverlappingSuppportsForOneGridPoint(gpi, gpsj,
+            candidates = {}
+            for k in supportIndex.getOverlapping(*getLevelIndex(gpi)):
+                if keys[k] in gpsj:
+                    candidates[keys[k]] = gpsj[keys[k]]
+            costs += self.findIntersectionsOfOverlappingSuppportsForOneGridPoint(gpi, candidates,
                                                                                  overlappingGridPoints,
                                                                                  grid)
         return overlappingGridPoints, costs
@@ -284,9 +294,16 @@ class LocalFullGridCandidates(CandidateSet):
         ans = []
         searchCosts = 0
         gridCosts = 0
+        # a local grid can just be contained in a local grid whose root
+        # node is the same or an ancestor, so their supports overlap
+        supportIndex = OverlappingSupportIndex.fromLevelIndex([localFullGrid.getLevelIndex()
+                                                               for localFullGrid in sortedIntersections],
+                                                              self.numDims)
         for i, iLocalFullGrid in enumerate(sortedIntersections):
             isSubset = False
-            for j, jLocalFullGrid in enumerate(sortedIntersections[::-1]):
+            for j in supportIndex.getOverlapping(iLocalFullGrid.level,
+                                                 iLocalFullGrid.index)[::-1]:
+                jLocalFullGrid = sortedIntersections[j]
                 # this part here is crucial: in order to neglect an intersection
                 # which is fully considered already by another grid point
                 # we need to make sure that
@@ -343,6 +360,9 @@ class LocalFullGridCandidates(CandidateSet):
 
         costsSubtractSearch = 0
         cnt = 0
+        supportIndex = OverlappingSupportIndex.fromLevelIndex([localFullGrid.getLevelIndex()
+                                                               for localFullGrid in sortedCoarsedOverlap],
+                                                              self.numDims)
         # ---------------------------------------------------------------------
         # split the grid points in the ones which do not overlap with any other
         # grid point and the ones which do
@@ -353,7 +373,12 @@ class LocalFullGridCandidates(CandidateSet):
             # not yet been considered
             iSubtractOverlap = []
 #             print "%i, %s ->" % (i, iFullGrid.getLevelIndex()),
-            for j, jFullGrid in enumerate(sortedCoarsedOverlap[:i:-1]):
+            for j in supportIndex.getOverlapping(iFullGrid.level, iFullGrid.index)[::-1]:
+                # just the subsequent grids with overlapping supports are
+                # candidates
+                if j <= i:
+                    break
+                jFullGrid = sortedCoarsedOverlap[j]
                 costsSubtractSearch += 1
 #                 print "%i," % (len(sortedCoarsedOverlap) - j - 1,),
                 if jFullGrid.overlap(iFullGrid):
@@ -1,5 +1,6 @@
 from pysgpp import Grid, DataVector, createOperationEval, HashGridPoint
 from findCandidateSet import CandidateSet
+from overlappingSupportIndex import OverlappingSupportIndex
 import matplotlib.pyplot as plt
 import numpy as np
 from pysgpp.extensions.datadriven.uq.operations.sparse_grid import getBoundsOfSupport, \
@@ -60,8 +61,8 @@ class LocalHierarchicalIntersectionCandidates(CandidateSet):
                 ljd, ijd = gpj.getLevel(idim), gpj.getIndex(idim)
 
                 # check if they have overlapping support
-                xlowi, xhighi = getBoundsOfSupport(lid, iid)
-                xlowj, xhighj = getBoundsOfSupport(ljd, ijd)
+                xlowi, xhighi = getBoundsOfSupport(gs, lid, iid)
+                xlowj, xhighj = getBoundsOfSupport(gs, ljd, ijd)
 
                 xlow = max(xlowi, xlowj)
                 xhigh = min(xhighi, xhighj)
@@ -97,9 +98,18 @@ class LocalHierarchicalIntersectionCandidates(CandidateSet):
     def findIntersections(self, gpsi, gpsj, grid, alpha):
         overlappingGridPoints = {}
         costs = 0
+        # index the supports of gpsj, such that just the grid points with
+        # overlapping supports are compared
+        keys = gpsj.keys()
+        supportIndex = OverlappingSupportIndex.fromGridPoints([gpsj[j] for j in keys],
+                                                              self.numDims)
         for i, gpi in gpsi.items():
             del gpsj[i]
-            comparisonCosts, fullGridCosts = self.findIntersectionsOfOverlappingSuppportsForOneGridPoint(i, gpi, gpsj,
+            candidates = {}
+            for k in supportIndex.getOverlapping(*getLevelIndex(gpi)):
+                if keys[k] in gpsj:
+                    candidates[keys[k]] = gpsj[keys[k]]
+            comparisonCosts, fullGridCosts = self.findIntersectionsOfOverlappingSuppportsForOneGridPoint(i, gpi, candidates,
                                                                                                          overlappingGridPoints,
                                                                                                          grid, alpha)
             costs += fullGridCosts
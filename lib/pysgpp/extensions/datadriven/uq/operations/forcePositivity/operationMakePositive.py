@@ -5,37 +5,107 @@ Created on Feb 6, 2015
 '''
 from pysgpp.extensions.datadriven.uq.operations import checkPositivity, \
     insertHierarchicalAncestors, insertPoint, copyGrid, \
-    dehierarchize, hierarchize, hasChildren, hasAllChildren
+    dehierarchize, hierarchize, hasChildren, hasAllChildren, \
+    evalSGFunctionMulti, getHierarchicalDescendants, \
+    updateHierarchicalCoefficients
 from pysgpp import HashGridPoint, createOperationEval, DataVector, IndexList, \
     createOperationQuadrature, GridType_LinearBoundary, GridType_PolyBoundary
 import warnings
 from pysgpp.extensions.datadriven.uq.plot.plot2d import plotSG2d
 import matplotlib.pyplot as plt
 from pysgpp.extensions.datadriven.uq.operations.sparse_grid import getHierarchicalAncestors, \
-    insertTruncatedBorder
+    insertTruncatedBorder, getLevel, getIndex, bsplineGridTypes
+from multiprocessing import Pool, cpu_count
 import numpy as np
 
 
+# Grid, coefficients and candidates searched by the worker processes. The
+# variables are set before the workers are forked, such that every worker
+# owns a copy of them.
+_grid = None
+_alpha = None
+_candidates = None
+
+
+def _lookupFullGridPoints(ixs):
+    """
+    Searches the full grid points of a chunk of candidates in a worker
+    process
+    @param ixs: list of positions in the list of candidates
+    @return: list of tuples (level, index) of the full grid points
+    """
+    acc = OperationMakePositive(_grid).lookupFullGridPoints(_grid, _alpha,
+                                                            [_candidates[i] for i in ixs])
+    # grid points can not be pickled
+    return [(tuple(getLevel(gp)), tuple(getIndex(gp))) for gp in acc]
+
+
 class OperationMakePositive(object):
 
-    def __init__(self, grid):
+    def __init__(self, grid, numberOfProcesses=1, incremental=True):
+        """
+        Constructor
+        @param grid: Grid
+        @param numberOfProcesses: int, number of worker processes which
+        search the full grid points of the candidates, None means the
+        number of CPUs
+        @param incremental: bool, check just the nodal values which are
+        affected by the newly added grid points instead of the ones of the
+        whole grid after each iteration
+        """
         self.grid = grid
         self.verbose = False
+        self.numberOfProcesses = numberOfProcesses \
+            if numberOfProcesses is not None else cpu_count()
+        self.incremental = incremental
 
     def setInterpolationAlgorithm(self, algorithm):
         self.algorithm = algorithm
 
-    def makeCurrentNodalValuesPositive(self, grid, alpha):
-        nodalValues = dehierarchize(grid, alpha)
+    def makeCurrentNodalValuesPositive(self, grid, alpha, ixs=None):
+        """
+        Sets the negative nodal values to zero
+        @param grid: Grid
+        @param alpha: numpy array hierarchical coefficients
+        @param ixs: sequence numbers of the grid points whose coefficients
+        changed. If given, just the nodal values of them and of their
+        hierarchical descendants are checked and the coefficients are
+        updated locally, otherwise the whole grid is checked. The supports
+        of B-splines are wider than the ones of their hierarchical
+        descendants, such that the whole grid is always checked for them.
+        @return: numpy array hierarchical coefficients
+        """
+        if grid.getType() in bsplineGridTypes:
+            ixs = None
+
         cnt = 0
-        for i, yi in enumerate(nodalValues):
-            if yi < 0:
-                nodalValues[i] = 0
-                cnt += 1
-        if cnt > 0:
-            alpha = hierarchize(grid, nodalValues)
-            if self.verbose:
-                warnings.warn("negative function values at grid points encountered, this should not happen")
+        if ixs is None:
+            nodalValues = dehierarchize(grid, alpha)
+            for i, yi in enumerate(nodalValues):
+                if yi < 0:
+                    nodalValues[i] = 0
+                    cnt += 1
+            if cnt > 0:
+                alpha = hierarchize(grid, nodalValues)
+        elif len(ixs) > 0:
+            # the nodal values of the remaining grid points do not change
+            gs = grid.getStorage()
+            affected = getHierarchicalDescendants(grid, ixs)
+            points = np.ndarray((len(affected), gs.getDimension()))
+            p = DataVector(gs.getDimension())
+            for i, ix in enumerate(affected):
+                gs.getCoordinates(gs.getPoint(ix), p)
+                points[i, :] = p.array()
+            nodalValues = evalSGFunctionMulti(grid, alpha, points)
+            neg = np.where(nodalValues < 0)[0]
+            cnt = len(neg)
+            if cnt > 0:
+                alpha, _ = updateHierarchicalCoefficients(grid, alpha,
+                                                          affected[neg],
+                                                          -nodalValues[neg])
+
+        if cnt > 0 and self.verbose:
+            warnings.warn("negative function values at grid points encountered, this should not happen")
 
         return alpha
 
@@ -150,6 +220,9 @@ class OperationMakePositive(object):
         gp.set(d, level, index)
 
     def lookupFullGridPoints(self, grid, alpha, candidates):
+        if self.numberOfProcesses > 1 and len(candidates) > 1:
+            return self.lookupFullGridPointsParallel(grid, alpha, candidates)
+
         acc = []
         gs = grid.getStorage()
         p = DataVector(gs.getDimension())
@@ -167,6 +240,42 @@ class OperationMakePositive(object):
                                                    opEval, maxLevel, acc)
         return acc
 
+    def lookupFullGridPointsParallel(self, grid, alpha, candidates):
+        """
+        Searches the full grid points of the candidates in a pool of worker
+        processes. The candidates are split into chunks, the result is the
+        same as the one of the serial search.
+        @param grid: Grid
+        @param alpha: numpy array hierarchical coefficients
+        @param candidates: list of HashGridPoint
+        @return: list of HashGridPoint
+        """
+        global _grid, _alpha, _candidates
+        numberOfProcesses = min(self.numberOfProcesses, len(candidates))
+        # a few chunks per worker balance the load
+        chunkSize = max(1, len(candidates) // (4 * numberOfProcesses))
+        chunks = [range(i, min(i + chunkSize, len(candidates)))
+                  for i in xrange(0, len(candidates), chunkSize)]
+
+        _grid, _alpha, _candidates = grid, alpha, candidates
+        pool = Pool(numberOfProcesses)
+        try:
+            results = pool.map(_lookupFullGridPoints, chunks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+            _grid, _alpha, _candidates = None, None, None
+
+        numDims = grid.getStorage().getDimension()
+        acc = []
+        for result in results:
+            for level, index in result:
+                gp = HashGridPoint(numDims)
+                for d in xrange(numDims):
+                    gp.set(d, int(level[d]), int(index[d]))
+                acc.append(gp)
+        return acc
+
     def addFullGridPoints(self, grid, alpha):
         """
         Add all those full grid points with |accLevel|_1 <= n, where n is the
@@ -275,36 +384,28 @@ class OperationMakePositive(object):
                 print "learning the new density"
 
             newGridPoints += addedGridPoints
-            # set the function value at the new grid points to zero
-            newNodalValues = dehierarchize(grid, alpha)
-            newNodalValues = np.append(newNodalValues, newGrid.getSize() - len(newNodalValues))
-            newAlpha = np.append(alpha, np.zeros(newGrid.getSize() - len(alpha)))
+            # the new grid points have zero coefficients, so the nodal
+            # values of the existing ones do not change
+            extendedAlpha = np.append(alpha, np.zeros(newGrid.getSize() - len(alpha)))
             # compute now the hierarchical coefficients for the newly
             # added points
             newAlpha = self.algorithm.computeHierarchicalCoefficients(newGrid,
-                                                                      newAlpha,
+                                                                      np.array(extendedAlpha),
                                                                       addedGridPoints)
             # the function does not have to be positive now -> check it again
             if self.verbose:
                 print "force function to be positive"
-            # check manually if all nodal points are positive
-            newNodalValues = dehierarchize(newGrid, newAlpha)
-            # collect all negative function values
-            forceToBePositive = []
-            newGs = newGrid.getStorage()
-            for i in xrange(newGs.getSize()):
-                gp = newGs.getPoint(i)
-                if newNodalValues[newGs.getSequenceNumber(gp)] < 0.:
-                    forceToBePositive.append(gp)
-
-            if len(forceToBePositive) > 0:
-                # if not, interpolate the function values for the negative
-                # grid points
-                if self.verbose:
-                    warnings.warn("manually forcing the the function to be positive")
-                newAlpha = self.makeCurrentGridPositive(newGrid, newAlpha)
-                # newAlpha = SetGridPointsToZero().computeHierarchicalCoefficients(grid, newAlpha, forceToBePositive)
-                # newAlpha = InterpolateParents().computeHierarchicalCoefficients(grid, newAlpha, forceToBePositive)
+
+            if self.incremental:
+                # just the nodal values of the new grid points and the ones
+                # in the supports of the changed coefficients are affected
+                newGs = newGrid.getStorage()
+                ixs = set(np.where(newAlpha != extendedAlpha)[0])
+                ixs.update(newGs.getSequenceNumber(gp) for gp in addedGridPoints)
+                newAlpha = self.makeCurrentNodalValuesPositive(newGrid, newAlpha,
+                                                               sorted(ixs))
+            else:
+                newAlpha = self.makeCurrentNodalValuesPositive(newGrid, newAlpha)
 
             if newGrid.getSize() == grid.getSize():
                 break
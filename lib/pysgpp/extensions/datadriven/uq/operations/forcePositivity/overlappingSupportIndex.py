@@ -0,0 +1,148 @@
+import numpy as np
+
+
+class OverlappingSupportIndex(object):
+    """
+    Index over the supports of the hierarchical basis functions of a list
+    of inner grid points (level >= 1), which returns the grid points whose
+    supports overlap with the support of a given grid point.
+
+    In one dimension, the supports of two grid points overlap iff one of
+    them is a hierarchical ancestor of the other one. The descendants of a
+    grid point (including itself) are exactly the grid points whose
+    coordinates lie in the interior of its support. Therefore, the grid
+    points are sorted by their coordinates in each dimension such that the
+    descendants are found by bisection, while the at most l - 1 ancestors
+    are looked up in a hash map. The candidates are taken from the
+    dimension with the least candidates and checked in the remaining
+    dimensions at once.
+    """
+
+    def __init__(self, levels, indices):
+        """
+        Constructor
+        @param levels: numpy array of shape (n, numDims) with the levels
+        @param indices: numpy array of shape (n, numDims) with the indices
+        """
+        self.levels = np.array(levels, dtype='int64')
+        self.indices = np.array(indices, dtype='int64')
+        self.size, self.numDims = self.levels.shape
+        self.maxLevel = int(np.max(self.levels)) if self.size > 0 else 0
+
+        # coordinates scaled to integers on the finest level
+        coords = self.indices << (self.maxLevel - self.levels)
+
+        self.__order = []
+        self.__sortedCoords = []
+        self.__buckets = []
+        for idim in xrange(self.numDims):
+            order = np.argsort(coords[:, idim], kind='mergesort')
+            self.__order.append(order)
+            self.__sortedCoords.append(coords[order, idim])
+
+            buckets = {}
+            for i in xrange(self.size):
+                key = self.levels[i, idim], self.indices[i, idim]
+                if key in buckets:
+                    buckets[key].append(i)
+                else:
+                    buckets[key] = [i]
+            self.__buckets.append(buckets)
+
+    @classmethod
+    def fromLevelIndex(cls, levelIndices, numDims):
+        """
+        Create the index for a list of grid points
+        @param levelIndices: list of tuples (level, index) of sequences
+        @param numDims: int, number of dimensions
+        @return: OverlappingSupportIndex
+        """
+        levels = np.ndarray((len(levelIndices), numDims), dtype='int64')
+        indices = np.ndarray((len(levelIndices), numDims), dtype='int64')
+        for i, (level, index) in enumerate(levelIndices):
+            levels[i, :] = level
+            indices[i, :] = index
+        return cls(levels, indices)
+
+    @classmethod
+    def fromGridPoints(cls, gps, numDims):
+        """
+        Create the index for a list of grid points
+        @param gps: list of HashGridPoint
+        @param numDims: int, number of dimensions
+        @return: OverlappingSupportIndex
+        """
+        levels = np.ndarray((len(gps), numDims), dtype='int64')
+        indices = np.ndarray((len(gps), numDims), dtype='int64')
+        for i, gp in enumerate(gps):
+            for idim in xrange(numDims):
+                levels[i, idim] = gp.getLevel(idim)
+                indices[i, idim] = gp.getIndex(idim)
+        return cls(levels, indices)
+
+    def __getCandidatesDimx(self, level, index, idim):
+        """
+        Find the grid points which overlap with the given one in dimension
+        idim
+        @param level: int level
+        @param index: int index
+        @param idim: int dimension
+        @return: list of numpy arrays of positions
+        """
+        ans = []
+        # descendants: coordinates in the interior of the support
+        if level <= self.maxLevel:
+            shift = self.maxLevel - level
+            sortedCoords = self.__sortedCoords[idim]
+            start = np.searchsorted(sortedCoords, (index - 1) << shift, side='right')
+            end = np.searchsorted(sortedCoords, (index + 1) << shift, side='left')
+            ans.append(self.__order[idim][start:end])
+
+        # hierarchical ancestors
+        buckets = self.__buckets[idim]
+        for ancestorLevel in xrange(1, min(level, self.maxLevel + 1)):
+            key = ancestorLevel, (index >> (level - ancestorLevel)) | 1
+            if key in buckets:
+                ans.append(buckets[key])
+
+        return ans
+
+    def getOverlapping(self, level, index, excludeRelatives=False):
+        """
+        Find the grid points whose supports overlap with the support of
+        the given grid point
+        @param level: sequence of levels
+        @param index: sequence of indices
+        @param excludeRelatives: bool, exclude the grid point itself and
+        its hierarchical ancestors and descendants
+        @return: sorted numpy array of positions in the index
+        """
+        if self.size == 0:
+            return np.ndarray(0, dtype='int')
+
+        # take the candidates from the most selective dimension
+        candidates = None
+        for idim in xrange(self.numDims):
+            ans = self.__getCandidatesDimx(int(level[idim]), int(index[idim]), idim)
+            numCandidates = sum(len(x) for x in ans)
+            if candidates is None or numCandidates < len(candidates):
+                candidates = np.concatenate(ans) if len(ans) > 0 else np.ndarray(0)
+                candidates = candidates.astype('int')
+                if len(candidates) == 0:
+                    return candidates
+
+        # check all the dimensions
+        lq = np.array(level, dtype='int64')
+        iq = np.array(index, dtype='int64')
+        lc = self.levels[candidates, :]
+        ic = self.indices[candidates, :]
+        isAncestor = ((iq >> np.maximum(lq - lc, 0)) | 1) == ic
+        isDescendant = ((ic >> np.maximum(lc - lq, 0)) | 1) == iq
+        overlap = np.all(np.where(lc <= lq, isAncestor, isDescendant), axis=1)
+
+        if excludeRelatives:
+            ancestors = np.all((lc <= lq) & isAncestor, axis=1)
+            descendants = np.all((lc >= lq) & isDescendant, axis=1)
+            overlap &= ~(ancestors | descendants)
+
+        return np.sort(candidates[overlap])
@@ -665,8 +665,10 @@ def hierarchizeEvalHierToTop(grid, nodalValues):
     newGrid = grid.createGridOfEquivalentType()
     newGs = newGrid.getStorage()
     alpha = np.ndarray(1)
+    # position of the grid points in the new grid
+    permutation = np.zeros(gs.getSize(), dtype='int')
     # add root node to the new grid
-    newGs.insert(gs.getPoint(0))
+    permutation[0] = newGs.insert(gs.getPoint(0))
     alpha[0] = nodalValues[0]
 
     # sort points by levelsum
@@ -682,28 +684,114 @@ def hierarchizeEvalHierToTop(grid, nodalValues):
 
     # run over the grid points by level sum
     x = DataVector(numDims)
-    for levelsum in np.sort(ixs.keys()):
+    for levelsum in sorted(ixs.keys()):
         # add the grid points of the current level to the new grid
-        newixs = [None] * len(ixs[levelsum])
+        points = np.ndarray((len(ixs[levelsum]), numDims))
         for i, ix in enumerate(ixs[levelsum]):
-            newixs[i] = (newGs.insert(gs.getPoint(ix)), nodalValues[ix])
+            gp = gs.getPoint(ix)
+            permutation[ix] = newGs.insert(gp)
+            gs.getCoordinates(gp, x)
+            points[i, :] = x.array()
 
-        # update the alpha values
+        # update the alpha values of all the new grid points at once,
+        # their coefficients are still zero during the evaluation
         alpha = np.append(alpha, np.zeros(newGs.getSize() - len(alpha)))
-        newAlpha = np.copy(alpha)
-        for ix, nodalValue in newixs:
-            gs.getCoordinates(newGs.getPoint(ix), x)
-            alpha[ix] = nodalValue - evalSGFunction(newGrid, newAlpha, x.array())
+        newixs = permutation[ixs[levelsum]]
+        values = np.array([nodalValues[ix] for ix in ixs[levelsum]])
+        alpha[newixs] = values - evalSGFunctionMulti(newGrid, alpha, points)
 
     del x
 
     # store alphas according to indices of grid
-    ans = np.ndarray(gs.getSize())
-    for i in xrange(gs.getSize()):
-        j = newGs.getSequenceNumber(gs.getPoint(i))
-        ans[i] = alpha[j]
+    return alpha[permutation]
 
-    return ans
+
+def getHierarchicalDescendants(grid, ixs):
+    """
+    Collect the given grid points and all their hierarchical descendants
+    in the grid, which are the grid points lying in the supports of the
+    basis functions of the given ones.
+    @param grid: Grid
+    @param ixs: list of sequence numbers
+    @return: sorted numpy array of sequence numbers
+    """
+    gs = grid.getStorage()
+    numDims = gs.getDimension()
+    visited = set(ixs)
+    queue = list(visited)
+    while len(queue) > 0:
+        gp = HashGridPoint(gs.getPoint(queue.pop()))
+        for d in xrange(numDims):
+            level, index = gp.getLevel(d), gp.getIndex(d)
+            for getChild in (gp.getLeftChild, gp.getRightChild):
+                gp.set(d, level, index)
+                getChild(d)
+                if gs.isContaining(gp):
+                    ix = gs.getSequenceNumber(gp)
+                    if ix not in visited:
+                        visited.add(ix)
+                        queue.append(ix)
+            gp.set(d, level, index)
+
+    return np.array(sorted(visited), dtype="int")
+
+
+def updateHierarchicalCoefficients(grid, alpha, ixs, nodalDeltas):
+    """
+    Add the given values to the nodal values of the grid points ixs and
+    update the hierarchical coefficients accordingly. Just the coefficients
+    of the grid points ixs and of their hierarchical descendants change,
+    which are computed level-wise as in hierarchizeEvalHierToTop on a grid
+    containing just these grid points. Grids with B-spline basis functions
+    are hierarchized entirely.
+    @param grid: Grid
+    @param alpha: numpy array hierarchical coefficients
+    @param ixs: list of sequence numbers
+    @param nodalDeltas: numpy array, changes of the nodal values at ixs
+    @return: tuple (numpy array hierarchical coefficients, numpy array of
+    sequence numbers of the grid points whose coefficients changed)
+    """
+    gs = grid.getStorage()
+    numDims = gs.getDimension()
+    alpha = np.array(alpha, dtype="float")
+
+    if grid.getType() in bsplineGridTypes:
+        nodalValues = dehierarchize(grid, alpha)
+        nodalValues[ixs] += nodalDeltas
+        return hierarchize(grid, nodalValues), np.arange(gs.getSize())
+
+    affected = getHierarchicalDescendants(grid, ixs)
+    deltas = np.zeros(len(affected))
+    np.add.at(deltas, np.searchsorted(affected, ixs), nodalDeltas)
+
+    # the coefficients of the remaining grid points are zero
+    newGrid = grid.createGridOfEquivalentType()
+    newGs = newGrid.getStorage()
+    permutation = np.ndarray(len(affected), dtype="int")
+    points = np.ndarray((len(affected), numDims))
+    levelsums = np.ndarray(len(affected), dtype="int")
+    x = DataVector(numDims)
+    for i, ix in enumerate(affected):
+        gp = gs.getPoint(ix)
+        permutation[i] = newGs.insert(gp)
+        gs.getCoordinates(gp, x)
+        points[i, :] = x.array()
+        levelsums[i] = gp.getLevelSum()
+
+    # the grid points of one level sum do not influence each other
+    coeffs = np.zeros(len(affected))
+    newAlpha = np.zeros(len(affected))
+    for levelsum in np.unique(levelsums):
+        ixsLevel = np.where(levelsums == levelsum)[0]
+        newAlpha[permutation] = coeffs
+        values = evalSGFunctionMulti(newGrid, newAlpha, points[ixsLevel, :],
+                                     isConsistent=False)
+        coeffs[ixsLevel] = deltas[ixsLevel] - values
+
+    del x
+
+    alpha[affected] += coeffs
+    return alpha, affected
 
 def evalHierToTop(basis, grid, coeffs, gp, d):
     gs = grid.getStorage()
@@ -1,3 +1,8 @@
+from collections import OrderedDict
+import cPickle as pickle
+import gzip
+import os
+
 from strategies.QuadratureFactory import QuadratureFactory
 
 
@@ -18,6 +23,9 @@ class HashQuadrature(object):
             opQuad = QuadratureFactory.findQuadratureStrategyByMeasure(U)
         self.__opQuad = opQuad
 
+        # whether the bases of a type have a degree, by basis type
+        self.__hasDegree = {}
+
     def setDistributionAndTransformation(self, U, T):
         self._U = U
         self._T = T
@@ -25,38 +33,206 @@ class HashQuadrature(object):
     def setGridType(self, gridType):
         self._gridType = gridType
 
+    def setQuadratureMap(self, quadratureMap):
+        """
+        Replace the cache of the quadrature results, e.g. to share one
+        persistent cache between several strategies
+        @param quadratureMap: HashQuadratureMap
+        """
+        self._map = quadratureMap
+
+    def getQuadratureMap(self):
+        return self._map
+
     def quad(self, *args, **kws):
         return self.__opQuad.quad(*args, **kws)
 
+    def getContext(self, *bases):
+        """
+        Get the context of quadrature results, which distinguishes the
+        results of different strategies, grid types and basis degrees in
+        a shared cache
+        @param bases: SG++ Basis objects of the grid points
+        @return: tuple (name of the strategy, grid type, tuple of the
+        types and degrees of the bases)
+        """
+        bases_ = []
+        for basis in bases:
+            basisType = type(basis)
+            if basisType not in self.__hasDegree:
+                self.__hasDegree[basisType] = hasattr(basis, "getDegree")
+            degree = basis.getDegree() if self.__hasDegree[basisType] else None
+            bases_.append((basisType.__name__, degree))
+        return self.__class__.__name__, self._gridType, tuple(bases_)
+
 
 # -----------------------------------------------------------------
 class HashQuadratureMap(object):
+    """
+    Cache for quadrature results with a bounded number of entries. If the
+    cache is full, the least recently used entry is removed.
 
-    def __init__(self):
+    The keys consist of an integer id of the distribution and the context
+    of the results (see HashQuadrature.getContext), which is assigned once
+    per string representation of the distribution and context, and packed
+    integer codes of the (level, index) pairs of the grid points. The cache
+    can be stored on disk and restored in later runs.
+    """
+
+    # version of the file format, files of other versions are not loaded
+    FILE_VERSION = 2
+
+    def __init__(self, maxSize=10 ** 6, filename=None):
         """
         Constructor
+        @param maxSize: int, maximal number of entries, None means no limit
+        @param filename: string, file the cache is stored in; if it exists,
+        the cache is restored from it
+        """
+        self._map = OrderedDict()
+        self.maxSize = maxSize
+        self.filename = filename
+
+        # ids of the distributions and contexts by the string
+        # representation of the distribution and the context
+        self.__distIds = {}
+        # the string representation is just computed once per distribution
+        # object and context: (id(dist), context) -> (dist, id), the
+        # distributions are kept alive, such that their ids are not reused
+        self.__distIdsByObject = {}
+
+        # statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if filename is not None and os.path.exists(filename):
+            self.load(filename)
+
+    def getDistributionId(self, dist, context=None):
         """
-        self._map = {}
+        Get the id of a distribution in a context
+        @param dist: Dist
+        @param context: hashable and picklable context of the results,
+        e.g. the tuple returned by HashQuadrature.getContext
+        @return: int
+        """
+        key = id(dist), context
+        if key not in self.__distIdsByObject:
+            self.__distIdsByObject[key] = \
+                dist, self.__getDistributionIdByName((str(dist), context))
+        return self.__distIdsByObject[key][1]
+
+    def __getDistributionIdByName(self, name):
+        if name not in self.__distIds:
+            self.__distIds[name] = len(self.__distIds)
+        return self.__distIds[name]
 
-    def getKey(self, dist, gps, d=None):
+    def getKey(self, dist, gps, d=None, context=None):
         """
         Generates a unique key for a given list of grid points
+        @param dist: Dist
         @param gps: list of HashGridPoint
         @param d: int dimension
+        @param context: context of the result, see getDistributionId
         """
         if d is None:
-            return tuple([str(dist)] + [(gp.getLevel(d), gp.getIndex(d))
-                                        for gp in gps
-                                        for d in xrange(gp.getDimension())])
+            return tuple([self.getDistributionId(dist, context)] +
+                         [(gp.getLevel(d) << 32) | gp.getIndex(d)
+                          for gp in gps
+                          for d in xrange(gp.getDimension())])
         else:
-            return tuple([str(dist)] + [(gp.getLevel(d), gp.getIndex(d))
-                                        for gp in gps])
+            return tuple([self.getDistributionId(dist, context)] +
+                         [(gp.getLevel(d) << 32) | gp.getIndex(d)
+                          for gp in gps])
 
     def __getitem__(self, key):
-        return self._map[key]
+        value = self._map.pop(key)
+        # mark the entry as most recently used
+        self._map[key] = value
+        self.hits += 1
+        return value
 
     def __setitem__(self, key, value):
+        if key in self._map:
+            del self._map[key]
+        else:
+            self.misses += 1
         self._map[key] = value
 
+        if self.maxSize is not None:
+            while len(self._map) > self.maxSize:
+                self._map.popitem(last=False)
+                self.evictions += 1
+
     def __contains__(self, key):
         return key in self._map
+
+    def __len__(self):
+        return len(self._map)
+
+    def clear(self):
+        self._map.clear()
+
+    def getStatistics(self):
+        """
+        @return: dictionary with the number of entries, the number of
+        restored values (hits), the number of newly stored values (misses)
+        and the number of removed entries
+        """
+        return {'size': len(self._map),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions}
+
+    def save(self, filename=None):
+        """
+        Store the cache in a file
+        @param filename: string, default is the file given in the constructor
+        """
+        if filename is None:
+            filename = self.filename
+        if filename is None:
+            raise AttributeError("HashQuadratureMap - save: no file name given")
+
+        fd = gzip.open(filename, 'wb')
+        try:
+            pickle.dump({'version': self.FILE_VERSION,
+                         'distributions': self.__distIds,
+                         'items': self._map.items()},
+                        fd, pickle.HIGHEST_PROTOCOL)
+        finally:
+            fd.close()
+
+    def load(self, filename):
+        """
+        Restore the entries of a cache stored in a file. The ids of the
+        distributions and contexts of the file are mapped to the ones of
+        this cache.
+        @param filename: string
+        """
+        fd = gzip.open(filename, 'rb')
+        try:
+            data = pickle.load(fd)
+        finally:
+            fd.close()
+
+        # older files do not contain the contexts of the results, such that
+        # results of different grid types and strategies cannot be told apart
+        if not isinstance(data, dict) or data.get('version') != self.FILE_VERSION:
+            raise ValueError("HashQuadratureMap - load: %s has an incompatible "
+                             "file format, remove it to recompute the results" %
+                             filename)
+
+        distIds = {}
+        for name, distId in data['distributions'].items():
+            distIds[distId] = self.__getDistributionIdByName(name)
+
+        for key, value in data['items']:
+            if isinstance(key, tuple) and len(key) > 0 and key[0] in distIds:
+                key = (distIds[key[0]],) + key[1:]
+            self._map[key] = value
+
+        if self.maxSize is not None:
+            while len(self._map) > self.maxSize:
+                self._map.popitem(last=False)
@@ -5,7 +5,10 @@ Created on Aug 6, 2014
 """
 from pysgpp.extensions.datadriven.uq.quadrature.HashQuadrature import HashQuadrature
 import numpy as np
+from scipy.sparse import csr_matrix
 from pysgpp.extensions.datadriven.uq.operations.sparse_grid import getBasis
+from pysgpp.extensions.datadriven.uq.quadrature.sparse_assembly import UniqueLevelIndex, \
+    getOverlappingPairs, getOverlappingGridPoints
 
 
 class BilinearQuadratureStrategy(HashQuadrature):
@@ -13,13 +16,13 @@ class BilinearQuadratureStrategy(HashQuadrature):
     Generic object for quadrature strategies
     """
 
-    def hasValue(self, gpi, gpj, d):
-        if len(self._U) < d:
+    def hasValue(self, gpi, gpj, d, bases=()):
+        if d < len(self._U):
             U = self._U[d]
         else:
             U = self._U[-1]
 
-        key = self._map.getKey(U, [gpi, gpj], d)
+        key = self._map.getKey(U, [gpi, gpj], d, self.getContext(*bases))
         if key in self._map:
             return True, key
         return False, key
@@ -42,23 +45,58 @@ class BilinearQuadratureStrategy(HashQuadrature):
 
         return A, err
 
-    def computeBilinearFormByList(self, gs, gpsi, basisi, gpsj, basisj):
+    def computeBilinearFormByList(self, gs, gpsi, basisi, gpsj, basisj,
+                                  sparse=False):
         """
-        Compute bilinear form for two lists of grid points
+        Compute bilinear form for two lists of grid points. The one
+        dimensional factors are computed once for every combination of
+        (level, index) pairs with overlapping supports, all the other
+        entries vanish.
         @param gs: HashGridStorage
         @param gpsi: list of HashGridPoint
         @param basisi: SG++ basis for grid indices gpsi
         @param gpsj: list of HashGridPoint
         @param basisj: SG++ basis for grid indices gpsj
-        @return: numpy array
+        @param sparse: bool, return a scipy.sparse.csr_matrix
+        @return: numpy array or scipy.sparse.csr_matrix
         """
-        A = np.ndarray((len(gpsi), len(gpsj)))
+        if len(gpsi) == 0 or len(gpsj) == 0:
+            A = csr_matrix((len(gpsi), len(gpsj)))
+            return (A if sparse else A.toarray()), 0.
+
+        # all combinations are considered for B-splines (see UniqueLevelIndex)
+        ui = UniqueLevelIndex(gs, gpsi, self._gridType)
+        uj = UniqueLevelIndex(gs, gpsj, self._gridType)
+
+        pairs, values = [], []
         err = 0.
-        # run over all rows
-        for i, gpi in enumerate(gpsi):
-            b, erri = self.computeBilinearFormByRow(gs, gpi, basisi, gpsj, basisj)
-            A[i, :] = b
-            err += erri
+        for d in xrange(ui.dim):
+            a, b = getOverlappingPairs(ui, uj, d)
+            val = np.ndarray(len(a))
+            erri = np.ndarray(len(a))
+            for k in xrange(len(a)):
+                gpi = gpsi[ui.representatives[d][a[k]]]
+                gpj = gpsj[uj.representatives[d][b[k]]]
+                val[k], erri[k] = self.getBilinearFormEntryDimx(gs, gpi, basisi,
+                                                                gpj, basisj, d)
+
+            # every factor contributes to the error of all the entries
+            # it appears in
+            err += np.sum(erri * ui.counts[d][a] * uj.counts[d][b])
+
+            nonzero = val != 0
+            pairs.append((a[nonzero], b[nonzero]))
+            values.append(val[nonzero])
+
+        # assemble the nonzero entries
+        rows, cols, positions = getOverlappingGridPoints(ui, uj, pairs)
+        data = np.ones(len(rows))
+        for d in xrange(ui.dim):
+            data *= values[d][positions[d]]
+
+        A = csr_matrix((data, (rows, cols)), shape=(len(gpsi), len(gpsj)))
+        if not sparse:
+            A = A.toarray()
         return A, err
 
     def computeBilinearFormByRow(self, gs, gpi, basisi, gpsj, basisj):
@@ -100,14 +138,7 @@ class BilinearQuadratureStrategy(HashQuadrature):
 
         # run over all dimensions
         for d in xrange(gpi.getDimension()):
-            # compute linear form for one entry
-            available, keyd = self.hasValue(gpi, gpj, d)
-            if not available:
-                val, erri = self.computeBilinearFormEntry(gs, gpi, basisi, gpj, basisj, d)
-                # store value
-                self._map[keyd] = val, erri
-            else:
-                val, erri = self._map[keyd]
+            val, erri = self.getBilinearFormEntryDimx(gs, gpi, basisi, gpj, basisj, d)
 
             # collect results
             ans *= val
@@ -115,6 +146,28 @@ class BilinearQuadratureStrategy(HashQuadrature):
 
         return ans, err
 
+    def getBilinearFormEntryDimx(self, gs, gpi, basisi, gpj, basisj, d):
+        """
+        Restore the one dimensional factor of the bilinear form of two
+        grid points in dimension d if it is available. If not, forward
+        the result to the computation method.
+        @param gs: HashGridStorage
+        @param gpi: HashGridPoint
+        @param basisi: SG++ Basis
+        @param gpj: HashGridPoint
+        @param basisj: SG++ Basis
+        @param d: int dimension
+        """
+        available, keyd = self.hasValue(gpi, gpj, d, (basisi, basisj))
+        if not available:
+            val, err = self.computeBilinearFormEntry(gs, gpi, basisi, gpj, basisj, d)
+            # store value
+            self._map[keyd] = val, err
+        else:
+            val, err = self._map[keyd]
+
+        return val, err
+
 
     def computeBilinearFormEntry(self, gs, gpi, basisi, gpj, basisj, d):
         """
@@ -25,7 +25,8 @@ class UniformQuadratureStrategy(BilinearQuadratureStrategy):
         Generates a unique key for a given list of grid points
         @param gps: list of HashGridPoint
         """
-        return tuple([(gp.getLevel(d), gp.getIndex(d)) for gp in gps for d in xrange(gp.getDimension())])
+        return tuple([self.__class__.__name__] +
+                     [(gp.getLevel(d), gp.getIndex(d)) for gp in gps for d in xrange(gp.getDimension())])
 
     def computeBilinearForm(self, grid):
         """
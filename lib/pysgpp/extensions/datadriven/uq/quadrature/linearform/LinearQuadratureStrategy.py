@@ -5,6 +5,7 @@ Created on Aug 6, 2014
 """
 from pysgpp.extensions.datadriven.uq.operations import getBasis
 from pysgpp.extensions.datadriven.uq.quadrature import HashQuadrature
+from pysgpp.extensions.datadriven.uq.quadrature.sparse_assembly import UniqueLevelIndex
 import numpy as np
 
 
@@ -13,13 +14,13 @@ class LinearQuadratureStrategy(HashQuadrature):
     Generic object for quadrature strategies
     """
 
-    def hasValue(self, gpi, d):
-        if len(self._U) < d:
+    def hasValue(self, gpi, d, bases=()):
+        if d < len(self._U):
             U = self._U[d]
         else:
             U = self._U[-1]
 
-        key = self._map.getKey(U, [gpi], d)
+        key = self._map.getKey(U, [gpi], d, self.getContext(*bases))
         if key in self._map:
             return True, key
         return False, key
@@ -32,15 +33,8 @@ class LinearQuadratureStrategy(HashQuadrature):
         """
         gs = grid.getStorage()
         basis = getBasis(grid)
-        v = np.ndarray(gs.size())
-        err = 0.
-        # run over all rows
-        for i in xrange(gs.size()):
-            gpi = gs.getPoint(i)
-            # compute bilinear form for one entry
-            v[i], erri = self.getLinearFormEntry(gs, gpi, basis)
-            err += erri
-        return v, err
+        gps = [gs.getPoint(i) for i in xrange(gs.getSize())]
+        return self.computeLinearFormByList(gs, gps, basis)
 
     def computeLinearFormByList(self, gs, gps, basis):
         """
@@ -50,16 +44,21 @@ class LinearQuadratureStrategy(HashQuadrature):
         @param basis: SG++ basis for grid indices gpsi
         @return: numpy array
         """
+        # the one dimensional factors just depend on the unique
+        # (level, index) pairs, compute them once
+        u = UniqueLevelIndex(gs, gps, self._gridType, fullSupport=True)
         b = np.ones(len(gps))
         err = 0.
-        # run over all items
-        for i, gpi in enumerate(gps):
-            # compute linear form for one entry
-            value, erri = self.getLinearFormEntry(gs, gpi, basis)
+        # run over all dimensions
+        for d in xrange(u.dim):
+            val = np.ndarray(len(u.representatives[d]))
+            erri = np.ndarray(len(u.representatives[d]))
+            for k, ix in enumerate(u.representatives[d]):
+                val[k], erri[k] = self.getLinearFormEntryDimx(gs, gps[ix], basis, d)
 
             # collect results
-            b[i] = value
-            err += erri
+            b *= val[u.inverse[d]]
+            err += np.sum(erri * u.counts[d])
         return b, err
 
     def getLinearFormEntry(self, gs, gp, basis):
@@ -74,14 +73,7 @@ class LinearQuadratureStrategy(HashQuadrature):
 
         # run over all dimensions
         for d in xrange(gp.getDimension()):
-            # compute linear form for one entry
-            available, keyd = self.hasValue(gp, d)
-            if not available:
-                val, erri = self.computeLinearFormEntry(gs, gp, basis, d)
-                # store value
-                self._map[keyd] = val, erri
-            else:
-                val, erri = self._map[keyd]
+            val, erri = self.getLinearFormEntryDimx(gs, gp, basis, d)
 
             # collect results
             ans *= val
@@ -89,6 +81,26 @@ class LinearQuadratureStrategy(HashQuadrature):
 
         return ans, err
 
+    def getLinearFormEntryDimx(self, gs, gp, basis, d):
+        """
+        Restore the one dimensional factor of the linear form of a grid
+        point in dimension d if it is available. If not, forward the
+        result to the computation method.
+        @param gs: HashGridStorage
+        @param gp: HashGridPoint
+        @param basis: SG++ Basis
+        @param d: int dimension
+        """
+        available, keyd = self.hasValue(gp, d, (basis,))
+        if not available:
+            val, err = self.computeLinearFormEntry(gs, gp, basis, d)
+            # store value
+            self._map[keyd] = val, err
+        else:
+            val, err = self._map[keyd]
+
+        return val, err
+
     def computeLinearFormEntry(self, gs, gp, basis, d):
         """
         Compute the bilinear form of one grid point with another one
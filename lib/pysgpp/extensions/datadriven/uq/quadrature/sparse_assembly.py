@@ -0,0 +1,238 @@
+"""
+Tools for the sparse assembly of linear, bilinear and trilinear forms of
+lists of grid points.
+
+The forms factorize over the dimensions. In every dimension, the one
+dimensional factors just depend on the unique (level, index) pairs of
+the grid points and vanish if the supports of the basis functions do not
+overlap. Therefore, the factors are computed once for each combination of
+unique pairs with overlapping supports and the forms are assembled from
+them by vectorized lookups.
+"""
+import numpy as np
+
+from pysgpp.extensions.datadriven.uq.operations.sparse_grid import getBoundsOfSupport, \
+    bsplineGridTypes
+
+
+def getLevelIndexArrays(gps):
+    """
+    Collect the levels and indices of a list of grid points
+    @param gps: list of HashGridPoint
+    @return: tuple of numpy arrays (levels, indices) of shape (len(gps), dim)
+    """
+    dim = gps[0].getDimension() if len(gps) > 0 else 0
+    levels = np.ndarray((len(gps), dim), dtype='int64')
+    indices = np.ndarray((len(gps), dim), dtype='int64')
+    for i, gp in enumerate(gps):
+        for d in xrange(dim):
+            levels[i, d] = gp.getLevel(d)
+            indices[i, d] = gp.getIndex(d)
+    return levels, indices
+
+
+class UniqueLevelIndex(object):
+    """
+    Unique one dimensional (level, index) pairs of a list of grid points
+    and the supports of the corresponding basis functions
+    """
+
+    def __init__(self, gs, gps, gridType, fullSupport=None):
+        """
+        Constructor
+        @param gs: HashGridStorage
+        @param gps: list of HashGridPoint
+        @param gridType: grid type of the basis functions
+        @param fullSupport: bool, assume that all basis functions are
+        supported on [0, 1]; default is True for B-spline grids, as the
+        bounds of their supports are just approximations, and False else
+        """
+        if fullSupport is None:
+            fullSupport = gridType in bsplineGridTypes
+
+        levels, indices = getLevelIndexArrays(gps)
+        self.size, self.dim = levels.shape
+
+        # per dimension: position of a grid point representing each unique
+        # pair, mapping from the grid points to the unique pairs, number of
+        # grid points per unique pair, levels and supports of the pairs
+        self.representatives = []
+        self.inverse = []
+        self.counts = []
+        self.levels = []
+        self.lower = []
+        self.upper = []
+
+        for d in xrange(self.dim):
+            keys = levels[:, d] * 2 ** 32 + indices[:, d]
+            _, first, inverse = np.unique(keys, return_index=True,
+                                          return_inverse=True)
+            self.representatives.append(first)
+            self.inverse.append(inverse)
+            self.counts.append(np.bincount(inverse))
+            self.levels.append(levels[first, d])
+
+            if fullSupport:
+                self.lower.append(np.zeros(len(first)))
+                self.upper.append(np.ones(len(first)))
+            else:
+                bounds = np.array([getBoundsOfSupport(gs,
+                                                      int(levels[ix, d]),
+                                                      int(indices[ix, d]),
+                                                      gridType)
+                                   for ix in first], dtype='float')
+                self.lower.append(bounds[:, 0])
+                self.upper.append(bounds[:, 1])
+
+
+def expandRanges(starts, ends):
+    """
+    Enumerate the ranges [starts[i], ends[i])
+    @param starts: numpy array of int
+    @param ends: numpy array of int
+    @return: tuple of numpy arrays (range number, position)
+    """
+    counts = np.maximum(ends - starts, 0)
+    owners = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(np.sum(counts)) - np.repeat(np.cumsum(counts) - counts,
+                                                    counts)
+    return owners, np.repeat(starts, counts) + offsets
+
+
+def expandGroups(inverseA, countsA, inverseB, countsB, groupsA, groupsB):
+    """
+    Enumerate all pairs of items (r, c) with inverseA[r] == groupsA[p] and
+    inverseB[c] == groupsB[p]
+    @param inverseA: numpy array, group of each item of the first list
+    @param countsA: numpy array, number of items per group of the first list
+    @param inverseB: numpy array, group of each item of the second list
+    @param countsB: numpy array, number of items per group of the second list
+    @param groupsA: numpy array of groups of the first list
+    @param groupsB: numpy array of groups of the second list
+    @return: tuple of numpy arrays (r, c, p)
+    """
+    orderA = np.argsort(inverseA, kind='mergesort')
+    orderB = np.argsort(inverseB, kind='mergesort')
+    startsA = np.cumsum(countsA) - countsA
+    startsB = np.cumsum(countsB) - countsB
+
+    nB = countsB[groupsB]
+    p, t = expandRanges(np.zeros(len(groupsA), dtype='int'),
+                        countsA[groupsA] * nB)
+    r = orderA[startsA[groupsA[p]] + t // nB[p]]
+    c = orderB[startsB[groupsB[p]] + t % nB[p]]
+    return r, c, p
+
+
+def lookup(keys, query):
+    """
+    Find the positions of the query values in a sorted array
+    @param keys: sorted numpy array
+    @param query: numpy array
+    @return: tuple of numpy arrays (positions, found)
+    """
+    if len(keys) == 0:
+        return np.zeros(len(query), dtype='int'), np.zeros(len(query), dtype='bool')
+    positions = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+    return positions, keys[positions] == query
+
+
+def getOverlappingPairs(u, v, d):
+    """
+    Find the unique pairs of two lists of grid points whose supports
+    overlap in dimension d. The unique pairs of v are sorted by the lower
+    bound of their supports for each level separately, such that the
+    candidates for each pair of u are found by bisection.
+    @param u: UniqueLevelIndex
+    @param v: UniqueLevelIndex
+    @param d: int dimension
+    @return: tuple of numpy arrays (a, b) of unique pairs of u and v
+    """
+    lowerA, upperA = u.lower[d], u.upper[d]
+    lowerB, upperB = v.lower[d], v.upper[d]
+    ans_a, ans_b = [], []
+    for level in np.unique(v.levels[d]):
+        group = np.where(v.levels[d] == level)[0]
+        order = group[np.argsort(lowerB[group], kind='mergesort')]
+        lower = lowerB[order]
+        width = np.max(upperB[order] - lower)
+
+        # candidates start right of lowerA - width and end left of upperA
+        starts = np.searchsorted(lower, lowerA - width - 1e-14, side='left')
+        ends = np.searchsorted(lower, upperA, side='left')
+        a, positions = expandRanges(starts, ends)
+        b = order[positions]
+
+        overlap = upperB[b] > lowerA[a]
+        ans_a.append(a[overlap])
+        ans_b.append(b[overlap])
+
+    if len(ans_a) == 0:
+        return np.ndarray(0, dtype='int'), np.ndarray(0, dtype='int')
+    return np.concatenate(ans_a), np.concatenate(ans_b)
+
+
+def getOverlappingTriples(uk, ui, uj, d, pairski, pairskj):
+    """
+    Find the unique triples of three lists of grid points whose supports
+    overlap in dimension d
+    @param uk: UniqueLevelIndex
+    @param ui: UniqueLevelIndex
+    @param uj: UniqueLevelIndex
+    @param d: int dimension
+    @param pairski: overlapping pairs of uk and ui in dimension d
+    @param pairskj: overlapping pairs of uk and uj in dimension d
+    @return: tuple of numpy arrays (a, b, c) of unique pairs of uk, ui and uj
+    """
+    nk = len(uk.counts[d])
+    groups = np.arange(nk)
+    x, y, _ = expandGroups(pairski[0], np.bincount(pairski[0], minlength=nk),
+                           pairskj[0], np.bincount(pairskj[0], minlength=nk),
+                           groups, groups)
+    a, b, c = pairski[0][x], pairski[1][x], pairskj[1][y]
+
+    lower = np.maximum(uk.lower[d][a], np.maximum(ui.lower[d][b], uj.lower[d][c]))
+    upper = np.minimum(uk.upper[d][a], np.minimum(ui.upper[d][b], uj.upper[d][c]))
+    overlap = lower < upper
+    return a[overlap], b[overlap], c[overlap]
+
+
+def getOverlappingGridPoints(u, v, pairs):
+    """
+    Find the pairs of grid points which are contained in one of the
+    given unique pairs in every dimension
+    @param u: UniqueLevelIndex
+    @param v: UniqueLevelIndex
+    @param pairs: list of tuples (a, b) of unique pairs per dimension
+    @return: tuple (r, c, positions), where r and c are the positions of
+    the grid points in the lists and positions is a list containing the
+    index of the matching unique pair for every dimension
+    """
+    if u.size == 0 or v.size == 0 or any(len(a) == 0 for a, _ in pairs):
+        empty = np.ndarray(0, dtype='int')
+        return empty, empty, [empty] * len(pairs)
+
+    # start with the dimension which produces the least candidates
+    sizes = [np.sum(u.counts[d][a] * v.counts[d][b])
+             for d, (a, b) in enumerate(pairs)]
+    d0 = np.argmin(sizes)
+    a, b = pairs[d0]
+    r, c, p = expandGroups(u.inverse[d0], u.counts[d0],
+                           v.inverse[d0], v.counts[d0],
+                           a, b)
+    positions = [None] * len(pairs)
+    positions[d0] = p
+
+    # filter the candidates by the remaining dimensions
+    for d, (a, b) in enumerate(pairs):
+        if d == d0:
+            continue
+        nb = len(v.counts[d])
+        keys = a * nb + b
+        order = np.argsort(keys)
+        ixs, found = lookup(keys[order], u.inverse[d][r] * nb + v.inverse[d][c])
+        r, c = r[found], c[found]
+        positions = [ps if ps is None else ps[found] for ps in positions]
+        positions[d] = order[ixs[found]]
+
+    return r, c, positions
@@ -4,36 +4,47 @@ Created on Aug 6, 2014
 @author: franzefn
 """
 import numpy as np
+from scipy.sparse import csr_matrix
 
 from pysgpp import DataMatrix, DataVector
 from pysgpp.extensions.datadriven.uq.quadrature.HashQuadrature import HashQuadrature
+from pysgpp.extensions.datadriven.uq.quadrature.sparse_assembly import UniqueLevelIndex, \
+    getOverlappingPairs, getOverlappingTriples, getOverlappingGridPoints, \
+    expandGroups, lookup
 
 
 class TrilinearQuadratureStrategy(HashQuadrature):
     """
     Generic object for quadrature strategies
     """
-    def hasValue(self, gpk, gpi, gpj, d):
-        if len(self._U) < d:
+    def hasValue(self, gpk, gpi, gpj, d, bases=()):
+        if d < len(self._U):
             U = self._U[d]
         else:
             U = self._U[-1]
 
-        key = self._map.getKey(U, [gpk, gpi, gpj], d)
-        if key in self._map:
-            return True, key
-        key = self._map.getKey(U, [gpk, gpj, gpi], d)
+        key = self._map.getKey(U, [gpk, gpi, gpj], d, self.getContext(*bases))
         if key in self._map:
             return True, key
+        # the bases of the swapped grid points are swapped as well
+        swappedBases = tuple(bases[:1]) + tuple(bases[1:][::-1])
+        swappedKey = self._map.getKey(U, [gpk, gpj, gpi], d,
+                                      self.getContext(*swappedBases))
+        if swappedKey in self._map:
+            return True, swappedKey
         return False, key
 
     def computeTrilinearFormByList(self,
                                    gs,
                                    gpsk, basisk, alphak,
                                    gpsi, basisi,
-                                   gpsj, basisj):
+                                   gpsj, basisj,
+                                   sparse=False):
         """
-        Compute trilinear form for two lists of grid points
+        Compute trilinear form for two lists of grid points. The one
+        dimensional factors are computed once for every combination of
+        (level, index) pairs with overlapping supports, all the other
+        contributions vanish.
         @param gs: HashGridStorage
         @param gpsk: list of HashGridPoint
         @param basisk: SG++ basis for grid indices gpsk
@@ -42,26 +53,78 @@ class TrilinearQuadratureStrategy(HashQuadrature):
         @param basisi: SG++ basis for grid indices gpsi
         @param gpsj: list of HashGridPoint
         @param basisj: SG++ basis for grid indices gpsj
-        @return: DataMatrix
+        @param sparse: bool, return a scipy.sparse.csr_matrix
+        @return: numpy array or scipy.sparse.csr_matrix
         """
-        A = np.ndarray((len(gpsi), len(gpsj)))
+        if len(gpsi) == 0 or len(gpsj) == 0 or len(gpsk) == 0:
+            A = csr_matrix((len(gpsi), len(gpsj)))
+            return (A if sparse else A.toarray()), 0.
+
+        # all combinations are considered for B-splines (see UniqueLevelIndex)
+        uk = UniqueLevelIndex(gs, gpsk, self._gridType)
+        ui = UniqueLevelIndex(gs, gpsi, self._gridType)
+        uj = UniqueLevelIndex(gs, gpsj, self._gridType)
+
+        pairski, pairskj, keys, values = [], [], [], []
         err = 0.
-        # run over all rows
-        for i, gpi in enumerate(gpsi):
-            # run over all columns
-            for j, gpj in enumerate(gpsj):
-                # run over all gpks
-                b, erri = self.computeTrilinearFormByRow(gs,
-                                                         gpsk, basisk,
-                                                         gpi, basisi,
-                                                         gpj, basisj)
-                # get the overall contribution in the current dimension
-                A[i, j] = alphak.dot(b)
-
-                # error statistics
-                err += erri
+        for d in xrange(uk.dim):
+            pairski.append(getOverlappingPairs(uk, ui, d))
+            pairskj.append(getOverlappingPairs(uk, uj, d))
+            a, b, c = getOverlappingTriples(uk, ui, uj, d,
+                                            pairski[d], pairskj[d])
+            val = np.ndarray(len(a))
+            erri = np.ndarray(len(a))
+            for n in xrange(len(a)):
+                gpk = gpsk[uk.representatives[d][a[n]]]
+                gpi = gpsi[ui.representatives[d][b[n]]]
+                gpj = gpsj[uj.representatives[d][c[n]]]
+                val[n], erri[n] = self.getTrilinearFormEntryDimx(gs,
+                                                                 gpk, basisk,
+                                                                 gpi, basisi,
+                                                                 gpj, basisj,
+                                                                 d)
+
+            # every factor contributes to the error of all the entries
+            # it appears in
+            err += np.sum(erri * uk.counts[d][a] * ui.counts[d][b] * uj.counts[d][c])
+
+            # store the factors sorted by the keys of the triples
+            key = self.__getKeys(ui, uj, d, a, b, c)
+            order = np.argsort(key)
+            keys.append(key[order])
+            values.append(val[order])
+
+        # find the triples of grid points whose supports overlap in
+        # all dimensions: combine the overlapping pairs with the same
+        # grid point k
+        ks, iks, _ = getOverlappingGridPoints(uk, ui, pairski)
+        ks2, jks, _ = getOverlappingGridPoints(uk, uj, pairskj)
+        groups = np.arange(uk.size)
+        x, y, _ = expandGroups(ks, np.bincount(ks, minlength=uk.size),
+                               ks2, np.bincount(ks2, minlength=uk.size),
+                               groups, groups)
+        k, i, j = ks[x], iks[x], jks[y]
+
+        data = np.asarray(alphak, dtype='float')[k]
+        for d in xrange(uk.dim):
+            key = self.__getKeys(ui, uj, d,
+                                 uk.inverse[d][k],
+                                 ui.inverse[d][i],
+                                 uj.inverse[d][j])
+            ixs, found = lookup(keys[d], key)
+            data = data[found] * values[d][ixs[found]]
+            k, i, j = k[found], i[found], j[found]
+
+        A = csr_matrix((data, (i, j)), shape=(len(gpsi), len(gpsj)))
+        if not sparse:
+            A = A.toarray()
         return A, err
 
+    def __getKeys(self, ui, uj, d, a, b, c):
+        ni = len(ui.counts[d])
+        nj = len(uj.counts[d])
+        return (a * ni + b) * nj + c
+
     def computeTrilinearFormByRow(self,
                                   gs,
                                   gpsk, basisk,
@@ -111,20 +174,11 @@ class TrilinearQuadratureStrategy(HashQuadrature):
 
         # run over all dimensions
         for d in xrange(gpi.getDimension()):
-            # compute linear form for one entry
-            available, keyd = self.hasValue(gpk, gpi, gpj, d)
-            if not available:
-                # there is no information available for the current combination
-                # of grid points
-                val, erri = self.computeTrilinearFormEntry(gs,
-                                                           gpk, basisk,
-                                                           gpi, basisi,
-                                                           gpj, basisj,
-                                                           d)
-                # store value
-                self._map[keyd] = val, erri
-            else:
-                val, erri = self._map[keyd]
+            val, erri = self.getTrilinearFormEntryDimx(gs,
+                                                       gpk, basisk,
+                                                       gpi, basisi,
+                                                       gpj, basisj,
+                                                       d)
 
             # collect results
             ans *= val
@@ -132,6 +186,41 @@ class TrilinearQuadratureStrategy(HashQuadrature):
 
         return ans, err
 
+    def getTrilinearFormEntryDimx(self,
+                                  gs,
+                                  gpk, basisk,
+                                  gpi, basisi,
+                                  gpj, basisj,
+                                  d):
+        """
+        Restore the one dimensional factor of the trilinear form of three
+        grid points in dimension d if it is available. If not, forward the
+        result to the computation method.
+        @param gs: HashGridStorage
+        @param gpk: HashGridPoint
+        @param basisk: SG++ Basis
+        @param gpi: HashGridPoint
+        @param basisi: SG++ Basis
+        @param gpj: HashGridPoint
+        @param basisj: SG++ Basis
+        @param d: int dimension
+        """
+        available, keyd = self.hasValue(gpk, gpi, gpj, d, (basisk, basisi, basisj))
+        if not available:
+            # there is no information available for the current combination
+            # of grid points
+            val, err = self.computeTrilinearFormEntry(gs,
+                                                      gpk, basisk,
+                                                      gpi, basisi,
+                                                      gpj, basisj,
+                                                      d)
+            # store value
+            self._map[keyd] = val, err
+        else:
+            val, err = self._map[keyd]
+
+        return val, err
+
 
     def computeTrilinearFormEntry(self, gs, gpk, basisk, gpi, basisi, gpj, basisj, d):
         """
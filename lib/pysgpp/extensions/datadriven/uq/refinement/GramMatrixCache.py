@@ -0,0 +1,150 @@
+import numpy as np
+from scipy.sparse import csr_matrix, issparse
+
+from pysgpp.extensions.datadriven.uq.operations.sparse_grid import getBasis
+
+
+class GramMatrixCache(object):
+    """
+    Mass matrix A_ij = E[phi_i phi_j] and mean vector b_i = E[phi_i] of
+    the basis functions of a sparse grid. The entries are stored in the
+    order of the grid storage. When points are added to the grid, just
+    the rows of the new points are computed; the matrix is stored sparse
+    since most pairs of basis functions have disjoint supports.
+    """
+
+    def __init__(self, computeMassMatrix, computeMeanVector=None,
+                 diagonalOnly=False):
+        """
+        Constructor
+        @param computeMassMatrix: function (gs, gpsi, basisi, gpsj, basisj)
+        returning the tuple (matrix of shape (len(gpsi), len(gpsj)), error),
+        the matrix can be a numpy array or a scipy.sparse matrix
+        @param computeMeanVector: function (gs, gps, basis) returning the
+        tuple (vector of length len(gps), error) or None if the mean
+        vector is not needed
+        @param diagonalOnly: bool, store just the diagonal of the mass
+        matrix
+        """
+        self.__computeMassMatrix = computeMassMatrix
+        self.__computeMeanVector = computeMeanVector
+        self.__diagonalOnly = diagonalOnly
+        self.clear()
+
+    def clear(self):
+        self.__hashes = []
+        self.__rows = []
+        self.__cols = []
+        self.__values = []
+        self.__mean = np.ndarray(0)
+        self.__massMatrix = None
+
+    def getSize(self):
+        return len(self.__hashes)
+
+    def isUpToDate(self, grid):
+        """
+        Checks if the cache contains exactly the points of the grid. Just
+        the size and the last point are compared, use update to detect
+        any other change of the grid storage.
+        @param grid: Grid
+        @return: bool
+        """
+        gs = grid.getStorage()
+        n = self.getSize()
+        return gs.getSize() == n and \
+            (n == 0 or gs.getPoint(n - 1).getHash() == self.__hashes[-1])
+
+    def update(self, grid):
+        """
+        Adds the rows of the grid points which are not yet in the cache.
+        If the cached points are no prefix of the grid storage anymore
+        (e.g. after coarsening), the cache is rebuilt from scratch.
+        @param grid: Grid
+        @return: int, number of new grid points
+        """
+        if self.isUpToDate(grid):
+            return 0
+
+        gs = grid.getStorage()
+        n = self.getSize()
+        if gs.getSize() < n or \
+                any(gs.getPoint(i).getHash() != self.__hashes[i]
+                    for i in xrange(n)):
+            self.clear()
+            n = 0
+
+        gps = [gs.getPoint(i) for i in xrange(gs.getSize())]
+        newGps = gps[n:]
+        basis = getBasis(grid)
+
+        if self.__diagonalOnly:
+            ixs = np.arange(n, len(gps))
+            values = np.ndarray(len(newGps))
+            for i, gp in enumerate(newGps):
+                A, _ = self.__computeMassMatrix(gs, [gp], basis, [gp], basis)
+                values[i] = A[0, 0]
+            self.__append(ixs, ixs, values)
+        else:
+            # rows of the new points with respect to all the points
+            A, _ = self.__computeMassMatrix(gs, newGps, basis, gps, basis)
+            if issparse(A):
+                A = A.tocoo()
+                rows, cols, values = A.row.astype('int'), A.col, A.data
+            else:
+                rows, cols = np.nonzero(A)
+                values = A[rows, cols]
+            rows += n
+            self.__append(rows, cols, values)
+            # the columns of the new points follow from symmetry, the
+            # block of the new points with themselves is already complete
+            old = cols < n
+            self.__append(cols[old], rows[old], values[old])
+
+        if self.__computeMeanVector is not None:
+            b, _ = self.__computeMeanVector(gs, newGps, basis)
+            self.__mean = np.append(self.__mean, b)
+
+        self.__hashes += [gp.getHash() for gp in newGps]
+        self.__massMatrix = None
+
+        return len(newGps)
+
+    def __append(self, rows, cols, values):
+        self.__rows.append(rows)
+        self.__cols.append(cols)
+        self.__values.append(values)
+
+    def getMassMatrix(self):
+        """
+        @return: scipy.sparse.csr_matrix of shape (n, n)
+        """
+        if self.__massMatrix is None:
+            n = self.getSize()
+            if n == 0:
+                self.__massMatrix = csr_matrix((0, 0))
+            else:
+                self.__massMatrix = csr_matrix((np.concatenate(self.__values),
+                                                (np.concatenate(self.__rows),
+                                                 np.concatenate(self.__cols))),
+                                               shape=(n, n))
+                # collapse the collected blocks
+                coo = self.__massMatrix.tocoo()
+                self.__rows = [coo.row]
+                self.__cols = [coo.col]
+                self.__values = [coo.data]
+        return self.__massMatrix
+
+    def getDiagonal(self):
+        """
+        @return: numpy array with the diagonal of the mass matrix
+        """
+        return self.getMassMatrix().diagonal()
+
+    def getMeanVector(self):
+        """
+        @return: numpy array with the mean vector
+        """
+        if self.__computeMeanVector is None:
+            raise AttributeError("GramMatrixCache - getMeanVector: the mean vector is not computed")
+        return self.__mean
@@ -162,10 +162,8 @@ class RefinementManager(object):
         for i, t in enumerate(ts):
             # get surpluses
             alphas = knowledge.getAlpha(qoi, t, dtype)
-            # rank each admissible point
-            for j, gp in enumerate(data):
-                # run over all time steps for current grid point
-                v[j, i] = self._criterion.rank(grid, gp, alphas, params, t)
+            # rank all admissible points at once
+            v[:, i] = self._criterion.rankList(grid, data, alphas, params, t)
 
 #             # get the result
 #             r = np.zeros(self._admissibleSet.getSize())
@@ -337,9 +335,11 @@ class RefinementManager(object):
 #             plt.savefig('/home/franzefn/Desktop/tmp/var_atan_i%i.png' % gs.getSize())
 #             plt.close(fig)
 
-        # update admissible set
+        # update admissible set and the data of the refinement criterion
+        # which depends on the grid
         if not simulate:
             self._admissibleSet.update(grid, newGridPoints)
+            self._criterion.updateGrid(grid, newGridPoints)
 
         # make sure that I have collected all the new grid points
         assert len(newGridPoints) == gs.getSize() - n1
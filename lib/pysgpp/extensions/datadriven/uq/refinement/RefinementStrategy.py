@@ -8,12 +8,13 @@ from pysgpp.extensions.datadriven.uq.dists import J
 from pysgpp.extensions.datadriven.uq.plot.plot2d import plotDensity2d
 import matplotlib.pyplot as plt
 from pysgpp.extensions.datadriven.uq.operations.sparse_grid import getBasis, \
-    parents, evalSGFunction
+    parents, evalSGFunctionMulti
 from pysgpp.extensions.datadriven.uq.quadrature.bilinearform.BilinearGaussQuadratureStrategy import BilinearGaussQuadratureStrategy
 from pysgpp.extensions.datadriven.uq.quadrature.linearform.LinearGaussQuadratureStrategy import LinearGaussQuadratureStrategy
 from pysgpp.extensions.datadriven.uq.quadrature.trilinearform.TrilinearGaussQuadratureStrategy import TrilinearGaussQuadratureStrategy
 from pysgpp.extensions.datadriven.uq.dists.SGDEdist import SGDEdist
 from pysgpp.extensions.datadriven.uq.estimators.AnalyticEstimationStrategy import AnalyticEstimationStrategy
+from pysgpp.extensions.datadriven.uq.refinement.GramMatrixCache import GramMatrixCache
 
 
 class Ranking(object):
@@ -36,6 +37,94 @@ class Ranking(object):
 
         return self._ranking[gp.getHash()]
 
+    def rankList(self, grid, gps, alphas, params, t=0):
+        """
+        Rank a list of grid points
+        @param grid: Grid
+        @param gps: list of HashGridPoints
+        @param alphas: numpy array coefficients
+        @param params: ParameterSet
+        @param t: time step
+        @return: numpy array, contains the ranking for the given grid points
+        """
+        return np.array([self.rank(grid, gp, alphas, params, t)
+                         for gp in gps], dtype='float')
+
+    def updateGrid(self, grid, newGridPoints):
+        """
+        Is called by the RefinementManager after the grid has been refined
+        @param grid: Grid
+        @param newGridPoints: list of HashGridPoints which have been added
+        """
+        pass
+
+
+class GramMatrixRanking(Ranking):
+    """
+    Ranking based on the mass matrix and the mean vector of the basis
+    functions of the grid. Both are kept in a GramMatrixCache, which is
+    extended by the RefinementManager when the grid is refined, such that
+    the grid points are ranked at once by sparse matrix vector products.
+    """
+
+    def __init__(self):
+        super(GramMatrixRanking, self).__init__()
+        self._cache = None
+
+    def initCache(self, grid, params):
+        raise NotImplementedError
+
+    def updateList(self, grid, v, ixs):
+        raise NotImplementedError
+
+    def updateGrid(self, grid, newGridPoints):
+        if self._cache is not None:
+            self._cache.update(grid)
+
+    def rankList(self, grid, gps, alphas, params, t=0):
+        if self._cache is None:
+            self._cache = self.initCache(grid, params.activeParams())
+        self._cache.update(grid)
+
+        gs = grid.getStorage()
+        ixs = np.array([gs.getSequenceNumber(gp) for gp in gps], dtype='int')
+        return self.updateList(grid, alphas, ixs)
+
+    def update(self, grid, v, gpi, params, *args, **kws):
+        if self._cache is None:
+            self._cache = self.initCache(grid, params)
+        self._cache.update(grid)
+
+        ix = grid.getStorage().getSequenceNumber(gpi)
+        return self.updateList(grid, v, np.array([ix]))[0]
+
+
+def getCoordinatesAndPdf(grid, gps, params):
+    """
+    Evaluate the probability density at the given grid points
+    @param grid: Grid
+    @param gps: list of HashGridPoints
+    @param params: ParameterSet
+    @return: tuple (sequence numbers, coordinates in the unit hypercube,
+    values of the probability density)
+    """
+    gs = grid.getStorage()
+    ixs = np.ndarray(len(gps), dtype='int')
+    ps = np.ndarray((len(gps), gs.getDimension()))
+    p = DataVector(gs.getDimension())
+    for i, gp in enumerate(gps):
+        gs.getCoordinates(gp, p)
+        ps[i, :] = p.array()
+        ixs[i] = gs.getSequenceNumber(gp)
+
+    # get joint distribution
+    ap = params.activeParams()
+    U = ap.getIndependentJointDistribution()
+    T = ap.getJointTransformation()
+    qs = T.unitToProbabilisticMatrix(ps)
+
+    return ixs, ps, U.pdf(qs)
+
 
 # ------------------------------------------------------------------------------
 # Refinement
@@ -108,6 +197,12 @@ class AnchoredWeightedL2OptRanking(Ranking):
         super(self.__class__, self).__init__()
 
     def update(self, grid, v, gpi, params, *args, **kws):
+        return self.updateList(grid, v, [gpi], params)[0]
+
+    def rankList(self, grid, gps, alphas, params, t=0):
+        return self.updateList(grid, alphas, gps, params.activeParams())
+
+    def updateList(self, grid, v, gps, params):
         """
         Compute ranking for variance estimation
 
@@ -115,32 +210,35 @@ class AnchoredWeightedL2OptRanking(Ranking):
 
         @param grid: Grid grid
         @param v: numpy array coefficients
+        @param gps: list of HashGridPoints
         """
-        # get grid point associated to ix
-        gs = grid.getStorage()
-        p = DataVector(gs.getDimension())
-        gs.getCoordinates(gpi, p)
-
-        # get joint distribution
-        ap = params.activeParams()
-        U = ap.getIndependentJointDistribution()
-        T = ap.getJointTransformation()
-        q = T.unitToProbabilistic(p.array())
-
         # scale surplus by probability density
-        ix = gs.getSequenceNumber(gpi)
-
-        return np.abs(v[ix]) * np.sqrt(U.pdf(q))
+        ixs, _, fx = getCoordinatesAndPdf(grid, gps, params)
+        return np.abs(v[ixs]) * np.sqrt(fx)
 
 
-class WeightedL2OptRanking(Ranking):
+class WeightedL2OptRanking(GramMatrixRanking):
 
     def __init__(self):
         super(self.__class__, self).__init__()
         self._estimationStrategy = AnalyticEstimationStrategy()
-        self.initialized = False
 
-    def update(self, grid, v, gpi, params, *args, **kws):
+    def initCache(self, grid, params):
+        # update the quadrature operations
+        self._estimationStrategy.initQuadratureStrategy(grid)
+        U = params.getIndependentJointDistribution()
+        T = params.getJointTransformation()
+        self.vol, self.W, self.D = self._estimationStrategy._extractPDFforMomentEstimation(U, T)
+
+        # just the second moments of the basis functions are needed
+        def computeMassMatrix(gs, gpsi, basisi, gpsj, basisj):
+            return self._estimationStrategy.computeSystemMatrixForVarianceList(gs,
+                                                                               gpsi, basisi,
+                                                                               gpsj, basisj,
+                                                                               self.W, self.D)
+        return GramMatrixCache(computeMassMatrix, diagonalOnly=True)
+
+    def updateList(self, grid, v, ixs):
         """
         Compute ranking for variance estimation
 
@@ -148,29 +246,13 @@ class WeightedL2OptRanking(Ranking):
 
         @param grid: Grid grid
         @param v: numpy array coefficients
+        @param ixs: numpy array, sequence numbers of the grid points
         """
-        # update the quadrature operations
-        if not self.initialized:
-            self._estimationStrategy.initQuadratureStrategy(grid)
-            U = params.getIndependentJointDistribution()
-            T = params.getJointTransformation()
-            self.vol, self.W, self.D = self._estimationStrategy._extractPDFforMomentEstimation(U, T)
-            self.initialized = True
-
-        # prepare data
-        gs = grid.getStorage()
-        basisi = getBasis(grid)
-
-        # compute the second moment for the current grid point
-        secondMoment, _ = self._estimationStrategy.computeSystemMatrixForVarianceList(gs,
-                                                                                      [gpi], basisi,
-                                                                                      [gpi], basisi,
-                                                                                      self.W, self.D)
-        secondMoment = max(0.0, self.vol * secondMoment[0])
+        # second moments of the basis functions
+        secondMoment = np.maximum(0.0, self.vol * self._cache.getDiagonal()[ixs])
 
         # update the ranking
-        ix = gs.getSequenceNumber(gpi)
-        return np.abs(v[ix]) * np.sqrt(secondMoment)
+        return np.abs(v[ixs]) * np.sqrt(secondMoment)
 
 
 class AnchoredExpectationValueOptRanking(Ranking):
@@ -179,21 +261,15 @@ class AnchoredExpectationValueOptRanking(Ranking):
         super(self.__class__, self).__init__()
 
     def update(self, grid, v, gpi, params, *args, **kws):
-        # get grid point associated to ix
-        gs = grid.getStorage()
-        p = DataVector(gs.getDimension())
-        gs.getCoordinates(gpi, p)
+        return self.updateList(grid, v, [gpi], params)[0]
 
-        # get joint distribution
-        ap = params.activeParams()
-        U = ap.getIndependentJointDistribution()
-        T = ap.getJointTransformation()
-        q = T.unitToProbabilistic(p.array())
+    def rankList(self, grid, gps, alphas, params, t=0):
+        return self.updateList(grid, alphas, gps, params.activeParams())
 
+    def updateList(self, grid, v, gps, params):
         # scale surplus by probability density
-        ix = gs.getSequenceNumber(gpi)
-
-        return np.abs(v[ix]) * U.pdf(q)
+        ixs, _, fx = getCoordinatesAndPdf(grid, gps, params)
+        return np.abs(v[ixs]) * fx
 
 
 class ExpectationValueOptRanking(Ranking):
@@ -240,88 +316,60 @@ class ExpectationValueOptRanking(Ranking):
         return np.abs(v[ix]) * mean_phii
 
 
-class VarianceOptRanking(Ranking):
+class VarianceOptRanking(GramMatrixRanking):
 
     def __init__(self):
         super(self.__class__, self).__init__()
         self._estimationStrategy = AnalyticEstimationStrategy()
-        self.initialized = False
-
-    def compute_mean_uwi_phii(self, gs, gpswi, w, gpi, basis):
-        A, _ = self._estimationStrategy.computeSystemMatrixForVarianceList(gs,
-                                                                           gpswi, basis,
-                                                                           [gpi], basis,
-                                                                           self.W, self.D)
-        return np.dot(w, A)
-
-    def compute_mean_uwi(self, gs, gpswi, w, basis):
-        b, _ = self._estimationStrategy.computeSystemMatrixForMeanList(gs,
-                                                                       gpswi, basis,
-                                                                       self.W, self.D)
-        return np.dot(w, b)
-
-    def compute_mean_phii(self, gs, gpi, basisi):
-        mean_phii, _ = self._estimationStrategy.computeSystemMatrixForMeanList(gs, [gpi], basisi,
-                                                                               self.W, self.D)
-        return mean_phii[0]
 
-    def compute_var_phii(self, gs, gpi, basisi, mean_phii):
-        A_var, _ = self._estimationStrategy.computeSystemMatrixForVarianceList(gs,
-                                                                               [gpi], basisi,
-                                                                               [gpi], basisi,
+    def initCache(self, grid, params):
+        # update the quadrature operations
+        self._estimationStrategy.initQuadratureStrategy(grid)
+        U = params.getIndependentJointDistribution()
+        T = params.getJointTransformation()
+        self.vol, self.W, self.D = self._estimationStrategy._extractPDFforMomentEstimation(U, T)
+
+        def computeMassMatrix(gs, gpsi, basisi, gpsj, basisj):
+            return self._estimationStrategy.computeSystemMatrixForVarianceList(gs,
+                                                                               gpsi, basisi,
+                                                                               gpsj, basisj,
                                                                                self.W, self.D)
-        return A_var[0, 0] - mean_phii ** 2
 
+        def computeMeanVector(gs, gps, basis):
+            return self._estimationStrategy.computeSystemMatrixForMeanList(gs,
+                                                                           gps, basis,
+                                                                           self.W, self.D)
+        return GramMatrixCache(computeMassMatrix, computeMeanVector)
 
-    def update(self, grid, v, gpi, params, *args, **kws):
+    def updateList(self, grid, v, ixs):
         """
         Compute ranking for variance estimation
 
         \argmax_{i \in \A} | -v_i^2 V(\varphi_i) - 2 v_i Cov(u_indwli \varphi_i)|
 
+        where u_indwli is the sparse grid function without the i-th
+        basis function.
+
         @param grid: Grid grid
         @param v: numpy array coefficients
-        @param admissibleSet: AdmissibleSet
+        @param ixs: numpy array, sequence numbers of the grid points
         """
-        # update the quadrature operations
-        if not self.initialized:
-            self._estimationStrategy.initQuadratureStrategy(grid)
-            U = params.getIndependentJointDistribution()
-            T = params.getJointTransformation()
-            self.vol, self.W, self.D = self._estimationStrategy._extractPDFforMomentEstimation(U, T)
-            self.initialized = True
-
-        # prepare data
-        gs = grid.getStorage()
-        basis = getBasis(grid)
-
-        # load coefficients and vectors and matrices for variance and mean
-        # estimation
-        w = np.ndarray(gs.getSize() - 1)
-        ix = gs.getSequenceNumber(gpi)
-
-        # prepare list of grid points
-        gpswi = []
-        jx = 0
-        for j in xrange(gs.getSize()):
-            gpj = gs.getPoint(j)
-            if gpi.getHash() != gpj.getHash():
-                gpswi.append(gpj)
-                w[jx] = v[j]
-                jx += 1
-
-        # compute the covariance
-        mean_uwi_phii = self.compute_mean_uwi_phii(gs, gpswi, w, gpi, basis)
-        mean_phii = self.compute_mean_phii(gs, gpi, basis)
-        mean_uwi = self.compute_mean_uwi(gs, gpswi, w, basis)
-
+        A = self._cache.getMassMatrix()
+        b = self._cache.getMeanVector()
+        A_ii = A.diagonal()[ixs]
+        vi = v[ixs]
+        mean_phii = b[ixs]
+
+        # compute the covariance, subtract the contribution of phi_i
+        mean_uwi_phii = A.dot(v)[ixs] - vi * A_ii
+        mean_uwi = np.dot(v, b) - vi * mean_phii
         cov_uwi_phii = mean_uwi_phii - mean_phii * mean_uwi
 
         # compute the variance of phi_i
-        var_phii = self.compute_var_phii(gs, gpi, basis, mean_phii)
+        var_phii = A_ii - mean_phii ** 2
 
         # update the ranking
-        return np.abs(-v[ix] ** 2 * var_phii - 2 * v[ix] * cov_uwi_phii)
+        return np.abs(-vi ** 2 * var_phii - 2 * vi * cov_uwi_phii)
 
 
 class AnchoredVarianceOptRanking(Ranking):
@@ -330,6 +378,12 @@ class AnchoredVarianceOptRanking(Ranking):
         super(self.__class__, self).__init__()
 
     def update(self, grid, v, gpi, params, *args, **kws):
+        return self.updateList(grid, v, [gpi], params)[0]
+
+    def rankList(self, grid, gps, alphas, params, t=0):
+        return self.updateList(grid, alphas, gps, params.activeParams())
+
+    def updateList(self, grid, v, gps, params):
         """
         Compute ranking for variance estimation
 
@@ -337,44 +391,24 @@ class AnchoredVarianceOptRanking(Ranking):
 
         @param grid: Grid grid
         @param v: numpy array coefficients
+        @param gps: list of HashGridPoints
         """
-        # get grid point associated to ix
-        gs = grid.getStorage()
-        p = DataVector(gs.getDimension())
-        gs.getCoordinates(gpi, p)
-
-        # get joint distribution
-        ap = params.activeParams()
-        U = ap.getIndependentJointDistribution()
-        T = ap.getJointTransformation()
-        q = T.unitToProbabilistic(p.array())
-
         # scale surplus by probability density
-        ix = gs.getSequenceNumber(gpi)
-        fx = U.pdf(q)
-        ux = evalSGFunction(grid, v, p.array())
+        ixs, ps, fx = getCoordinatesAndPdf(grid, gps, params)
+        ux = evalSGFunctionMulti(grid, v, ps)
 
         # update the ranking
-        return np.abs((fx ** 2 - fx) * v[ix] * (2 * ux - v[ix]))
+        return np.abs((fx ** 2 - fx) * v[ixs] * (2 * ux - v[ixs]))
 
 
-class MeanSquaredOptRanking(Ranking):
+class MeanSquaredOptRanking(GramMatrixRanking):
 
     def __init__(self):
         super(self.__class__, self).__init__()
         self._linearForm = LinearGaussQuadratureStrategy()
         self._bilinearForm = BilinearGaussQuadratureStrategy()
 
-    def update(self, grid, v, gpi, params, *args, **kws):
-        """
-        Compute ranking for variance estimation
-
-        \argmax_{i \in \A} | v_i (2 A_i v_i - v_i b_i) |
-
-        @param grid: Grid grid
-        @param v: numpy array coefficients
-        @param admissibleSet: AdmissibleSet
-        """
+    def initCache(self, grid, params):
         # update the quadrature operations
         self._linearForm.setGridType(grid.getType())
         self._bilinearForm.setGridType(grid.getType())
@@ -383,19 +417,28 @@ class MeanSquaredOptRanking(Ranking):
         self._linearForm.setDistributionAndTransformation(U, T)
         self._bilinearForm.setDistributionAndTransformation(U, T)
 
-        # prepare list of grid points
-        gs = grid.getStorage()
-        gpsi = [None] * gs.getSize()
-        for i in xrange(gs.getSize()):
-            gpsi[i] = gs.getPoint(i)
+        def computeMassMatrix(gs, gpsi, basisi, gpsj, basisj):
+            return self._bilinearForm.computeBilinearFormByList(gs,
+                                                                gpsi, basisi,
+                                                                gpsj, basisj,
+                                                                sparse=True)
+        return GramMatrixCache(computeMassMatrix)
 
-        # compute stiffness matrix for next run
-        basis = getBasis(grid)
-        A, _ = self._bilinearForm.computeBilinearFormByList(gs, [gpi], basis, gpsi, basis)
+    def updateList(self, grid, v, ixs):
+        """
+        Compute ranking for variance estimation
+
+        \argmax_{i \in \A} | v_i (2 A_i v_i - v_i b_i) |
+
+        @param grid: Grid grid
+        @param v: numpy array coefficients
+        @param ixs: numpy array, sequence numbers of the grid points
+        """
+        A = self._cache.getMassMatrix()
 
         # update the ranking
-        ix = gs.getSequenceNumber(gpi)
-        return np.abs(v[ix] * (2 * np.dot(A, v) - v[ix] * A[0, ix]))
+        vi = v[ixs]
+        return np.abs(vi * (2 * A.dot(v)[ixs] - vi * A.diagonal()[ixs]))
 
 class AnchoredMeanSquaredOptRanking(Ranking):
 
@@ -404,6 +447,12 @@ class AnchoredMeanSquaredOptRanking(Ranking):
         self._dtype = KnowledgeTypes.SQUARED
 
     def update(self, grid, v, gpi, params, *args, **kws):
+        return self.updateList(grid, v, [gpi], params)[0]
+
+    def rankList(self, grid, gps, alphas, params, t=0):
+        return self.updateList(grid, alphas, gps, params.activeParams())
+
+    def updateList(self, grid, v, gps, params):
         """
         Compute ranking for variance estimation
 
@@ -411,23 +460,12 @@ class AnchoredMeanSquaredOptRanking(Ranking):
 
         @param grid: Grid grid
         @param v: numpy array coefficients
-        @param admissibleSet: AdmissibleSet
+        @param gps: list of HashGridPoints
         """
-        # get grid point associated to ix
-        gs = grid.getStorage()
-        p = DataVector(gs.getDimension())
-
-        # get joint distribution
-        ap = params.activeParams()
-        U = ap.getIndependentJointDistribution()
-        T = ap.getJointTransformation()
-        ix = gs.getSequenceNumber(gpi)
-        gs.getCoordinates(gpi, p)
-        q = T.unitToProbabilistic(p.array())
-        fx = U.pdf(q)
+        ixs, _, fx = getCoordinatesAndPdf(grid, gps, params)
 
         # update the ranking
-        return np.abs(v[ix] * fx)
+        return np.abs(v[ixs] * fx)
 
 # ------------------------------------------------------------------------------
 # Add new collocation nodes
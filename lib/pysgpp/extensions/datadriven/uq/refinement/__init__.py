@@ -16,6 +16,7 @@ from AdmissibleSet import (AdmissibleSetGenerator,
 from LocalRefinementStrategy import (CreateAllChildrenRefinement,
                                      ANOVARefinement,
                                      AddNode)
+from GramMatrixCache import GramMatrixCache
 from RefinementStrategy import (Ranking,
                                 SurplusRanking,
                                 SquaredSurplusRanking,
@@ -0,0 +1,70 @@
+"""
+Tests of the incremental update of the nodal values in
+OperationMakePositive, which is compared with the full dehierarchization
+and hierarchization of the grid.
+
+usage: python2 -m unittest discover -s lib/pysgpp/extensions/datadriven/uq/tests
+"""
+import unittest
+
+import numpy as np
+
+from pysgpp import Grid, DataVector
+from pysgpp.extensions.datadriven.uq.operations import hierarchize, dehierarchize
+from pysgpp.extensions.datadriven.uq.operations.forcePositivity.operationMakePositive import \
+    OperationMakePositive
+
+
+class OperationMakePositiveTest(unittest.TestCase):
+
+    def getExample(self, grid, level, seed):
+        """
+        Interpolate a positive function on a regular sparse grid and
+        perturb the coefficients of some grid points, such that the nodal
+        values in their supports become negative
+        @param grid: Grid
+        @param level: int level of the regular sparse grid
+        @param seed: int seed of the random perturbation
+        @return: tuple (numpy array coefficients, numpy array of the
+        sequence numbers of the perturbed grid points)
+        """
+        grid.getGenerator().regular(level)
+        gs = grid.getStorage()
+        numDims = gs.getDimension()
+        p = DataVector(numDims)
+        nodalValues = np.ndarray(gs.getSize())
+        for i in xrange(gs.getSize()):
+            gs.getCoordinates(gs.getPoint(i), p)
+            nodalValues[i] = np.prod(np.sin(np.pi * p.array())) + 0.1
+        alpha = hierarchize(grid, nodalValues)
+
+        rng = np.random.RandomState(seed)
+        ixs = np.sort(rng.choice(gs.getSize(), max(1, gs.getSize() // 10),
+                                 replace=False))
+        alpha[ixs] -= rng.uniform(0.5, 1.5, len(ixs))
+        return alpha, ixs
+
+    def checkIncrementalUpdate(self, grid, level, seed=1234):
+        alpha, ixs = self.getExample(grid, level, seed)
+        self.assertTrue(np.any(dehierarchize(grid, alpha) < 0))
+
+        op = OperationMakePositive(grid)
+        expected = op.makeCurrentNodalValuesPositive(grid, np.array(alpha))
+        actual = op.makeCurrentNodalValuesPositive(grid, np.array(alpha), ixs)
+
+        self.assertTrue(np.allclose(actual, expected, atol=1e-12))
+        self.assertTrue(np.all(dehierarchize(grid, actual) > -1e-12))
+
+    def testLinearGrids(self):
+        for numDims in xrange(1, 4):
+            self.checkIncrementalUpdate(Grid.createLinearGrid(numDims), 4)
+
+    def testBsplineGrids(self):
+        # the supports of B-splines are wider than the ones of the hat
+        # functions, the whole grid has to be checked
+        for numDims in xrange(1, 3):
+            self.checkIncrementalUpdate(Grid.createBsplineGrid(numDims, 3), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -29,15 +29,22 @@ class JointTransformation(Transformation):
         self.__n += n
 
     def probabilisticToUnitMatrix(self, ps, *args, **kws):
+        # transform the column block of every transformation at once
         unitdata = np.zeros(ps.shape)
-        for i in xrange(ps.shape[0]):
-            unitdata[i, :] = self.probabilisticToUnit(ps[i, :])
+        for k, ix in enumerate(self.__ixs):
+            if len(ix) == 1:
+                unitdata[:, ix[0]] = self.__trans[k].probabilisticToUnit(ps[:, ix[0]])
+            else:
+                unitdata[:, ix] = self.__trans[k].probabilisticToUnit(ps[:, ix])
         return unitdata
 
     def unitToProbabilisticMatrix(self, ps, *args, **kws):
         probdata = np.zeros(ps.shape)
-        for i in xrange(ps.shape[0]):
-            probdata[i, :] = self.unitToProbabilistic(ps[i, :])
+        for k, ix in enumerate(self.__ixs):
+            if len(ix) == 1:
+                probdata[:, ix[0]] = self.__trans[k].unitToProbabilistic(ps[:, ix[0]])
+            else:
+                probdata[:, ix] = self.__trans[k].unitToProbabilistic(ps[:, ix])
         return probdata
 
     def unitToProbabilistic(self, p, *args, **kws):
@@ -0,0 +1,180 @@
+#!/usr/bin/python
+# Copyright (C) 2013 Technische Universitaet Muenchen
+# This file is part of the SG++ project. For conditions of distribution and
+# use, please see the copyright notice at http://www5.in.tum.de/SGpp
+#
+"""
+@file    SampleExecutor.py
+
+@brief Backends which run the samples of a UQSetting, see
+UQSetting.runSamples. All of them implement the same interface
+SampleExecutor.runSamples(uqSetting, samples).
+
+@version  0.1
+
+"""
+from multiprocessing import Pool, cpu_count
+import signal
+
+
+# UQSetting whose samples are run by the worker processes. The variable is
+# set before the workers are forked, such that every worker owns a copy of
+# the setting including its simulation.
+_uqSetting = None
+# time limit of the worker processes per sample in seconds
+_timeout = None
+
+
+class SampleTimeoutError(Exception):
+    """
+    Raised in the worker process if a sample exceeds the time limit
+    """
+    pass
+
+
+def _raiseTimeout(signum, frame):
+    raise SampleTimeoutError('time limit of %g seconds exceeded' % _timeout)
+
+
+def _runSamples(samples):
+    """
+    Runs a chunk of samples in a worker process
+    @param samples: list of Samples
+    @return: dictionary with the stats of the successful runs
+    """
+    uqSetting = _uqSetting
+    # start from scratch, the results of the previous chunk have already
+    # been sent to the parent
+    uqSetting.setSamplesStats({})
+    uqSetting.setPreprocessorStats({})
+    uqSetting.setPreprocessorStatsReverse({})
+    uqSetting.setSimulationStats({})
+    uqSetting.setPostprocessorStats({})
+
+    if _timeout is not None:
+        signal.signal(signal.SIGALRM, _raiseTimeout)
+
+    for sample in samples:
+        if _timeout is not None:
+            signal.setitimer(signal.ITIMER_REAL, _timeout)
+        try:
+            ret = uqSetting.run(sample)
+        finally:
+            if _timeout is not None:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+
+        if ret == 1:
+            print "Warning: invalid sample %s" % sample
+
+    # return just the complete results, such that invalid samples are
+    # run again the next time
+    preprocessorStats = uqSetting.getPreprocessorStats()
+    simulationStats = uqSetting.getSimulationStats()
+    postprocessorStats = uqSetting.getPostprocessorStats()
+    stats = {'samples': {},
+             'preprocessor': {},
+             'preprocessorReverse': {},
+             'simulation': {},
+             'postprocessor': {},
+             'lastid': uqSetting.lastid}
+    for p, sample in uqSetting.getSamplesStats().iteritems():
+        q = preprocessorStats.get(p)
+        if q in simulationStats and q in postprocessorStats:
+            stats['samples'][p] = sample
+            stats['preprocessor'][p] = q
+            stats['preprocessorReverse'][q] = p
+            stats['simulation'][q] = simulationStats[q]
+            stats['postprocessor'][q] = postprocessorStats[q]
+    return stats
+
+
+class SampleExecutor(object):
+    """
+    Interface of the backends which run the samples of a UQSetting
+    """
+
+    def runSamples(self, uqSetting, samples):
+        """
+        Run the given samples and store the results in the UQSetting
+        @param uqSetting: UQSetting
+        @param samples: Samples, which have not been evaluated yet
+        """
+        raise NotImplementedError()
+
+
+class SerialSampleExecutor(SampleExecutor):
+    """
+    Runs the samples one after another in the current process
+    """
+
+    def runSamples(self, uqSetting, samples):
+        uqSetting.runSamples_withoutDistribution(samples)
+
+
+class ProcessPoolSampleExecutor(SampleExecutor):
+    """
+    Runs the samples in a pool of local worker processes. The results
+    are sent back to the parent process and merged into the UQSetting
+    using UQSetting.mergeStats.
+    """
+
+    def __init__(self, numberOfProcesses=None, chunkSize=1, timeout=None):
+        """
+        Constructor
+        @param numberOfProcesses: int, number of worker processes,
+        default is the number of CPUs
+        @param chunkSize: int, number of samples sent to a worker at once
+        @param timeout: float, time limit per sample in seconds; samples
+        exceeding it are treated as invalid samples. None means no limit
+        """
+        self.numberOfProcesses = numberOfProcesses \
+            if numberOfProcesses is not None else cpu_count()
+        self.chunkSize = chunkSize
+        self.timeout = timeout
+
+    def runSamples(self, uqSetting, samples):
+        global _uqSetting, _timeout
+        samples = list(samples)
+        chunks = [samples[i:i + self.chunkSize]
+                  for i in xrange(0, len(samples), self.chunkSize)]
+        if len(chunks) == 0:
+            return
+
+        _uqSetting, _timeout = uqSetting, self.timeout
+        pool = Pool(min(self.numberOfProcesses, len(chunks)))
+        try:
+            # merge the results as soon as they arrive
+            for i, stats in enumerate(pool.imap_unordered(_runSamples, chunks)):
+                self.__mergeStats(uqSetting, stats)
+                if uqSetting.getVerbose():
+                    print "finished chunk %i/%i (%i)" % (i + 1, len(chunks),
+                                                         uqSetting.getSize())
+                if uqSetting.getSaveAfterEachRun(i + 1) or i + 1 == len(chunks):
+                    uqSetting.writeToFile()
+        finally:
+            pool.close()
+            pool.join()
+            _uqSetting, _timeout = None, None
+
+    def __mergeStats(self, uqSetting, stats):
+        newSetting = uqSetting.__class__()
+        newSetting.setSamplesStats(stats['samples'])
+        newSetting.setPreprocessorStats(stats['preprocessor'])
+        newSetting.setPreprocessorStatsReverse(stats['preprocessorReverse'])
+        newSetting.setSimulationStats(stats['simulation'])
+        newSetting.setPostprocessorStats(stats['postprocessor'])
+        newSetting.lastid = stats['lastid']
+        uqSetting.mergeStats(newSetting)
+
+
+class SSHSampleExecutor(SampleExecutor):
+    """
+    Runs the samples on the remote hosts specified in remote_worker.py
+    via ssh. The results are written to files by the remote workers and
+    copied back via scp.
+    """
+
+    def runSamples(self, uqSetting, samples):
+        uqSetting.runSamples_dist(samples)
+        uqSetting.waitForResults()
+        uqSetting.loadResults()
@@ -108,6 +108,15 @@ class UQBuilder(object):
         self.__specification.setInterpolationFunction(interpolate)
         return self
 
+    def withSampleExecutor(self, executor):
+        """
+        Sets the backend which runs the samples, e.g. a
+        ProcessPoolSampleExecutor to run them in parallel
+        @param executor: SampleExecutor
+        """
+        self.__specification.setSampleExecutor(executor)
+        return self
+
     def saveAfterEachRun(self, n=1):
         self.__specification.setSaveAfterEachRun(n)
         return self
@@ -29,6 +29,8 @@ import sys
 from pysgpp.extensions.datadriven.tools import readDataARFF
 from UQSettingFormatter import UQSettingFormatter
 from UQSpecification import UQSpecification
+from UQSettingTools import IndexedStats, findEquivalentKey
+from SampleExecutor import SerialSampleExecutor, ProcessPoolSampleExecutor
 import pysgpp.extensions.datadriven.uq.jsonLib as ju
 import numpy as np
 import warnings
@@ -55,7 +57,7 @@ class UQSetting(object):
         self.__specification = UQSpecification()
 
         self.__stats_samples = {}
-        self.__stats_preprocessor = {}
+        self.__stats_preprocessor = IndexedStats()
         self.__stats_preprocessor_reverse = {}
         self.__stats_simulation = {}
         self.__stats_postprocessor = {}
@@ -87,56 +89,40 @@ class UQSetting(object):
         p = tuple(sample.getExpandedUnit())
         found = p in stats
         if not found:
-            min_diff = 10.
             # get parameter in probabilistic space
             x = tuple(sample.getExpandedProbabilistic())
-            # DAMN IT => this is shit!!!!
-            keys = stats.keys()
             if self._verbose:
                 print "search for equivalent for %s" % (p,)
-            j = 0
-            while not found and j < len(keys):
-                g = keys[j]
-                j += 1
-                diff1 = [abs(gi - pi) / pi for gi, pi in zip(g, p) if abs(pi) > 0]
-                diff2 = [abs(gi - pi) / gi for gi, pi in zip(g, p) if abs(gi) > 0]
-                diff = sum(diff1) + sum(diff2)
-                min_diff = min(min_diff, diff)
-                if diff < 1e-6:
-                    found = True
-                    old_q = self.__stats_preprocessor[g]
-                    if self._verbose:
-                        print g, old_q
-
-                    # save old items
-                    q = self.getPreprocessor().unitToProbabilistic(x)
-
-                    diff1 = [abs(gi - pi) / pi for gi, pi in zip(q, old_q) if abs(pi) > 0]
-                    diff2 = [abs(gi - pi) / gi for gi, pi in zip(q, old_q) if abs(gi) > 0]
-                    diff = sum(diff1) + sum(diff2)
-
-                    simulation = self.__stats_simulation[old_q].copy()
-                    post = self.__stats_postprocessor[old_q].copy()
-
-                    # delete old ones if
-                    if g in self.__stats_samples:
-                        del self.__stats_samples[g]
-                    del self.__stats_preprocessor[g]
-                    del self.__stats_preprocessor_reverse[old_q]
-                    del self.__stats_simulation[old_q]
-                    del self.__stats_postprocessor[old_q]
-
-                    # insert old items with new key
-                    self.__stats_samples[p] = sample
-                    self.__stats_preprocessor[p] = q
-                    self.__stats_preprocessor_reverse[q] = p
-                    self.__stats_simulation[q] = simulation
-                    self.__stats_postprocessor[q] = post
+            g = findEquivalentKey(p, stats)
+            if g is not None:
+                found = True
+                old_q = self.__stats_preprocessor[g]
+                if self._verbose:
+                    print g, old_q
+
+                # save old items
+                q = self.getPreprocessor().unitToProbabilistic(x)
+                simulation = self.__stats_simulation[old_q].copy()
+                post = self.__stats_postprocessor[old_q].copy()
+
+                # delete old ones if
+                if g in self.__stats_samples:
+                    del self.__stats_samples[g]
+                del self.__stats_preprocessor[g]
+                del self.__stats_preprocessor_reverse[old_q]
+                del self.__stats_simulation[old_q]
+                del self.__stats_postprocessor[old_q]
+
+                # insert old items with new key
+                self.__stats_samples[p] = sample
+                self.__stats_preprocessor[p] = q
+                self.__stats_preprocessor_reverse[q] = p
+                self.__stats_simulation[q] = simulation
+                self.__stats_postprocessor[q] = post
 
             if self._verbose:
                 if found:
-                    print "found equivalent",
-                    print min_diff
+                    print "found equivalent"
                     print len(self.__stats_samples), \
                         len(self.__stats_preprocessor), \
                         len(self.__stats_preprocessor_reverse), \
@@ -146,6 +132,19 @@ class UQSetting(object):
                     print "no equivalent found"
         return found
 
+    def __getPreprocessorKey(self, sample):
+        """
+        Get the key of the pre-processor stats which is equivalent
+        to the given sample. Contrary to findEquivalent, the stats are
+        not altered.
+        @param sample: Sample
+        @return: tuple of floats, the equivalent key if there is one,
+        the sample in unit space otherwise
+        """
+        p = tuple(sample.getExpandedUnit())
+        g = findEquivalentKey(p, self.__stats_preprocessor)
+        return p if g is None else g
+
     def __preprocessing(self, sample, *args, **kws):
         """
         Transforms a parameter taken from the unit hyper cube into the
@@ -358,21 +357,32 @@ class UQSetting(object):
             #     acc.append((q, A['massflux']))
         return acc
 
-    def runSamples(self, samples, dist=False, *args, **kws):
+    def runSamples(self, samples, dist=False, executor=None):
+        """
+        Run the samples which have not been evaluated yet
+        @param samples: Samples
+        @param dist: bool, run the samples in parallel with a
+        ProcessPoolSampleExecutor if no executor is specified
+        @param executor: SampleExecutor, defaults to the one of the
+        specification
+        @return: number of new simulation results
+        """
         # remove those samples from sample list which have already
         # been evaluated
         samples.removeSet(self.__stats_samples.values())
         if len(samples) == 0:
             return 0
 
-        # do the distributed run
+        if executor is None:
+            executor = self.getSampleExecutor()
+        if executor is None:
+            if dist is True:
+                executor = ProcessPoolSampleExecutor()
+            else:
+                executor = SerialSampleExecutor()
+
         n = self.getSize("simulation")
-        if dist is True:
-            self.runSamples_dist(samples)
-            self.waitForResults()
-            self.loadResults()
-        else:
-            self.runSamples_withoutDistribution(samples)
+        executor.runSamples(self, samples)
 
         return self.getSize("simulation") - n
 
@@ -681,7 +691,7 @@ class UQSetting(object):
         @param qoi: string
         @result: numpy array with the scalar results per time step
         """
-        p = tuple(sample.getExpandedUnit())
+        p = self.__getPreprocessorKey(sample)
 
         if p not in self.__stats_preprocessor:
             raise AttributeError('there are no results available for %s' % (p,))
@@ -772,7 +782,7 @@ class UQSetting(object):
         return ans
 
     def hasResult(self, sample):
-        p = tuple(sample.getExpandedUnit())
+        p = self.__getPreprocessorKey(sample)
         if p in self.__stats_preprocessor:
             q = self.__stats_preprocessor[p]
             if q in self.__stats_simulation and \
@@ -833,7 +843,7 @@ class UQSetting(object):
             
             # select the key
             if sampleType == UQSampleType.PREPROCESSED:
-                key = self.__stats_preprocessor[tuple(p.getExpandedUnit())]
+                key = self.__stats_preprocessor[self.__getPreprocessorKey(p)]
             else:
                 # sampleType == UQSampleType.RAW
                 key = p
@@ -925,6 +935,8 @@ class UQSetting(object):
         Set pre-processor stats
         @param stats: dictionary
         """
+        if not isinstance(stats, IndexedStats):
+            stats = IndexedStats(stats)
         self.__stats_preprocessor = stats
 
     def setPreprocessorStatsReverse(self, stats):
@@ -1149,7 +1161,7 @@ class UQSetting(object):
 
         statsPreprocessor = newSetting.getPreprocessorStats()
         if statsPreprocessor is not None and self.__stats_preprocessor is None:
-            self.__stats_preprocessor = statsPreprocessor
+            self.setPreprocessorStats(statsPreprocessor)
 
         statsPreprocessorReverse = newSetting.getPreprocessorStatsReverse()
         if statsPreprocessorReverse is not None and self.__stats_preprocessor_reverse is None:
@@ -1589,7 +1601,7 @@ class UQSetting(object):
 
     def changeParamSetting(self, params):
         stats_samples = {}
-        stats_preprocessor = {}
+        stats_preprocessor = IndexedStats()
         stats_preprocessor_reverse = {}
         stats_simulation = {}
         stats_postprocessor = {}
@@ -3,6 +3,140 @@ Created on Aug 18, 2014
 
 @author: franzefn
 '''
+from itertools import product
+from math import floor
+
+
+def isEquivalent(g, p, tolerance=1e-6):
+    """
+    Checks if two samples in unit space are equal up to a relative
+    tolerance
+    @param g: tuple of floats
+    @param p: tuple of floats
+    @param tolerance: float, relative tolerance
+    @return: True if g and p are equivalent, False otherwise
+    """
+    diff1 = [abs(gi - pi) / pi for gi, pi in zip(g, p) if abs(pi) > 0]
+    diff2 = [abs(gi - pi) / gi for gi, pi in zip(g, p) if abs(gi) > 0]
+    return sum(diff1) + sum(diff2) < tolerance
+
+
+class IndexedStats(dict):
+    """
+    Dictionary with samples in unit space (tuples of floats) as keys. The
+    keys are additionally hashed by their quantized coordinates, such that
+    keys which are equivalent to a given sample up to the relative
+    tolerance are found by looking at the neighboring cells only instead
+    of comparing the sample to all the keys.
+    """
+
+    # edge length of the cells of the quantization
+    cellSize = 1e-4
+    # relative tolerance of equivalent keys, see isEquivalent
+    tolerance = 1e-6
+
+    def __init__(self, *args, **kws):
+        super(IndexedStats, self).__init__()
+        self.__cells = {}
+        self.update(*args, **kws)
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+    def __getCell(self, key):
+        return tuple(int(floor(ki / self.cellSize)) for ki in key)
+
+    def __removeFromCell(self, key):
+        cell = self.__getCell(key)
+        keys = self.__cells[cell]
+        keys.discard(key)
+        if len(keys) == 0:
+            del self.__cells[cell]
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self.__cells.setdefault(self.__getCell(key), set()).add(key)
+        super(IndexedStats, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        super(IndexedStats, self).__delitem__(key)
+        self.__removeFromCell(key)
+
+    def pop(self, key, *default):
+        if key in self:
+            self.__removeFromCell(key)
+        return super(IndexedStats, self).pop(key, *default)
+
+    def popitem(self):
+        key, value = super(IndexedStats, self).popitem()
+        self.__removeFromCell(key)
+        return key, value
+
+    def clear(self):
+        super(IndexedStats, self).clear()
+        self.__cells.clear()
+
+    def update(self, *args, **kws):
+        for key, value in dict(*args, **kws).iteritems():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def copy(self):
+        return IndexedStats(self)
+
+    def findEquivalentKey(self, p):
+        """
+        Looks for a key which is equivalent to the given sample
+        @param p: tuple of floats, sample in unit space
+        @return: the equivalent key if there is one, None otherwise
+        """
+        if p in self:
+            return p
+
+        # collect the cells intersecting the tolerance box around p
+        ranges = []
+        numberOfCells = 1
+        for pi in p:
+            delta = self.tolerance * abs(pi)
+            lower = int(floor((pi - delta) / self.cellSize))
+            upper = int(floor((pi + delta) / self.cellSize))
+            ranges.append(xrange(lower, upper + 1))
+            numberOfCells *= upper - lower + 1
+
+        if numberOfCells > len(self.__cells):
+            # the box is too large (just for keys far away from the
+            # unit hypercube), it is cheaper to check all the keys
+            candidates = self.iterkeys()
+        else:
+            candidates = (g for cell in product(*ranges)
+                          for g in self.__cells.get(cell, ()))
+
+        for g in candidates:
+            if len(g) == len(p) and isEquivalent(g, p, self.tolerance):
+                return g
+        return None
+
+
+def findEquivalentKey(p, stats):
+    """
+    Looks for a key of the stats which is equivalent to the given sample
+    @param p: tuple of floats, sample in unit space
+    @param stats: dictionary with samples in unit space as keys
+    @return: the equivalent key if there is one, None otherwise
+    """
+    if isinstance(stats, IndexedStats):
+        return stats.findEquivalentKey(p)
+
+    if p in stats:
+        return p
+    for g in stats.iterkeys():
+        if isEquivalent(g, p):
+            return g
+    return None
 
 
 def findEquivalent(sample, stats):
@@ -10,23 +144,14 @@ def findEquivalent(sample, stats):
     p = tuple(sample.getExpandedUnit())
     found = p in stats
     if not found:
-        min_diff = 10.
-        # DAMN IT => this is shit!!!!
-        keys = stats.keys()
         print "search for equivalent for %s" % (p,)
-        j = 0
-        while not found and j < len(keys):
-            g = keys[j]
-            diff1 = [abs(gi - pi) / pi for gi, pi in zip(g, p) if abs(pi) > 0]
-            diff2 = [abs(gi - pi) / gi for gi, pi in zip(g, p) if abs(gi) > 0]
-            diff = sum(diff1) + sum(diff2)
-            min_diff = min(min_diff, diff)
-            if diff < 1e-6:
-                found = True
+        g = findEquivalentKey(p, stats)
+        found = g is not None
         if found:
             print "found equivalent %s" % (g,)
         else:
             print "no equivalent found"
+    return found
 
 
 import json
@@ -39,6 +39,7 @@ class UQSpecification(object):
         self.__postprocessor = postprocessor
         self.__reachesSteadyState = False
         self.__save = 1
+        self.__sampleExecutor = None
 
         self.__interpolants = {}
 
@@ -163,3 +164,17 @@ class UQSpecification(object):
 
     def getSaveAfterEachRun(self, n):
         return n % self.__save == 0
+
+    def setSampleExecutor(self, executor):
+        """
+        Set the backend which runs the samples
+        @param executor: SampleExecutor
+        """
+        self.__sampleExecutor = executor
+
+    def getSampleExecutor(self):
+        """
+        Get the backend which runs the samples
+        @return: SampleExecutor or None if not set
+        """
+        return self.__sampleExecutor
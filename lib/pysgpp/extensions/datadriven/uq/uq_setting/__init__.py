@@ -19,7 +19,9 @@ postprocessing results.
 __version__ = "0.1"
 
 __all__ = ["UQBuilder", "UQSetting",
-           "UQSettingFormatter", "UQSpecification"]
+           "UQSettingFormatter", "UQSpecification",
+           "SampleExecutor", "SerialSampleExecutor",
+           "ProcessPoolSampleExecutor", "SSHSampleExecutor"]
 
 __author__ = "Fabian Franzelin, fabian.franzelin@ipvs.uni-stuttgart.de"
 
@@ -30,4 +32,6 @@ from UQSettingAdapter import UQSettingAdapter
 from UQSettingFormatter import UQSettingFormatter
 from UQSpecification import UQSpecification
 from UQSettingTools import findEquivalent
+from SampleExecutor import SampleExecutor, SerialSampleExecutor, \
+    ProcessPoolSampleExecutor, SSHSampleExecutor
 
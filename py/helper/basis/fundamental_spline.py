@@ -6,6 +6,7 @@ import scipy.linalg
 from .cardinal_bspline import CardinalBSpline
 from .centralized_cardinal_bspline import CentralizedCardinalBSpline
 from .parent_function import ParentFunction
+from .piecewise_polynomial import PiecewisePolynomial
 
 class FundamentalSpline(ParentFunction):
   def __init__(self, p, nu=0):
@@ -13,6 +14,10 @@ class FundamentalSpline(ParentFunction):
     self.p = p
     self.centralizedCardinalBSpline = CentralizedCardinalBSpline(p, nu=nu)
     self.c, self.cutoff, self.gamma = self._calculateCoefficients()
+    self.piecewisePolynomial = PiecewisePolynomial.linearCombination(
+        self.c,
+        [self.centralizedCardinalBSpline.getPiecewisePolynomial().shift(k)
+         for k in range(-self.cutoff + 1, self.cutoff)])
   
   def _calculateCoefficients(self):
     if self.p == 1: return np.array([1]), 1, float("inf")
@@ -40,13 +45,11 @@ class FundamentalSpline(ParentFunction):
     return c, cutoff, gamma
   
   def evaluate(self, xx):
-    yy = np.zeros_like(xx)
-    
-    for k in range(-self.cutoff + 1, self.cutoff):
-      yy += (self.c[k+self.cutoff-1] *
-             self.centralizedCardinalBSpline.evaluate(xx - k))
-    
+    yy = self.piecewisePolynomial.evaluate(xx)
     return yy
   
+  def getPiecewisePolynomial(self):
+    return self.piecewisePolynomial
+  
   def getSupport(self):
     return float("-inf"), float("inf")
@@ -9,6 +9,9 @@ class HierarchicalClenshawCurtisBSpline(HierarchicalBSpline):
   def __init__(self, p, nu=0):
     super().__init__(p)
     assert nu == 0
+    # B-splines per (l, i), such that their piecewise polynomials are
+    # computed only once
+    self.nonUniformBSplines = {}
   
   def getKnots(self, l, i=None):
     hInv = 2**l
@@ -18,9 +21,11 @@ class HierarchicalClenshawCurtisBSpline(HierarchicalBSpline):
     return xi
   
   def evaluate(self, l, i, xx):
-    xi = self.getKnots(l, i)
-    basis = NonUniformBSpline(self.p, xi)
-    yy = basis.evaluate(xx)
+    key = (int(l), int(i))
+    if key not in self.nonUniformBSplines:
+      xi = self.getKnots(l, i)
+      self.nonUniformBSplines[key] = NonUniformBSpline(self.p, xi)
+    yy = self.nonUniformBSplines[key].evaluate(xx)
     return yy
   
   def getSupport(self, l, i):
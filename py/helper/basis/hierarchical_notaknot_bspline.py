@@ -14,6 +14,9 @@ class HierarchicalNotAKnotBSpline(HierarchicalBasis):
     super().__init__(nu=nu)
     self.p = p
     self.lagrangeBasis = HierarchicalLagrangePolynomial(nu=nu)
+    # B-splines per (l, i), such that their piecewise polynomials are
+    # computed only once
+    self.nonUniformBSplines = {}
   
   def getCoordinates(self, l, I):
     X = helper.grid.getCoordinates(l, I)
@@ -33,9 +36,11 @@ class HierarchicalNotAKnotBSpline(HierarchicalBasis):
     if l < np.ceil(np.log2(self.p+1)):
       yy = self.lagrangeBasis.evaluate(l, i, xx)
     else:
-      xi = self.getKnots(l, i)
-      basis = NonUniformBSpline(self.p, xi, nu=self.nu)
-      yy = basis.evaluate(xx)
+      key = (int(l), int(i))
+      if key not in self.nonUniformBSplines:
+        xi = self.getKnots(l, i)
+        self.nonUniformBSplines[key] = NonUniformBSpline(self.p, xi, nu=self.nu)
+      yy = self.nonUniformBSplines[key].evaluate(xx)
     
     return yy
   
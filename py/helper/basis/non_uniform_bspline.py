@@ -4,6 +4,7 @@ import numpy as np
 import scipy.interpolate
 
 from .parent_function import ParentFunction
+from .piecewise_polynomial import PiecewisePolynomial
 
 class NonUniformBSpline(ParentFunction):
   def __init__(self, p, xi, k=None, nu=0):
@@ -16,16 +17,26 @@ class NonUniformBSpline(ParentFunction):
       if nu > 0:   self.bSpline = self.bSpline.derivative(nu)
       elif nu < 0: self.bSpline = self.bSpline.antiderivative(-nu)
       self.support = [xi[0], xi[-1]]
+      self.piecewisePolynomial = None
     else:
       self.__init__(p, xi[k:k+p+2], nu=nu)
   
   def evaluate(self, xx):
     xx = np.array(xx).flatten().astype(float)
-    K = np.logical_and(xx >= self.support[0], xx < self.support[1])
-    yy = np.zeros_like(xx)
-    if self.nu < 0: yy[xx >= self.support[1]] = 1
-    yy[K] = self.bSpline(xx[K])
+    yy = self.getPiecewisePolynomial().evaluate(xx)
     return yy
   
+  def getPiecewisePolynomial(self):
+    if self.piecewisePolynomial is None:
+      pp = scipy.interpolate.PPoly.from_spline(self.bSpline)
+      J = np.where((pp.x[:-1] >= self.support[0]) &
+                   (pp.x[1:] <= self.support[1]) &
+                   (pp.x[1:] > pp.x[:-1]))[0]
+      xi = np.hstack((pp.x[J], pp.x[J[-1]+1]))
+      self.piecewisePolynomial = PiecewisePolynomial(
+          xi, pp.c[:,J], rightValue=(1 if self.nu < 0 else 0))
+    
+    return self.piecewisePolynomial
+  
   def getSupport(self):
     return self.support
@@ -11,3 +11,6 @@ class ParentFunction(abc.ABC):
 
   @abc.abstractmethod
   def getSupport(self): pass
+  
+  @abc.abstractmethod
+  def getPiecewisePolynomial(self): pass
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+
+import numpy as np
+import scipy.interpolate
+
+class PiecewisePolynomial(object):
+  def __init__(self, xi, c, leftValue=0, rightValue=0):
+    # c[:,j] contains the coefficients (highest degree first) of the
+    # polynomial on [xi[j], xi[j+1]) w.r.t. the local variable x - xi[j];
+    # the function is constant left of xi[0] and right of xi[-1]
+    self.xi = np.array(xi, dtype=float)
+    self.c = np.array(c, dtype=float)
+    self.leftValue = leftValue
+    self.rightValue = rightValue
+    # compiled evaluation of the polynomial pieces
+    self.pPoly = scipy.interpolate.PPoly(self.c, self.xi, extrapolate=False)
+  
+  def getDegree(self):
+    return self.c.shape[0] - 1
+  
+  def getSupport(self):
+    return self.xi[0], self.xi[-1]
+  
+  def evaluate(self, xx):
+    xx = np.array(xx, dtype=float)
+    yy = self.pPoly(xx)
+    yy[xx < self.xi[0]] = self.leftValue
+    yy[xx >= self.xi[-1]] = self.rightValue
+    return yy
+  
+  def getShiftedCoefficients(self, J, xx):
+    # Taylor shift of the polynomials of the intervals J to the
+    # new expansion points xx (repeated synthetic division)
+    c = np.array(self.c[:,J])
+    delta = xx - self.xi[J]
+    p = self.getDegree()
+    
+    for r in range(p):
+      for q in range(1, p+1-r):
+        c[q,:] += delta * c[q-1,:]
+    
+    return c
+  
+  def derivative(self, nu=1):
+    c = self.c
+    
+    for r in range(nu):
+      p = c.shape[0] - 1
+      if p == 0: c = np.zeros((1, c.shape[1]))
+      else:      c = c[:-1,:] * np.arange(p, 0, -1)[:,np.newaxis]
+    
+    return PiecewisePolynomial(self.xi, c)
+  
+  def antiderivative(self, nu=1):
+    if nu == 0:
+      return self
+    elif nu > 1:
+      raise NotImplementedError("Higher antiderivatives are not implemented.")
+    elif (self.leftValue != 0) or (self.rightValue != 0):
+      raise ValueError("Antiderivative is only supported for piecewise "
+                       "polynomials vanishing outside of their support.")
+    
+    p = self.getDegree()
+    c = np.vstack((self.c / np.arange(p+1, 0, -1)[:,np.newaxis],
+                   np.zeros((1, self.c.shape[1]))))
+    h = np.diff(self.xi)
+    integrals = np.zeros_like(h)
+    for q in range(p+1): integrals = integrals * h + c[q,:]
+    integrals *= h
+    c[-1,:] = np.hstack(([0], np.cumsum(integrals)[:-1]))
+    
+    return PiecewisePolynomial(self.xi, c, rightValue=np.sum(integrals))
+  
+  def shift(self, delta):
+    return PiecewisePolynomial(self.xi + delta, self.c,
+                               leftValue=self.leftValue,
+                               rightValue=self.rightValue)
+  
+  @staticmethod
+  def linearCombination(coefficients, piecewisePolynomials):
+    xi = np.unique(np.hstack([pp.xi for pp in piecewisePolynomials]))
+    p = max([pp.getDegree() for pp in piecewisePolynomials])
+    c = np.zeros((p+1, xi.size-1))
+    xxLeft = xi[:-1]
+    xxMid = (xi[:-1] + xi[1:]) / 2
+    leftValue, rightValue = 0, 0
+    
+    for coefficient, pp in zip(coefficients, piecewisePolynomials):
+      J = np.searchsorted(pp.xi, xxMid, side="right") - 1
+      K = np.logical_and(J >= 0, J < pp.xi.size - 1)
+      c[p-pp.getDegree():,K] += (
+          coefficient * pp.getShiftedCoefficients(J[K], xxLeft[K]))
+      c[-1,xxMid < pp.xi[0]] += coefficient * pp.leftValue
+      c[-1,xxMid >= pp.xi[-1]] += coefficient * pp.rightValue
+      leftValue += coefficient * pp.leftValue
+      rightValue += coefficient * pp.rightValue
+    
+    return PiecewisePolynomial(xi, c, leftValue=leftValue,
+                               rightValue=rightValue)
@@ -15,22 +15,25 @@ class SGppBasis(HierarchicalBasis):
     assert nu == 0
     
     if type(basis) is str:
-      import pysgpp
-      basisTypes = {
-        "hierarchicalBSpline" :
-          (pysgpp.SBsplineBase, HierarchicalBSpline),
-        "hierarchicalNotAKnotBSpline" :
-          (pysgpp.SNotAKnotBsplineBase, HierarchicalNotAKnotBSpline),
-        "modifiedHierarchicalNotAKnotBSpline" :
-          (pysgpp.SNotAKnotBsplineModifiedBase, ModifiedHierarchicalNotAKnotBSpline),
-        "hierarchicalWeaklyFundamentalSpline" :
-          (pysgpp.SWeaklyFundamentalSplineBase, HierarchicalWeaklyFundamentalSpline),
-        #"hierarchicalWeaklyFundamentalNotAKnotSpline" :
-        #  (pysgpp.SWeaklyFundamentalNotAKnotSplineBase, HierarchicalWeaklyFundamentalNotAKnotSpline),
-      }
-      basis = basisTypes[basis][0](p)
+      basis = SGppBasis._getBasisTypes()[basis][0](p)
     self.basis = basis
   
+  @staticmethod
+  def _getBasisTypes():
+    import pysgpp
+    return {
+      "hierarchicalBSpline" :
+        (pysgpp.SBsplineBase, HierarchicalBSpline),
+      "hierarchicalNotAKnotBSpline" :
+        (pysgpp.SNotAKnotBsplineBase, HierarchicalNotAKnotBSpline),
+      "modifiedHierarchicalNotAKnotBSpline" :
+        (pysgpp.SNotAKnotBsplineModifiedBase, ModifiedHierarchicalNotAKnotBSpline),
+      "hierarchicalWeaklyFundamentalSpline" :
+        (pysgpp.SWeaklyFundamentalSplineBase, HierarchicalWeaklyFundamentalSpline),
+      #"hierarchicalWeaklyFundamentalNotAKnotSpline" :
+      #  (pysgpp.SWeaklyFundamentalNotAKnotSplineBase, HierarchicalWeaklyFundamentalNotAKnotSpline),
+    }
+  
   def evaluate(self, l, i, xx):
     yy = np.array([self.basis.eval(np.asscalar(l), np.asscalar(i), x) for x in xx])
     return yy
@@ -38,8 +41,8 @@ class SGppBasis(HierarchicalBasis):
   def getSupport(self, l, i):
     p = self.basis.getDegree()
     
-    for basisType in SGppBasis.BASIS_TYPES.values():
+    for basisType in SGppBasis._getBasisTypes().values():
       if type(self.basis) is basisType[0]:
         return basisType[1](p).getSupport(l, i)
     
-    return NotImplementedError("Unsupported basis type.")
+    raise NotImplementedError("Unsupported basis type.")
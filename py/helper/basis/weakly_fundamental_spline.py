@@ -5,6 +5,7 @@ import scipy.linalg
 
 from .centralized_cardinal_bspline import CentralizedCardinalBSpline
 from .parent_function import ParentFunction
+from .piecewise_polynomial import PiecewisePolynomial
 
 class WeaklyFundamentalSpline(ParentFunction):
   def __init__(self, p, nu=0):
@@ -13,6 +14,10 @@ class WeaklyFundamentalSpline(ParentFunction):
     self.centralizedCardinalBSpline = CentralizedCardinalBSpline(p)
     self.evaluationBasis = CentralizedCardinalBSpline(p, nu=nu)
     self.c = self._calculateCoefficients()
+    self.piecewisePolynomial = PiecewisePolynomial.linearCombination(
+        self.c,
+        [self.evaluationBasis.getPiecewisePolynomial().shift(k)
+         for k in range(-(self.p-1)//2, (self.p+1)//2)])
   
   def _calculateCoefficients(self):
     N = self.p
@@ -31,13 +36,11 @@ class WeaklyFundamentalSpline(ParentFunction):
     return c
   
   def evaluate(self, xx):
-    yy = np.zeros_like(xx)
-    
-    for k in range(-(self.p-1)//2, (self.p+1)//2):
-      yy += (self.c[k+(self.p-1)//2] *
-             self.evaluationBasis.evaluate(xx - k))
-    
+    yy = self.piecewisePolynomial.evaluate(xx)
     return yy
   
+  def getPiecewisePolynomial(self):
+    return self.piecewisePolynomial
+  
   def getSupport(self):
     return -self.p, self.p
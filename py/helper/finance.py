@@ -95,6 +95,10 @@ class FinanceInterpolant(helper.function.Interpolant):
   def _evaluateBasis(self, k, XX):
     XXunitCube = (XX - self.bounds[0]) / (self.bounds[1] - self.bounds[0])
     return super()._evaluateBasis(k, XXunitCube)
+  
+  def getBasisMatrix(self, XX):
+    XXunitCube = (XX - self.bounds[0]) / (self.bounds[1] - self.bounds[0])
+    return super().getBasisMatrix(XXunitCube)
 
 
 
@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 
 import abc
+import inspect
 import warnings
 
 import numpy as np
@@ -9,14 +10,21 @@ import numpy as np
 
 def sgpp2np(x):
   import pysgpp
-  if type(x) is pysgpp.DataMatrix:
+  isMatrix = (type(x) is pysgpp.DataMatrix)
+  shape = ((x.getNrows(), x.getNcols()) if isMatrix else (x.getSize(),))
+  
+  if hasattr(x, "array"):
+    # bulk copy of the whole vector/matrix
+    return np.reshape(np.array(x.array(), dtype=float), shape)
+  elif isMatrix:
     return np.array([[x.get(k, j) for j in range(x.getNcols())]
-                     for k in range(x.getNrows())])
+                     for k in range(x.getNrows())]).reshape(shape)
   else:
-    return np.array([x[k] for k in range(x.getSize())])
+    return np.array([x[k] for k in range(x.getSize())]).reshape(shape)
 
 def np2sgpp(x):
   import pysgpp
+  x = np.ascontiguousarray(x, dtype=float)
   return (pysgpp.DataVector(x) if x.ndim == 1 else pysgpp.DataMatrix(x))
 
 
@@ -39,18 +47,80 @@ class Function(abc.ABC):
 
 
 class Interpolant(Function):
-  def __init__(self, basis, X, L, I, fX, aX=None):
+  def __init__(self, basis, X, L, I, fX, aX=None, chunkSize=10000,
+               solver="dense", solverTol=1e-12):
     super().__init__(X.shape[1])
     self.basis = basis
     self.X, self.L, self.I = X, L, I
     self.fX = fX
+    self.chunkSize = chunkSize
+    self.solver = solver
+    self.solverTol = solverTol
     self.aX = (aX if aX is not None else self._getSurpluses())
   
   def _getSurpluses(self):
-    A = self.getInterpolationMatrix()
-    aX = np.linalg.solve(A, self.fX)
+    fX = np.array(self.fX, dtype=float)
+    solver = self.solver
+    
+    if solver == "auto":
+      import helper.hierarchization
+      solver = ("unidirectional" if (self._getBases1D() is not None) and
+                helper.hierarchization.isDimensionallyAdaptive(
+                    self.L, self.I) else "dense")
+    
+    if solver == "dense":
+      A = self.getInterpolationMatrix()
+      aX = np.linalg.solve(A, fX)
+    elif solver == "sparse":
+      import scipy.sparse.linalg
+      A = self.getInterpolationMatrix(sparse=True)
+      aX = scipy.sparse.linalg.splu(A.tocsc()).solve(fX)
+    elif solver in ["gmres", "bicgstab"]:
+      A = self.getInterpolationMatrix(sparse=True)
+      M = self._getHierarchicalPreconditioner(A)
+      aX = (self._solveIteratively(A, fX, M) if fX.ndim == 1 else
+            np.column_stack([self._solveIteratively(A, fX[:,j], M)
+                             for j in range(fX.shape[1])]))
+    elif solver == "unidirectional":
+      import helper.hierarchization
+      aX = helper.hierarchization.hierarchizeDimensionallyAdaptive(
+          self.basis, self.X, self.L, self.I, fX)
+    else:
+      raise ValueError("Unknown solver.")
+    
     return aX
   
+  def _getHierarchicalPreconditioner(self, A):
+    # if the grid points are sorted by level sum, then the interpolation
+    # matrix is nearly lower triangular (exactly for the hat function basis),
+    # so the lower triangle of the permuted matrix is used as preconditioner
+    import scipy.sparse
+    import scipy.sparse.linalg
+    K = np.argsort(np.sum(self.L, axis=1), kind="stable")
+    APermuted = A[K,:][:,K]
+    lu = scipy.sparse.linalg.splu(
+        scipy.sparse.tril(APermuted, format="csc"), permc_spec="NATURAL",
+        diag_pivot_thresh=0, options={"SymmetricMode" : True})
+    N = A.shape[0]
+    
+    def applyPreconditioner(y):
+      x = np.zeros_like(y)
+      x[K] = lu.solve(y[K])
+      return x
+    
+    return scipy.sparse.linalg.LinearOperator(
+        (N, N), matvec=applyPreconditioner, dtype=float)
+  
+  def _solveIteratively(self, A, y, M):
+    import scipy.sparse.linalg
+    solve = {"gmres"    : scipy.sparse.linalg.gmres,
+             "bicgstab" : scipy.sparse.linalg.bicgstab}[self.solver]
+    tolName = ("rtol" if "rtol" in inspect.signature(solve).parameters else
+               "tol")
+    x, info = solve(A, y, M=M, atol=0, **{tolName : self.solverTol})
+    if info != 0: raise RuntimeError("Iterative solver did not converge.")
+    return x
+  
   def _evaluateBasis(self, k, XX):
     l, i = self.L[k,:], self.I[k,:]
     if l.shape[0] == 1:
@@ -60,29 +130,166 @@ class Interpolant(Function):
     YY = YY.flatten()
     return YY
   
-  def getInterpolationMatrix(self):
+  def _getBases1D(self):
+    import helper.basis
+    if isinstance(self.basis, helper.basis.TensorProduct):
+      return self.basis.basis1D
+    elif self.d == 1:
+      return [self.basis]
+    else:
+      return None
+  
+  @staticmethod
+  def _getBasisMatrix1D(basis1D, LI, xx):
+    # evaluate every distinct 1D basis function once, but only at the
+    # query points within its support (found by binary search on the
+    # sorted query points); supports touching the boundary of [0, 1] are
+    # extended to infinity as bases may be extrapolated outside the domain
+    import scipy.sparse
+    NN, U = xx.shape[0], LI.shape[0]
+    J = np.argsort(xx)
+    xxSorted = xx[J]
+    isPrunable = (basis1D.nu >= 0)
+    rows, columns, data = [], [], []
+    
+    for u in range(U):
+      l, i = LI[u,0], LI[u,1]
+      
+      if isPrunable:
+        try:
+          support = basis1D.getSupport(l, i)
+        except NotImplementedError:
+          support = None
+        # bases without known support are evaluated everywhere
+        lb, ub = (support if support is not None else (0, 1))
+        lb = (lb if lb > 0 else -np.inf)
+        ub = (ub if ub < 1 else np.inf)
+        JSupport = J[np.searchsorted(xxSorted, lb, side="left"):
+                     np.searchsorted(xxSorted, ub, side="right")]
+      else:
+        JSupport = J
+      
+      if JSupport.size == 0: continue
+      yy = np.array(basis1D.evaluate(l, i, xx[JSupport]),
+                    dtype=float).flatten()
+      K = (yy != 0)
+      rows.append(JSupport[K])
+      columns.append(np.full((np.count_nonzero(K),), u))
+      data.append(yy[K])
+    
+    if len(data) > 0:
+      rows, columns, data = (np.hstack(rows), np.hstack(columns),
+                             np.hstack(data))
+    
+    return scipy.sparse.csc_matrix((data, (rows, columns)), shape=(NN, U))
+  
+  def getBasisMatrix(self, XX):
+    # sparse matrix of all basis functions (columns) evaluated at
+    # all points (rows), assembled in chunks of chunkSize rows
+    import scipy.sparse
+    if XX.ndim == 1: XX = np.array([XX])
+    bases1D = self._getBases1D()
     N = self.X.shape[0]
-    A = np.zeros((N, N))
     
-    for k in range(N):
-      A[:,k] = self._evaluateBasis(k, self.X)
+    if bases1D is None:
+      return scipy.sparse.csr_matrix(np.column_stack(
+          [self._evaluateBasis(k, XX) for k in range(N)]))
     
-    return A
+    return scipy.sparse.vstack(
+        [self._getBasisMatrixChunk(bases1D, XX[k:k+self.chunkSize])
+         for k in range(0, max(XX.shape[0], 1), self.chunkSize)],
+        format="csr")
+  
+  def _getBasisMatrixChunk(self, bases1D, XX):
+    # the grid points are grouped by their level vectors (subspaces); in a
+    # subspace, the basis functions that do not vanish at a point are
+    # the tensor products of the 1D basis functions of the subspace's
+    # indices that do not vanish, which are combined dimension by dimension,
+    # such that no intermediate is (much) larger than the result
+    import scipy.sparse
+    NN, N = XX.shape[0], self.X.shape[0]
+    
+    # 1D basis matrices (rows: points, columns: distinct indices) per level
+    factors = []
+    
+    for t in range(self.d):
+      factors.append({})
+      
+      for l in np.unique(self.L[:,t]):
+        i = np.unique(self.I[self.L[:,t] == l, t])
+        LI = np.column_stack((np.full(i.shape, l), i))
+        Bt = Interpolant._getBasisMatrix1D(bases1D[t], LI, XX[:,t]).tocsr()
+        Bt.sort_indices()
+        factors[t][l] = (Bt, i)
+    
+    LSubspaces, subspaces = np.unique(self.L, axis=0, return_inverse=True)
+    subspaces = subspaces.flatten()
+    K = np.argsort(subspaces, kind="stable")
+    starts = np.searchsorted(subspaces[K], np.arange(LSubspaces.shape[0] + 1))
+    rows, columns, data = [], [], []
+    
+    for s in range(LSubspaces.shape[0]):
+      KSubspace = K[starts[s]:starts[s+1]]
+      # positions of the indices of the grid points among the distinct
+      # indices of the subspace in every dimension
+      ISubspace = [np.unique(self.I[KSubspace,t]) for t in range(self.d)]
+      shape = tuple(x.size for x in ISubspace)
+      keys = np.ravel_multi_index(tuple(
+          np.searchsorted(ISubspace[t], self.I[KSubspace,t])
+          for t in range(self.d)), shape)
+      J = np.argsort(keys)
+      keys, KSubspace = keys[J], KSubspace[J]
+      
+      rowsSubspace = np.arange(NN)
+      positions = np.zeros((self.d, NN), dtype=np.int64)
+      dataSubspace = np.ones((NN,))
+      
+      for t in range(self.d):
+        Bt, i = factors[t][LSubspaces[s,t]]
+        # nonzero entries of Bt in the rows of the current combinations
+        rowStarts = Bt.indptr[rowsSubspace]
+        counts = Bt.indptr[rowsSubspace + 1] - rowStarts
+        combinations = np.repeat(np.arange(rowsSubspace.size), counts)
+        entries = (np.arange(combinations.size) -
+                   np.repeat(np.cumsum(counts) - counts, counts) +
+                   rowStarts[combinations])
+        # drop indices that no grid point of the subspace has
+        position = np.searchsorted(ISubspace[t], i[Bt.indices[entries]])
+        position = np.minimum(position, ISubspace[t].size - 1)
+        isInSubspace = (ISubspace[t][position] == i[Bt.indices[entries]])
+        combinations = combinations[isInSubspace]
+        rowsSubspace = rowsSubspace[combinations]
+        positions = positions[:,combinations]
+        positions[t] = position[isInSubspace]
+        dataSubspace = (dataSubspace[combinations] *
+                        Bt.data[entries[isInSubspace]])
+      
+      # keep the combinations that are grid points
+      keysSubspace = np.ravel_multi_index(tuple(positions), shape)
+      J = np.minimum(np.searchsorted(keys, keysSubspace), keys.size - 1)
+      isGridPoint = (keys[J] == keysSubspace)
+      rows.append(rowsSubspace[isGridPoint])
+      columns.append(KSubspace[J[isGridPoint]])
+      data.append(dataSubspace[isGridPoint])
+    
+    if len(data) > 0:
+      rows, columns, data = (np.hstack(rows), np.hstack(columns),
+                             np.hstack(data))
+    
+    return scipy.sparse.csr_matrix((data, (rows, columns)), shape=(NN, N))
+  
+  def getInterpolationMatrix(self, sparse=False):
+    A = self.getBasisMatrix(self.X)
+    return (A if sparse else A.toarray())
   
   def evaluate(self, XX):
     if XX.ndim == 1: XX = np.array([XX])
-    N, NN = self.X.shape[0], XX.shape[0]
+    NN = XX.shape[0]
+    YY = np.zeros((NN,) + self.aX.shape[1:])
     
-    if self.aX.ndim == 1:
-      YY = np.zeros((NN,))
-      for k in range(N): YY += self.aX[k] * self._evaluateBasis(k, XX)
-    else:
-      m = self.aX.shape[1]
-      YY = np.zeros((NN, m))
-      
-      for k in range(N):
-        YY += (np.reshape(self.aX[k,:], (1, m)) *
-               np.reshape(self._evaluateBasis(k, XX), (NN, 1)))
+    for k in range(0, NN, self.chunkSize):
+      YY[k:k+self.chunkSize] = self.getBasisMatrix(
+          XX[k:k+self.chunkSize]) @ self.aX
     
     return YY
 
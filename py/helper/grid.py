@@ -27,6 +27,67 @@ def getHierarchicalIndices(l):
 
 
 
+def appendLevelColumn(L, start, count):
+  # append a column to the level multi-indices L, where the k-th row is
+  # repeated count[k] times with the values start[k], ..., start[k]+count[k]-1
+  count = np.maximum(count, 0)
+  K = np.repeat(np.arange(L.shape[0]), count)
+  lt = (np.arange(K.size) - np.repeat(np.cumsum(count) - count, count) +
+        np.asarray(start)[K])
+  return np.column_stack((L[K], lt)).astype(int)
+
+def getLevelsOfBoundedNorm(n, d, lMin=1):
+  # all level multi-indices l >= lMin with |l|_1 <= n in lexicographic order
+  L = np.zeros((1, 0), dtype=int)
+  
+  for t in range(d):
+    lStar = n - np.sum(L, axis=1) - (d - t - 1) * lMin
+    L = appendLevelColumn(L, lMin * np.ones_like(lStar), lStar - lMin + 1)
+  
+  return L
+
+def getNumbersOfHierarchicalPoints(L):
+  # the numbers of points per level and dimension are powers of two
+  log2N1D = np.where(L == 0, 1, np.maximum(L - 1, 0))
+  return log2N1D, 2**np.sum(log2N1D, axis=1)
+
+def getHierarchicalPointsOfLevels(L, start=0, stop=None):
+  # levels and indices of the points start, ..., stop-1 of the concatenation
+  # of the hierarchical increments of the levels L, decoded in mixed radix
+  # (same order as getHierarchicalIndices, i.e., last dimension fastest)
+  L = np.array(L, dtype=int)
+  d = L.shape[1]
+  log2N1D, N = getNumbersOfHierarchicalPoints(L)
+  offsets = np.hstack(([0], np.cumsum(N)))
+  if stop is None: stop = offsets[-1]
+  K = np.arange(start, stop)
+  J = np.searchsorted(offsets, K, side="right") - 1
+  R = K - offsets[J]
+  IChunk = []
+  
+  for t in range(d-1, -1, -1):
+    log2N1DChunk = log2N1D[:,t][J]
+    it = R & ((1 << log2N1DChunk) - 1)
+    R >>= log2N1DChunk
+    IChunk.append(np.where(L[:,t][J] == 0, it, 2 * it + 1))
+  
+  LChunk = L[J]
+  IChunk = (np.column_stack(IChunk[::-1]) if d > 0 else
+            np.zeros((K.size, 0), dtype=int))
+  
+  return LChunk, IChunk
+
+def generateChunksOfLevels(L, chunkSize):
+  L = np.array(L, dtype=int)
+  N = (np.sum(getNumbersOfHierarchicalPoints(L)[1]) if L.size > 0 else 0)
+  
+  for start in range(0, N, chunkSize):
+    LChunk, IChunk = getHierarchicalPointsOfLevels(
+        L, start, min(start + chunkSize, N))
+    yield getCoordinates(LChunk, IChunk), LChunk, IChunk
+
+
+
 def convertNodalToHierarchical(L, I):
   if np.isscalar(L):
     if L == 0:
@@ -134,44 +195,30 @@ class RegularSparse(object):
       return sum([2**q * scipy.special.comb(self.d - 1 + q, self.d - 1, exact=True)
                   for q in range(self.n - self.d + 1)])
   
+  def getLevels(self):
+    return getLevelsOfBoundedNorm(self.n, self.d)
+  
   def generate(self):
-    n = self.n
-    d = self.d
-    N = self.getSize()
-    L = np.zeros((N, d), dtype=int)
-    I = np.zeros((N, d), dtype=int)
-    l = np.ones((d,), dtype=int)
-    l1 = d
-    i = np.ones((d,), dtype=int)
-    t = 0
-    m = 0
+    L, I = getHierarchicalPointsOfLevels(self.getLevels())
+    # sort the points in depth-first order of the hierarchical trees
+    # (dimension-wise post-order, i.e., by the right end of the support
+    # and then by descending level, with the first dimension being primary)
+    keys = []
     
-    def generateRecursively():
-      nonlocal n, d, L, I, l, l1, i, t, m
-      
-      if t == d:
-        L[m,:] = l
-        I[m,:] = i
-        m += 1
-      elif l1 <= n:
-        l[t] += 1
-        l1 += 1
-        i[t] = 2 * i[t] - 1
-        generateRecursively()
-        i[t] += 2
-        generateRecursively()
-        l[t] -= 1
-        l1 -= 1
-        i[t] = (i[t] - 1) / 2
-        
-        t += 1
-        generateRecursively()
-        t -= 1
+    for t in range(self.d-1, -1, -1):
+      keys.append(-L[:,t])
+      keys.append((I[:,t] + 1) * 2**(self.n - L[:,t]))
     
-    generateRecursively()
-    X = I / 2**L
+    if len(keys) > 0:
+      K = np.lexsort(keys)
+      L, I = L[K], I[K]
     
+    X = I / 2**L
     return X, L, I
+  
+  def generateChunks(self, chunkSize=2**20):
+    # in contrast to generate, the points are ordered level by level
+    return generateChunksOfLevels(self.getLevels(), chunkSize)
 
 
 
@@ -194,53 +241,42 @@ class RegularSparseBoundary(object):
     else:
       raise ValueError("Invalid value for b.")
   
-  def generate(self, testCallback=None):
+  def getLevels(self, testCallback=None):
     n, d, b = self.n, self.d, self.b
     
     if self.b == 0:
-      oldL = [[l] for l in range(n+1)]
-      newL = list(oldL)
+      L = np.arange(n+1)[:,np.newaxis]
       
       for t in range(2, d+1):
-        newL = []
-        
-        for l in oldL:
-          lNorm = sum(l)
-          lStar = n - lNorm
-          newL.extend([(*l, lt) for lt in range(0, lStar+1)])
-        
-        oldL = list(newL)
-        if testCallback is not None: testCallback(n, d, b, t, newL)
-      
-      L = np.array(newL)
+        L = appendLevelColumn(L, np.zeros(L.shape[0], dtype=int),
+                              n - np.sum(L, axis=1) + 1)
+        if testCallback is not None: testCallback(n, d, b, t, L)
     
     elif self.b >= 1:
-      oldL = [[l] for l in range(n-d+2)]
-      newL = list(oldL)
+      L = np.arange(max(n-d+2, 0))[:,np.newaxis]
       
       for t in range(2, d+1):
-        newL = []
-        
-        for l in oldL:
-          lNorm = sum(l)
-          Nl = sum([lt == 0 for lt in l])
-          
-          if (lNorm + Nl <= n - d + t - b) or (Nl == t-1):
-            newL.append((*l, 0))
-          
-          if Nl == 0: lStar = n - d + t - lNorm
-          else:       lStar = n - d + t - b + 1 - lNorm - Nl
-          newL.extend([(*l, lt) for lt in range(1, lStar+1)])
-        
-        oldL = list(newL)
-        if testCallback is not None: testCallback(n, d, b, t, newL)
-      
-      L = np.array(newL)
+        lNorm = np.sum(L, axis=1)
+        Nl = np.sum(L == 0, axis=1)
+        include0 = (lNorm + Nl <= n - d + t - b) | (Nl == t-1)
+        lStar = np.where(Nl == 0, n - d + t - lNorm,
+                         n - d + t - b + 1 - lNorm - Nl)
+        L = appendLevelColumn(L, np.where(include0, 0, 1),
+                              np.maximum(lStar, 0) + include0)
+        if testCallback is not None: testCallback(n, d, b, t, L)
     
     else:
       raise ValueError("Invalid value for b.")
     
-    return DimensionallyAdaptiveSparse(L).generate()
+    return L
+  
+  def generate(self, testCallback=None):
+    return DimensionallyAdaptiveSparse(self.getLevels(
+        testCallback=testCallback)).generate()
+  
+  def generateChunks(self, chunkSize=2**20):
+    return DimensionallyAdaptiveSparse(self.getLevels()).generateChunks(
+        chunkSize=chunkSize)
 
 
 
@@ -249,17 +285,19 @@ class DimensionallyAdaptiveSparse(object):
     self.L = np.array(L)
   
   def generate(self):
-    I = [getHierarchicalIndices(self.L[k,:]) for k in range(self.L.shape[0])]
-    
-    if len(I) > 0:
-      L = np.vstack([np.tile(self.L[k,:], [I[k].shape[0], 1])
-                     for k in range(self.L.shape[0])])
-      I = np.vstack(I)
+    if self.L.shape[0] == 0:
+      L, I = np.array([]), np.array([])
     else:
-      L = np.array([])
+      L, I = getHierarchicalPointsOfLevels(self.L)
     
     X = getCoordinates(L, I)
     return X, L, I
+  
+  def generateChunks(self, chunkSize=2**20):
+    # generator of blocks (X, L, I) of at most chunkSize points, whose
+    # concatenation equals the output of generate
+    if self.L.shape[0] > 0:
+      yield from generateChunksOfLevels(self.L, chunkSize)
 
 
 
@@ -324,18 +362,23 @@ class SGppGrid(object):
     return self.getPoints()
   
   def getPoints(self):
+    import pysgpp
+    import helper.function
     gridStorage = self.grid.getStorage()
     N = gridStorage.getSize()
     d = gridStorage.getDimension()
-    L = np.zeros((N, d), dtype=np.uint64)
-    I = np.zeros((N, d), dtype=np.uint64)
     
-    for k in range(N):
-      gp = gridStorage.getPoint(k)
-      
-      for t in range(d):
-        L[k,t] = gp.getLevel(t)
-        I[k,t] = gp.getIndex(t)
+    if N == 0:
+      L = np.zeros((N, d), dtype=np.uint64)
+      I = np.zeros((N, d), dtype=np.uint64)
+    else:
+      # bulk export of all levels (as 2^l) and indices in one call
+      levelMatrix = pysgpp.DataMatrix(N, d)
+      indexMatrix = pysgpp.DataMatrix(N, d)
+      gridStorage.getLevelIndexArraysForEval(levelMatrix, indexMatrix)
+      L = np.round(np.log2(helper.function.sgpp2np(levelMatrix)))
+      I = np.round(helper.function.sgpp2np(indexMatrix))
+      L, I = L.astype(np.uint64), I.astype(np.uint64)
     
     X = getCoordinates(L, I)
     return X, L, I
@@ -344,14 +387,15 @@ class SGppGrid(object):
     import pysgpp
     gridStorage = self.grid.getStorage()
     gridStorage.clear()
-    N = L.shape[0]
     d = gridStorage.getDimension()
     gp = pysgpp.HashGridPoint(d)
+    # conversion to lists of Python integers in one go is much faster than
+    # converting each NumPy integer separately
+    L = np.asarray(L, dtype=np.int64).tolist()
+    I = np.asarray(I, dtype=np.int64).tolist()
     
-    for k in range(N):
-      for t in range(d):
-        gp.set(t, int(L[k,t]), int(I[k,t]))
-      
+    for l, i in zip(L, I):
+      for t in range(d): gp.set(t, l[t], i[t])
       gridStorage.insert(gp)
   
   def __str__(self):
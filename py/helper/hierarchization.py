@@ -0,0 +1,200 @@
+#!/usr/bin/python3
+
+import functools
+import multiprocessing
+
+import numpy as np
+import scipy.linalg
+
+import helper.grid
+
+
+
+def convertToContinuous(L, I):
+  L, I = np.array(L), np.array(I)
+  J = (I > 0)
+  # strip trailing zero bits of the nodal indices to get hierarchical indices
+  trailingZeros = np.zeros_like(L)
+  trailingZeros[J] = np.log2(I[J] & -I[J]).astype(L.dtype)
+  L2, I2 = L - trailingZeros, I // 2**trailingZeros
+  L2[~J], I2[~J] = 0, 0
+  J = (L2 >= 1)
+  K = np.array(I2)
+  K[J] = 2**(L2[J]-1) + (I2[J]+1)//2
+  return K
+
+def convertContinuousToHierarchical(K):
+  K = np.array(K)
+  L = np.zeros_like(K)
+  I = np.array(K)
+  J = (K >= 2)
+  L[J] = np.floor(np.log2(K[J]-1)).astype(K.dtype) + 1
+  I[J] = 2 * (K[J] - 2**(L[J]-1)) - 1
+  return L, I
+
+
+
+def getPoles(K, t):
+  d = K.shape[1]
+  otherT = [t2 for t2 in range(d) if t2 != t]
+  # sort lexicographically by the other coordinates, then by the t-th one,
+  # such that every pole is a contiguous block of the sorted order
+  J = np.lexsort([K[:,t]] + [K[:,t2] for t2 in otherT[::-1]])
+  KOther = K[J][:,otherT]
+  isNewPole = np.hstack(([True], np.any(KOther[1:] != KOther[:-1], axis=1)))
+  poles = np.split(J, np.flatnonzero(isNewPole)[1:])
+  return poles
+
+def getPoleGroups(K, t):
+  # poles containing the same 1D points share the same 1D matrix
+  poleGroups = {}
+  
+  for pole in getPoles(K, t):
+    key = K[pole,t].tobytes()
+    if key in poleGroups: poleGroups[key].append(pole)
+    else:                 poleGroups[key] = [pole]
+  
+  return [np.column_stack(poles) for poles in poleGroups.values()]
+
+
+
+def getInterpolationMatrix1D(basis1D, x, k, hierarchical=True):
+  l, i = convertContinuousToHierarchical(k)
+  if not hierarchical:
+    l, i = helper.grid.convertHierarchicalToNodal(l, i, np.max(l))
+  A = np.column_stack([basis1D.evaluate(l[j], i[j], x)
+                       for j in range(k.size)])
+  return A
+
+def processPoleGroup(basis1D, x, k, Y, hierarchical=True, mode="hierarchize",
+                     luFactorization=None):
+  if mode == "dehierarchize":
+    A = getInterpolationMatrix1D(basis1D, x, k, hierarchical=hierarchical)
+    return np.dot(A, Y)
+  elif mode == "hierarchize":
+    if luFactorization is None:
+      luFactorization = scipy.linalg.lu_factor(getInterpolationMatrix1D(
+          basis1D, x, k, hierarchical=hierarchical))
+    return scipy.linalg.lu_solve(luFactorization, Y)
+  else:
+    raise ValueError("Unknown mode.")
+
+def getBases1D(basis, d):
+  return (basis.basis1D if hasattr(basis, "basis1D") else d * [basis])
+
+def unidirectionalPrinciple(basis, X, L, I, fX, T=None, hierarchical=True,
+                            mode="hierarchize", parallel=False):
+  N, d = X.shape
+  bases1D = getBases1D(basis, d)
+  K = convertToContinuous(L, I)
+  y = np.array(fX, dtype=float)
+  if T is None: T = range(d)
+  luFactorizationCache = {}
+  pool = (multiprocessing.Pool() if parallel else None)
+  
+  try:
+    for t in T:
+      poleGroups = getPoleGroups(K, t)
+      # the t-th coordinates and the continuous indices of the first pole
+      # are the same for all poles of the group
+      args = [(bases1D[t], X[poleGroup[:,0],t], K[poleGroup[:,0],t],
+               np.reshape(y[poleGroup], (poleGroup.shape[0], -1)))
+              for poleGroup in poleGroups]
+      
+      if parallel:
+        results = pool.starmap(functools.partial(
+            processPoleGroup, hierarchical=hierarchical, mode=mode), args)
+      else:
+        results = []
+        
+        for basis1D, x, k, Y in args:
+          luFactorization = None
+          
+          if mode == "hierarchize":
+            key = (basis1D, x.tobytes(), k.tobytes())
+            if key not in luFactorizationCache:
+              luFactorizationCache[key] = scipy.linalg.lu_factor(
+                  getInterpolationMatrix1D(basis1D, x, k,
+                                           hierarchical=hierarchical))
+            luFactorization = luFactorizationCache[key]
+          
+          results.append(processPoleGroup(
+              basis1D, x, k, Y, hierarchical=hierarchical, mode=mode,
+              luFactorization=luFactorization))
+      
+      for poleGroup, Y in zip(poleGroups, results):
+        y[poleGroup] = np.reshape(Y, y[poleGroup].shape)
+  finally:
+    if parallel:
+      pool.close()
+      pool.join()
+  
+  return y
+
+
+
+def getActiveLevels(L, minLevel=None):
+  L = np.array(L)
+  levels = np.unique(L, axis=0)
+  if minLevel is None: minLevel = np.min(L, axis=0)
+  levelSet = set(tuple(l) for l in levels)
+  
+  for l in levels:
+    for t in range(L.shape[1]):
+      if l[t] > minLevel[t]:
+        l2 = np.array(l)
+        l2[t] -= 1
+        if tuple(l2) not in levelSet: return None
+  
+  isActive = [not np.any(np.all(levels >= l, axis=1) &
+                         np.any(levels > l, axis=1))
+              for l in levels]
+  return levels[isActive]
+
+def isDimensionallyAdaptive(L, I):
+  L = np.array(L)
+  if getActiveLevels(L) is None: return False
+  levels, counts = np.unique(L, axis=0, return_counts=True)
+  # number of hierarchical indices of level l is 2 for l = 0 and
+  # 2^(l-1) for l >= 1
+  expectedCounts = np.prod(np.where(levels == 0, 2, 2**(levels - 1.0)),
+                           axis=1)
+  isUnique = (np.unique(np.column_stack((L, I)), axis=0).shape[0] ==
+              L.shape[0])
+  return isUnique and np.all(counts == expectedCounts)
+
+def hierarchizeFullGrid(basis, X, L, I, fX, hierarchical=True,
+                        parallel=False):
+  return unidirectionalPrinciple(basis, X, L, I, fX,
+                                 hierarchical=hierarchical, parallel=parallel)
+
+def hierarchizeDimensionallyAdaptive(basis, X, L, I, fX, parallel=False):
+  import helper.function
+  
+  if not isDimensionallyAdaptive(L, I):
+    raise ValueError("Grid is not dimensionally adaptive.")
+  
+  # residual interpolation: interpolate the residual on the full grids of
+  # the active levels (via the unidirectional principle) in order of
+  # decreasing level sum; the residual vanishes on the full grids that
+  # have already been processed, so it only has to be updated on the others
+  activeLevels = getActiveLevels(L)
+  activeLevels = activeLevels[np.argsort(-np.sum(activeLevels, axis=1),
+                                         kind="stable")]
+  rX = np.array(fX, dtype=float)
+  aX = np.zeros_like(rX)
+  isDone = np.zeros((X.shape[0],), dtype=bool)
+  
+  for l in activeLevels:
+    J = np.all(L <= l, axis=1)
+    aXl = unidirectionalPrinciple(basis, X[J], L[J], I[J], rX[J],
+                                  parallel=parallel)
+    aX[J] += aXl
+    rX[J] = 0
+    isDone[J] = True
+    
+    if not np.all(isDone):
+      rX[~isDone] -= helper.function.Interpolant(
+          basis, X[J], L[J], I[J], None, aX=aXl).evaluate(X[~isDone])
+  
+  return aX
@@ -1,20 +1,24 @@
 #!/usr/bin/python3
 
 import atexit
+import concurrent.futures
+import contextlib
+import fnmatch
 import functools
+import hashlib
 import inspect
 import lzma
-import multiprocessing
-import multiprocessing.managers
 import os
 import pickle
 import secrets
-import signal
 import socket
+import sqlite3
 import subprocess
 import time
 import warnings
 
+import numpy as np
+
 import helper.remotely
 
 
@@ -30,7 +34,7 @@ def getCachePath(path=None):
     
     for frame in stack:
       if frame.filename != stack[0].filename:
-        basename = "{}.cache.xz".format(
+        basename = "{}.cache.sqlite".format(
             os.path.splitext(os.path.basename(frame.filename))[0])
         dirname = (os.path.dirname(frame.filename) if path is None else path)
         path = os.path.join(dirname, basename)
@@ -38,109 +42,488 @@ def getCachePath(path=None):
   
   return path
 
-multiprocessingManager = multiprocessing.managers.SyncManager()
-multiprocessingManager.start(signal.signal, (signal.SIGINT, signal.SIG_IGN))
+def getLegacyCachePath(path):
+  return "{}.xz".format(os.path.splitext(path)[0])
+
+def getCallString(funcName, arguments):
+  return "{}({})".format(funcName,
+      ", ".join(["{}={}".format(x, repr(y)) for x, y in arguments]))
 
-def cacheToFile(func, path=None):
+class CacheStore(object):
+  # SQLite database with one row per cached function call; values are
+  # pickled with protocol 5, such that the data of NumPy arrays is stored
+  # out-of-band as raw buffers (no compression and no pickling of array
+  # data), and entries are only loaded and written when they are needed
+  SCHEMA = """
+      CREATE TABLE IF NOT EXISTS entries (
+        funcName TEXT NOT NULL,
+        key TEXT NOT NULL,
+        callString TEXT NOT NULL,
+        arguments BLOB NOT NULL,
+        value BLOB NOT NULL,
+        created REAL NOT NULL,
+        PRIMARY KEY (funcName, key));
+      CREATE TABLE IF NOT EXISTS buffers (
+        funcName TEXT NOT NULL,
+        key TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        data BLOB NOT NULL,
+        PRIMARY KEY (funcName, key, position));
+      CREATE TABLE IF NOT EXISTS statistics (
+        funcName TEXT NOT NULL PRIMARY KEY,
+        hits INTEGER NOT NULL DEFAULT 0,
+        misses INTEGER NOT NULL DEFAULT 0,
+        computeTime REAL NOT NULL DEFAULT 0,
+        savedTime REAL NOT NULL DEFAULT 0);"""
+  ENTRY_COLUMNS = [("size", "INTEGER NOT NULL DEFAULT 0"),
+                   ("computeTime", "REAL NOT NULL DEFAULT 0"),
+                   ("lastAccess", "REAL NOT NULL DEFAULT 0"),
+                   ("hits", "INTEGER NOT NULL DEFAULT 0")]
+  
+  # access statistics of cache hits are collected in memory and written
+  # in one transaction after this many hits or seconds (or when the
+  # statistics are needed), such that cache hits do not take the write lock
+  FLUSH_HITS = 100
+  FLUSH_INTERVAL = 10
+  
+  def __init__(self, path, timeout=600):
+    self.path = path
+    self.timeout = timeout
+    self.depth = 0
+    self.ignoreDepth = 0
+    self.connection = None
+    self.pid = None
+    self.pendingAccesses = {}
+    self.pendingStatistics = {}
+    self.lastFlush = time.time()
+  
+  def getConnection(self):
+    # SQLite connections must not be shared with forked worker processes
+    if (self.connection is None) or (self.pid != os.getpid()):
+      self.connection = sqlite3.connect(
+          self.path, timeout=self.timeout, isolation_level=None)
+      # pending statistics of the parent process are flushed by the parent
+      if self.pid is not None: self.clearPendingStatistics()
+      self.pid = os.getpid()
+      self.connection.execute("PRAGMA journal_mode=WAL")
+      self.connection.execute("PRAGMA synchronous=NORMAL")
+      self.connection.executescript(CacheStore.SCHEMA)
+      columns = [x[1] for x in
+                 self.connection.execute("PRAGMA table_info(entries)")]
+      
+      if any([x not in columns for x, _ in CacheStore.ENTRY_COLUMNS]):
+        self.migrate(columns)
+    
+    return self.connection
+  
+  def migrate(self, columns):
+    # add columns missing in cache files of older versions
+    with self.transaction() as connection:
+      for column, definition in CacheStore.ENTRY_COLUMNS:
+        if column not in columns:
+          query = "ALTER TABLE entries ADD COLUMN {} {}"
+          connection.execute(query.format(column, definition))
+      
+      connection.execute(
+          "UPDATE entries SET lastAccess = created, size = LENGTH(value) + "
+          "(SELECT IFNULL(SUM(LENGTH(data)), 0) FROM buffers "
+          "WHERE buffers.funcName = entries.funcName AND "
+          "buffers.key = entries.key)")
+  
+  @contextlib.contextmanager
+  def transaction(self, timeout=None):
+    # timeout: seconds to wait for the write lock (default: self.timeout)
+    connection = self.getConnection()
+    
+    if timeout is None:
+      connection.execute("BEGIN IMMEDIATE")
+    else:
+      connection.execute("PRAGMA busy_timeout = {:d}".format(
+          int(1000 * timeout)))
+      try:
+        connection.execute("BEGIN IMMEDIATE")
+      finally:
+        connection.execute("PRAGMA busy_timeout = {:d}".format(
+            int(1000 * self.timeout)))
+    
+    try:
+      yield connection
+    except:
+      connection.execute("ROLLBACK")
+      raise
+    else:
+      connection.execute("COMMIT")
+  
+  def close(self):
+    if (self.connection is not None) and (self.pid == os.getpid()):
+      self.flushStatistics(force=True)
+      self.connection.close()
+    
+    self.connection = None
+    self.pid = None
+    self.clearPendingStatistics()
+  
+  @staticmethod
+  def encode(value):
+    # canonical string representation of function arguments, such that
+    # arguments that are equal as dict keys get the same cache key
+    # (e.g., 1, 1.0, True, and np.int64(1)) and the representation does not
+    # depend on the process (e.g., the iteration order of sets of strings);
+    # supported are None, bool, int, float, complex, str, bytes, NumPy
+    # scalars and arrays (object arrays of supported values as well), and
+    # tuples, lists, dicts, sets, and frozensets of supported values; other
+    # objects are represented by their pickle (which might not be canonical)
+    if value is None:
+      return "None"
+    elif isinstance(value, (bool, int, float, complex, np.number, np.bool_)):
+      value = complex(value)
+      if value.imag != 0: return "c{!r},{!r}".format(value.real, value.imag)
+      value = value.real
+      return ("i{:d}".format(int(value)) if value.is_integer() else
+              "f{!r}".format(value))
+    elif isinstance(value, str):
+      return "s{!r}".format(value)
+    elif isinstance(value, (bytes, bytearray)):
+      return "b{}".format(bytes(value).hex())
+    elif isinstance(value, np.ndarray) and (value.dtype == object):
+      # the bytes of object arrays are pointers, so encode the elements
+      return "o{}{}".format(value.shape, CacheStore.encode(value.tolist()))
+    elif isinstance(value, np.ndarray):
+      value = np.ascontiguousarray(value)
+      return "a{}{}{}".format(value.dtype.str, value.shape,
+                              hashlib.sha256(value.tobytes()).hexdigest())
+    elif isinstance(value, tuple):
+      return "({})".format(",".join([CacheStore.encode(x) for x in value]))
+    elif isinstance(value, list):
+      return "[{}]".format(",".join([CacheStore.encode(x) for x in value]))
+    elif isinstance(value, dict):
+      return "{{{}}}".format(",".join(sorted(
+          ["{}:{}".format(CacheStore.encode(x), CacheStore.encode(y))
+           for x, y in value.items()])))
+    elif isinstance(value, (set, frozenset)):
+      return "<{}>".format(",".join(sorted(
+          [CacheStore.encode(x) for x in value])))
+    else:
+      return "p{}".format(pickle.dumps(value, protocol=4).hex())
+  
+  @staticmethod
+  def getKey(arguments):
+    return hashlib.sha256(
+        CacheStore.encode(arguments).encode()).hexdigest()
+  
+  @staticmethod
+  def serialize(value):
+    buffers = []
+    data = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+    return data, [buffer.raw() for buffer in buffers]
+  
+  @staticmethod
+  def deserialize(data, buffers):
+    return pickle.loads(data, buffers=[bytearray(x) for x in buffers])
+  
+  def load(self, funcName, key, maxAge=None):
+    connection = self.getConnection()
+    row = connection.execute(
+        "SELECT value, created, computeTime FROM entries "
+        "WHERE funcName = ? AND key = ?", (funcName, key)).fetchone()
+    if row is None: return False, None
+    data, created, computeTime = row
+    now = time.time()
+    
+    if (maxAge is not None) and (now - created > maxAge):
+      self.delete([(funcName, key)])
+      return False, None
+    
+    buffers = [x for x, in connection.execute(
+        "SELECT data FROM buffers WHERE funcName = ? AND key = ? "
+        "ORDER BY position", (funcName, key))]
+    value = CacheStore.deserialize(data, buffers)
+    
+    hits, _ = self.pendingAccesses.get((funcName, key), (0, now))
+    self.pendingAccesses[(funcName, key)] = (hits + 1, now)
+    hits, savedTime = self.pendingStatistics.get(funcName, (0, 0))
+    self.pendingStatistics[funcName] = (hits + 1, savedTime + computeTime)
+    self.flushStatistics()
+    
+    return True, value
+  
+  def clearPendingStatistics(self):
+    self.pendingAccesses = {}
+    self.pendingStatistics = {}
+    self.lastFlush = time.time()
+  
+  def flushStatistics(self, force=False):
+    # write the collected access statistics of cache hits; unless forced,
+    # this is only done after FLUSH_HITS hits or FLUSH_INTERVAL seconds and
+    # only if the write lock is free (otherwise, it is retried later)
+    if len(self.pendingStatistics) == 0: return
+    numberOfHits = sum([x for x, _ in self.pendingStatistics.values()])
+    
+    if (not force) and (numberOfHits < CacheStore.FLUSH_HITS) and (
+        time.time() - self.lastFlush < CacheStore.FLUSH_INTERVAL):
+      return
+    
+    try:
+      with self.transaction(timeout=(None if force else 0)) as connection:
+        connection.executemany(
+            "UPDATE entries SET lastAccess = MAX(lastAccess, ?), "
+            "hits = hits + ? WHERE funcName = ? AND key = ?",
+            [(lastAccess, hits, funcName, key) for (funcName, key),
+             (hits, lastAccess) in self.pendingAccesses.items()])
+        connection.executemany(
+            "INSERT OR IGNORE INTO statistics (funcName) VALUES (?)",
+            [(funcName,) for funcName in self.pendingStatistics])
+        connection.executemany(
+            "UPDATE statistics SET hits = hits + ?, "
+            "savedTime = savedTime + ? WHERE funcName = ?",
+            [(hits, savedTime, funcName) for funcName, (hits, savedTime) in
+             self.pendingStatistics.items()])
+    except sqlite3.OperationalError:
+      if force: raise
+      return
+    
+    self.clearPendingStatistics()
+  
+  def save(self, funcName, key, arguments, value, computeTime=0,
+           updateStatistics=True):
+    # updateStatistics: count the entry as cache miss in the statistics
+    data, buffers = CacheStore.serialize(value)
+    size = len(data) + sum([buffer.nbytes for buffer in buffers])
+    callString = getCallString(funcName, arguments)
+    arguments = pickle.dumps(arguments, protocol=4)
+    now = time.time()
+    
+    with self.transaction() as connection:
+      connection.execute(
+          "DELETE FROM buffers WHERE funcName = ? AND key = ?",
+          (funcName, key))
+      connection.execute(
+          "INSERT OR REPLACE INTO entries (funcName, key, callString, "
+          "arguments, value, created, size, computeTime, lastAccess) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+          (funcName, key, callString, arguments, data, now, size,
+           computeTime, now))
+      connection.executemany(
+          "INSERT INTO buffers VALUES (?, ?, ?, ?)",
+          [(funcName, key, j, buffer) for j, buffer in enumerate(buffers)])
+      
+      if updateStatistics:
+        connection.execute(
+            "INSERT OR IGNORE INTO statistics (funcName) VALUES (?)",
+            (funcName,))
+        connection.execute(
+            "UPDATE statistics SET misses = misses + 1, "
+            "computeTime = computeTime + ? WHERE funcName = ?",
+            (computeTime, funcName))
+  
+  def delete(self, keys):
+    with self.transaction() as connection:
+      for table in ["entries", "buffers"]:
+        connection.executemany(
+            "DELETE FROM {} WHERE funcName = ? AND key = ?".format(table),
+            keys)
+  
+  def evict(self, funcName, maxBytes):
+    # least recently used entries are evicted first
+    self.flushStatistics(force=True)
+    rows = self.getConnection().execute(
+        "SELECT key, size FROM entries WHERE funcName = ? "
+        "ORDER BY lastAccess DESC", (funcName,)).fetchall()
+    totalSize = 0
+    keys = []
+    
+    for key, size in rows:
+      totalSize += size
+      if totalSize > maxBytes: keys.append((funcName, key))
+    
+    if len(keys) > 0: self.delete(keys)
+    return len(keys)
+  
+  def invalidate(self, funcName=None, pattern=None, arguments=None):
+    # pattern is a shell-style wildcard pattern matched against call strings
+    # like "f(a=1, b='x')", arguments is a dict of argument values to match
+    query = "SELECT funcName, key, callString, arguments FROM entries"
+    parameters = ()
+    
+    if funcName is not None:
+      query += " WHERE funcName = ?"
+      parameters = (funcName,)
+    
+    keys = []
+    
+    for funcName2, key, callString, arguments2 in (
+          self.getConnection().execute(query, parameters)):
+      if (pattern is not None) and (not fnmatch.fnmatchcase(callString,
+                                                            pattern)):
+        continue
+      
+      if arguments is not None:
+        # compare canonical representations, as arguments might be arrays
+        arguments2 = dict(pickle.loads(arguments2))
+        if any([(x not in arguments2) or
+                (CacheStore.encode(arguments2[x]) != CacheStore.encode(y))
+                for x, y in arguments.items()]):
+          continue
+      
+      keys.append((funcName2, key))
+    
+    if len(keys) > 0: self.delete(keys)
+    return len(keys)
+  
+  def getEntries(self, funcName=None):
+    self.flushStatistics(force=True)
+    query = ("SELECT funcName, callString, size, computeTime, hits, created, "
+             "lastAccess FROM entries")
+    parameters = ()
+    
+    if funcName is not None:
+      query += " WHERE funcName = ?"
+      parameters = (funcName,)
+    
+    columns = ["funcName", "callString", "size", "computeTime", "hits",
+               "created", "lastAccess"]
+    return [dict(zip(columns, row))
+            for row in self.getConnection().execute(query, parameters)]
+  
+  def getStatistics(self):
+    self.flushStatistics(force=True)
+    statistics = {}
+    connection = self.getConnection()
+    
+    for funcName, hits, misses, computeTime, savedTime in connection.execute(
+          "SELECT funcName, hits, misses, computeTime, savedTime "
+          "FROM statistics"):
+      statistics[funcName] = {
+          "entries" : 0, "size" : 0, "hits" : hits, "misses" : misses,
+          "computeTime" : computeTime, "savedTime" : savedTime}
+    
+    for funcName, numberOfEntries, size in connection.execute(
+          "SELECT funcName, COUNT(*), SUM(size) FROM entries "
+          "GROUP BY funcName"):
+      if funcName not in statistics:
+        statistics[funcName] = {"hits" : 0, "misses" : 0,
+                                "computeTime" : 0, "savedTime" : 0}
+      statistics[funcName]["entries"] = numberOfEntries
+      statistics[funcName]["size"] = size
+    
+    return statistics
+  
+  def importLegacyCacheFile(self, legacyPath):
+    print("Importing cache file {}...".format(legacyPath))
+    with lzma.open(legacyPath, "rb") as f: cache = pickle.load(f)
+    
+    for funcName, funcCache in cache.items():
+      for arguments, value in funcCache.items():
+        self.save(funcName, CacheStore.getKey(arguments), arguments, value,
+                  updateStatistics=False)
+
+def getCacheStore(path=None):
   path = getCachePath(path)
   
   if path in cacheCache:
     cache = cacheCache[path]
   else:
-    if os.path.isfile(path):
-      print("Reading cache file {}...".format(path))
-      with lzma.open(path, "rb") as f: cache = pickle.load(f)
-    else:
-      print("Using new cache file {}.".format(path))
-      cache = {}
-    
-    cache = multiprocessingManager.dict(cache)
+    legacyPath = getLegacyCachePath(path)
+    isNew = (not os.path.isfile(path))
+    print("Using {} cache file {}.".format(("new" if isNew else "existing"),
+                                           path))
+    cache = CacheStore(path)
+    if isNew and os.path.isfile(legacyPath):
+      cache.importLegacyCacheFile(legacyPath)
     cacheCache[path] = cache
-    cache["__info__"] = multiprocessingManager.dict(
-        {"modified" : False, "depth" : 0, "ignoreDepth" : 0})
   
+  return cache
+
+@atexit.register
+def closeCacheStores():
+  for cache in cacheCache.values(): cache.close()
+
+def cacheToFile(func=None, path=None, maxBytes=None, maxAge=None):
+  # maxBytes: maximal size of all entries of func in bytes (least recently
+  # used entries are evicted), maxAge: maximal age of entries in seconds
+  if func is None:
+    return functools.partial(cacheToFile, path=path, maxBytes=maxBytes,
+                             maxAge=maxAge)
+  
+  cache = getCacheStore(path)
   funcName = func.__name__
-  if funcName not in cache: cache[funcName] = {}
-  funcCache = cache[funcName]
-  if isinstance(funcCache, dict):
-    funcCache = multiprocessingManager.dict(funcCache)
-    cache[funcName] = funcCache
   funcSignature = inspect.signature(func)
   
   @functools.wraps(func)
   def cacheLookup(*args, **kwargs):
     boundArgs = funcSignature.bind(*args, **kwargs)
     boundArgs.apply_defaults()
-    boundArgsOrderedDict = boundArgs.arguments
-    boundArgsTuple = tuple(boundArgsOrderedDict.items())
+    boundArgsTuple = tuple(boundArgs.arguments.items())
+    callString = getCallString(funcName, boundArgsTuple)
+    key = CacheStore.getKey(boundArgsTuple)
     
-    callString = "{}({})".format(funcName,
-        ", ".join(["{}={}".format(x, repr(y))
-                   for x, y in boundArgsOrderedDict.items()]))
+    if cache.depth >= cache.ignoreDepth:
+      isCached, result = cache.load(funcName, key, maxAge=maxAge)
+    else:
+      isCached, result = False, None
     
-    if ((boundArgsTuple in funcCache) and
-        (cache["__info__"]["depth"] >= cache["__info__"]["ignoreDepth"])):
+    if isCached:
       print("Cache hit: {}".format(callString))
     else:
       print("Cache miss: {}".format(callString))
       
       try:
-        cache["__info__"]["depth"] += 1
-        funcCache[boundArgsTuple] = func(*args, **kwargs)
+        cache.depth += 1
+        startTime = time.time()
+        result = func(*args, **kwargs)
+        computeTime = time.time() - startTime
       finally:
-        cache["__info__"]["depth"] -= 1
+        cache.depth -= 1
       
-      cache["__info__"]["modified"] = True
+      cache.save(funcName, key, boundArgsTuple, result,
+                 computeTime=computeTime)
+      if maxBytes is not None: cache.evict(funcName, maxBytes)
     
-    return funcCache[boundArgsTuple]
-  
-  @atexit.register
-  def saveCache():
-    if "__info__" in cache:
-      if cache["__info__"]["modified"]:
-        print("Saving cache file \"{}\"...".format(path))
-        cacheToSave = {x : dict(y) for x, y in cache.items()
-                       if x != "__info__"}
-        while True:
-          try:
-            with lzma.open(path, "wb") as f: pickle.dump(cacheToSave, f)
-            cache["__info__"]["modified"] = False
-            break
-          except KeyboardInterrupt:
-            pass
-      else:
-        print("Not saving cache file {}, as it doesn't seem to be "
-              "modified.".format(path))
-    else:
-      print("Not saving cache file {}, as it already seems to be "
-            "saved.".format(path))
+    return result
   
   return cacheLookup
 
 def clearCacheFile(path=None):
   path = getCachePath(path)
-  if os.path.isfile(path): os.remove(path)
+  if path in cacheCache: cacheCache[path].close()
+  
+  for path2 in [path, "{}-wal".format(path), "{}-shm".format(path),
+                getLegacyCachePath(path)]:
+    if os.path.isfile(path2): os.remove(path2)
+
+def invalidateCache(funcName=None, pattern=None, arguments=None, path=None):
+  cache = getCacheStore(path)
+  numberOfEntries = cache.invalidate(funcName=funcName, pattern=pattern,
+                                     arguments=arguments)
+  print("Invalidated {} entries of cache file {}.".format(
+      numberOfEntries, cache.path))
+  return numberOfEntries
+
+def getCacheStatistics(path=None):
+  return getCacheStore(path).getStatistics()
 
 class CacheFileIgnorer(object):
-  def __init__(path=None, delta=None):
-    path = getCachePath(path)
-    self.cache = cacheCache[path]
+  # cache entries are ignored (i.e., recomputed and overwritten) for cached
+  # calls whose nesting depth is less than the ignore depth
+  def __init__(self, path=None, delta=1):
+    self.cache = getCacheStore(path)
+    self.path = self.cache.path
     self.delta = delta
   
   def __enter__(self):
-    self.cache["__info__"]["ignore_depth"] += self.delta
+    self.cache.ignoreDepth += self.delta
     print("Increasing ignore depth of cache file {} to {}.".format(
-        self.path, self.cache["__info__"]["ignore_depth"]))
+        self.path, self.cache.ignoreDepth))
   
   def __exit__(self, exceptionType, exceptionValue, traceback):
-    self.cache["__info__"]["ignore_depth"] -= self.delta
-    print("Decrasing ignore depth of cache file {} to {}.".format(
-        self.path, self.cache["__info__"]["ignore_depth"]))
-
+    self.cache.ignoreDepth -= self.delta
+    print("Decreasing ignore depth of cache file {} to {}.".format(
+        self.path, self.cache.ignoreDepth))
 
 
 DEFAULT_REMOTELY_URL  = "neon.informatik.uni-stuttgart.de"
 DEFAULT_REMOTELY_PORT = 8075
+LOCAL_REMOTELY_URL    = "local"
 
 remotelyServerCache = {}
 
@@ -202,22 +585,31 @@ def startRemotelyServer(url, port, key):
       url, port, key))
   time.sleep(1)
 
-def executeRemotely(func, url=DEFAULT_REMOTELY_URL,
-                    autoStart=2, fallback=True):
-  if "REMOTELY_KEY" in os.environ:
-    warnings.warn("Environment variable REMOTELY_KEY is set, "
-                  "which means that we are already running remotely. "
-                  "Using local fallback.")
-    return func
-  
+def startLocalRemotelyServer(key, maxWorkers=None):
+  server = helper.remotely.create_local_remotely_server(
+      key, max_workers=maxWorkers)
+  port = server.server_address[1]
+  print("Starting local remotely server with port {}.".format(port))
+  return port
+
+def connectRemotely(url=DEFAULT_REMOTELY_URL, autoStart=2):
   if url in remotelyServerCache:
     cache = remotelyServerCache[url]
     isConnected = cache["isConnected"]
-    if isConnected: port, key = cache["port"], cache["key"]
+    if isConnected:
+      host, port, key = cache["host"], cache["port"], cache["key"]
   else:
     isConnected = False
   
-  if (not isConnected) and (autoStart >= 1):
+  if (not isConnected) and (url == LOCAL_REMOTELY_URL):
+    # in-process server, e.g., for testing without SSH
+    host, key = "127.0.0.1", secrets.token_hex(32)
+    port = startLocalRemotelyServer(key)
+    isConnected = True
+    remotelyServerCache[url] = {"isConnected" : True, "host" : host,
+                                "port" : port, "key" : key}
+  elif (not isConnected) and (autoStart >= 1):
+    host = url
     startPort = DEFAULT_REMOTELY_PORT
     key = readRemotelyKey()
     
@@ -238,15 +630,31 @@ def executeRemotely(func, url=DEFAULT_REMOTELY_URL,
       if autoStart < 2: break
     
     if isConnected:
-      remotelyServerCache[url] = {"isConnected" : True,
+      remotelyServerCache[url] = {"isConnected" : True, "host" : host,
                                   "port" : port, "key" : key}
     else:
       remotelyServerCache[url] = {"isConnected" : False}
   
   if isConnected:
     print("Connected to remotely server on {} "
-          "with port {} and key {}.".format(url, port, key))
-    return helper.remotely.remotely(key, url, port)(func)
+          "with port {} and key {}.".format(host, port, key))
+    return host, port, key
+  else:
+    return None
+
+def executeRemotely(func, url=DEFAULT_REMOTELY_URL,
+                    autoStart=2, fallback=True):
+  if "REMOTELY_KEY" in os.environ:
+    warnings.warn("Environment variable REMOTELY_KEY is set, "
+                  "which means that we are already running remotely. "
+                  "Using local fallback.")
+    return func
+  
+  connection = connectRemotely(url, autoStart)
+  
+  if connection is not None:
+    host, port, key = connection
+    return helper.remotely.remotely(key, host, port)(func)
   else:
     if fallback:
       warnings.warn("Could not connect to remotely server, "
@@ -254,3 +662,26 @@ def executeRemotely(func, url=DEFAULT_REMOTELY_URL,
       return func
     else:
       raise RuntimeError("Could not connect to remotely server.")
+
+def getRemotelyExecutor(url=DEFAULT_REMOTELY_URL, autoStart=2, fallback=True):
+  # executor whose submit and map methods queue the calls on the remotely
+  # server and return futures; the functions have to be self-contained
+  # (i.e., import everything they need), as only their code is sent
+  if "REMOTELY_KEY" in os.environ:
+    warnings.warn("Environment variable REMOTELY_KEY is set, "
+                  "which means that we are already running remotely. "
+                  "Using local fallback.")
+    return concurrent.futures.ProcessPoolExecutor()
+  
+  connection = connectRemotely(url, autoStart)
+  
+  if connection is not None:
+    host, port, key = connection
+    return helper.remotely.RemotelyExecutor(key, host, port)
+  else:
+    if fallback:
+      warnings.warn("Could not connect to remotely server, "
+                    "using local fallback.")
+      return concurrent.futures.ProcessPoolExecutor()
+    else:
+      raise RuntimeError("Could not connect to remotely server.")
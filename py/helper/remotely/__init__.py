@@ -18,5 +18,7 @@ __copyright__ = ('Copyright 2012 Kefei Dan Zhou, '
 
 from .remotely import remotely
 from .remotely import RemoteClient
+from .remotely import RemotelyExecutor
 from .remotely_server import create_remotely_server
+from .remotely_server import create_local_remotely_server
 from .remotely_server import RemotelyException
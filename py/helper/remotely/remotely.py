@@ -11,42 +11,162 @@ import base64
 import pickle
 import multiprocessing
 import functools
+import concurrent.futures
+import os
+import queue
+import socket
+import threading
 
+from . import remotely_transport
+from .remotely_server import RemotelyException
 
 
-def remotely(api_key, host, port):
+
+def remotely(api_key, host, port, transport="xmlrpc", compression=None):
     """
     synchronous decorator for executing code remotely. 
     @param api_key: key for authentication
     @param host: remotely server ip
     @param port: remotely server port
+    @param transport: "xmlrpc" or "binary" (must match the server)
+    @param compression: None, "zlib", or "lzma" (only for binary transport)
     """
     def decorate(func):
-        url = "http://%s:%s" % (host, port)
-        proxy = xmlrpclib.ServerProxy(
-            url, allow_none=True, use_builtin_types=True)
+        proxy = create_proxy(api_key, host, port, transport, compression)
 
         @functools.wraps(func)
         def wrapper(*args, **kwds):
-            func_code = getattr(func, "func_code", func.__code__)
-            code_str = base64.b64encode(marshal.dumps(func_code))
-            output = proxy.run(api_key, False, code_str, *args, **kwds)
-            return pickle.loads(base64.b64decode(output))
+            return proxy.run(False, func, args, kwds)
 
         return wrapper
     return decorate
 
 
-class RemoteClient(object):
+def create_proxy(api_key, host, port, transport="xmlrpc", compression=None):
+    if transport == "xmlrpc":
+        return XMLRPCProxy(api_key, host, port)
+    elif transport == "binary":
+        return BinaryProxy(api_key, host, port, compression)
+    else:
+        raise ValueError("unknown transport " + str(transport))
 
-    def __init__(self, api_key, host, port, asynchronous=True):
+
+class XMLRPCProxy(object):
+
+    def __init__(self, api_key, host, port):
         """
-        class for asynchronous remote execution
+        XML-RPC calls with base64-encoded pickles
         """
         url = "http://%s:%s" % (host, port)
         self.proxy = xmlrpclib.ServerProxy(
             url, allow_none=True, use_builtin_types=True)
         self.api_key = api_key
+
+    def run(self, asynchronous, func, args, kwds):
+        func_code = getattr(func, "func_code", func.__code__)
+        code_str = base64.b64encode(marshal.dumps(func_code))
+        output = self.proxy.run(self.api_key, asynchronous, code_str, *args, **kwds)
+        return pickle.loads(base64.b64decode(output))
+
+    def join(self, pid, timeout=None):
+        output = self.proxy.join(self.api_key, pid, timeout)
+        return pickle.loads(base64.b64decode(output))
+
+    def kill(self, pid):
+        try:
+            output = self.proxy.kill(self.api_key, pid, None)
+        except xmlrpclib.Fault as fault:
+            # e.g., the job is running and cannot be killed
+            raise RemotelyException(fault.faultString)
+        return pickle.loads(base64.b64decode(output))
+
+    def submit(self, functions, jobs):
+        return pickle.loads(self.proxy.submit(
+            self.api_key, pickle.dumps((functions, jobs))))
+
+    def collect(self, pids, timeout=None):
+        return pickle.loads(self.proxy.collect(
+            self.api_key, pickle.dumps(pids), timeout))
+
+
+class BinaryProxy(object):
+
+    def __init__(self, api_key, host, port, compression=None):
+        """
+        length-prefixed binary messages over a persistent TCP connection;
+        NumPy arrays are sent as raw buffers (see remotely_transport)
+        """
+        if compression not in remotely_transport.COMPRESSIONS:
+            raise ValueError("unknown compression " + str(compression))
+        self.api_key = api_key
+        self.host = host
+        self.port = port
+        self.compression = compression
+        self.sock = None
+        self.sock_pid = None
+        self.lock = threading.Lock()
+
+    def connect(self):
+        # sockets must not be shared with forked processes
+        if (self.sock is None) or (self.sock_pid != os.getpid()):
+            sock = socket.create_connection((self.host, self.port))
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if not remotely_transport.send_key(sock, self.api_key):
+                sock.close()
+                raise RemotelyException(" Bad API KEY: " + str(self.api_key))
+            self.sock = sock
+            self.sock_pid = os.getpid()
+        return self.sock
+
+    def close(self):
+        with self.lock:
+            if (self.sock is not None) and (self.sock_pid == os.getpid()):
+                self.sock.close()
+            self.sock = None
+
+    def call(self, method, *args):
+        with self.lock:
+            sock = self.connect()
+            try:
+                remotely_transport.send_message(
+                    sock, (method, args, self.compression), self.compression)
+                success, output = remotely_transport.receive_message(sock)
+            except BaseException:
+                # the connection is in an undefined state
+                sock.close()
+                self.sock = None
+                raise
+        if not success:
+            raise output
+        return output
+
+    def run(self, asynchronous, func, args, kwds):
+        return self.call(
+            "run", asynchronous, remotely_transport.serialize_function(func),
+            args, kwds)
+
+    def join(self, pid, timeout=None):
+        return self.call("join", pid, timeout)
+
+    def kill(self, pid):
+        return self.call("kill", pid)
+
+    def submit(self, functions, jobs):
+        return self.call("submit", functions, jobs)
+
+    def collect(self, pids, timeout=None):
+        return self.call("collect", pids, timeout)
+
+
+class RemoteClient(object):
+
+    def __init__(self, api_key, host, port, asynchronous=True,
+                 transport="xmlrpc", compression=None):
+        """
+        class for asynchronous remote execution
+        """
+        self.proxy = create_proxy(api_key, host, port, transport, compression)
+        self.api_key = api_key
         self.host = host
         self.port = port
         self.asynchronous = True
@@ -59,10 +179,7 @@ class RemoteClient(object):
         run function on remote server
         @return pid for asynchronous    
         """
-        func_code = getattr(func, "func_code", func.__code__)
-        code_str = base64.b64encode(marshal.dumps(func_code))
-        output = self.proxy.run(self.api_key, self.asynchronous, code_str, *args, **kwds)
-        return pickle.loads(base64.b64decode(output))
+        return self.proxy.run(self.asynchronous, func, args, kwds)
 
     def join(self, pid, timeout=None):
         """
@@ -70,15 +187,147 @@ class RemoteClient(object):
         @param pid: process id from run()
         @param timeout: if timeout is none then there's no timeout
         """
-        output = self.proxy.join(self.api_key, pid, timeout)
-        return pickle.loads(base64.b64decode(output))
+        return self.proxy.join(pid, timeout)
 
     def kill(self, pid):
         """
-        Terminate the process using Process.terminate() call
+        Cancel the job if it has not been started yet
         @param pid: process id from run()
+        @return True if the job was cancelled, False if the job is unknown
+                or has already finished
+        @raise RemotelyException if the job is running, as running jobs
+               cannot be terminated
         """
-        output = self.proxy.kill(self.api_key, pid, None)
-        return pickle.loads(base64.b64decode(output))
+        return self.proxy.kill(pid)
+
+
+class RemotelyExecutor(concurrent.futures.Executor):
+
+    def __init__(self, api_key, host, port, poll_timeout=1.0,
+                 max_batch_size=1000, transport="xmlrpc", compression=None):
+        """
+        executor for asynchronous remote execution: submit() and map()
+        return futures, the calls are sent in batches over one persistent
+        connection by a background thread, which also collects the results
+        @param poll_timeout: maximal time in seconds the server waits for
+                             finished jobs before answering a collect call
+        @param max_batch_size: maximal number of jobs per submit call
+        @param transport: "xmlrpc" or "binary" (must match the server)
+        @param compression: None, "zlib", or "lzma" (only for binary transport)
+        """
+        self.proxy = create_proxy(api_key, host, port, transport, compression)
+        self.api_key = api_key
+        self.poll_timeout = poll_timeout
+        self.max_batch_size = max_batch_size
+        self.submissions = queue.Queue()
+        self.futures = {}
+        self.shutdown_lock = threading.Lock()
+        self.is_shutdown = False
+        self.thread = threading.Thread(target=self._dispatch, daemon=True)
+        self.thread.start()
+
+    def submit(self, func, *args, **kwds):
+        """
+        queue a call of the function on the remote server
+        @return future of the output
+        """
+        with self.shutdown_lock:
+            if self.is_shutdown:
+                raise RuntimeError(
+                    "cannot schedule new futures after shutdown")
+            future = concurrent.futures.Future()
+            self.submissions.put((future, func, args, kwds))
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self.shutdown_lock:
+            self.is_shutdown = True
+            if cancel_futures:
+                while True:
+                    try:
+                        future, _, _, _ = self.submissions.get_nowait()
+                    except queue.Empty:
+                        break
+                    future.cancel()
+            # wake up the dispatching thread
+            self.submissions.put(None)
+        if wait:
+            self.thread.join()
+
+    def _get_submissions(self, block):
+        submissions = []
+        try:
+            submission = self.submissions.get(
+                block=block, timeout=(self.poll_timeout if block else None))
+            while True:
+                if submission is not None:
+                    submissions.append(submission)
+                if len(submissions) >= self.max_batch_size:
+                    break
+                submission = self.submissions.get_nowait()
+        except queue.Empty:
+            pass
+        return submissions
+
+    def _send_submissions(self, submissions):
+        # every function is only sent once per batch
+        functions = []
+        function_indices = {}
+        jobs = []
+        futures = []
+
+        for future, func, args, kwds in submissions:
+            if not future.set_running_or_notify_cancel():
+                continue
+            func_code = getattr(func, "func_code", func.__code__)
+            if func_code not in function_indices:
+                function_indices[func_code] = len(functions)
+                functions.append(remotely_transport.serialize_function(func))
+            jobs.append((function_indices[func_code], args, kwds))
+            futures.append(future)
+
+        if len(jobs) > 0:
+            try:
+                pids = self.proxy.submit(functions, jobs)
+            except BaseException as exception:
+                for future in futures:
+                    future.set_exception(exception)
+                raise
+            self.futures.update(zip(pids, futures))
+
+    def _collect(self):
+        output = self.proxy.collect(list(self.futures), self.poll_timeout)
 
+        for pid, success, value in output:
+            future = self.futures.pop(pid)
+            if success:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
 
+    def _dispatch(self):
+        try:
+            while True:
+                submissions = self._get_submissions(
+                    block=(len(self.futures) == 0))
+                self._send_submissions(submissions)
+                if len(self.futures) > 0:
+                    self._collect()
+                elif self.is_shutdown and self.submissions.empty():
+                    break
+        except BaseException as exception:
+            # e.g., connection errors; fail all remaining futures
+            for future in self.futures.values():
+                future.set_exception(exception)
+            self.futures = {}
+            while True:
+                try:
+                    submission = self.submissions.get_nowait()
+                except queue.Empty:
+                    break
+                if ((submission is not None) and
+                        submission[0].set_running_or_notify_cancel()):
+                    submission[0].set_exception(exception)
+        finally:
+            if isinstance(self.proxy, BinaryProxy):
+                self.proxy.close()
@@ -10,10 +10,12 @@ import base64
 import pickle
 import socket 
 import threading
-import multiprocessing as mp
+import concurrent.futures
 import sys
 import argparse
 
+from . import remotely_transport
+
 
 # threaded xmlrpc
 #import SimpleXMLRPCServer
@@ -27,29 +29,194 @@ class RemotelyException(Exception): pass
 
 DEBUG_MODE = False
 
-def create_remotely_server(api_key, port=8075):
+def create_remotely_server(api_key, port=8075, max_workers=None, host='',
+                           transport="xmlrpc",
+                           max_frames=remotely_transport.MAX_FRAMES,
+                           max_frame_size=remotely_transport.MAX_FRAME_SIZE):
     """
     create a server to be used with the given api key.
     call serve_forever() on the server obj to start.
+    @param max_workers: number of worker processes executing the jobs
+                        (defaults to the number of CPUs)
+    @param transport: "xmlrpc" or "binary" (length-prefixed messages over
+                      TCP, see remotely_transport)
+    @param max_frames, max_frame_size: limits for the requests received by
+                                       the binary transport (see
+                                       remotely_transport.receive_message)
     """ 
-    server = RemotelyServer(('', port))
-    server.register_multicall_functions()
-    server.register_function(server.run, "run")
-    server.register_function(server.join, "join")
-    server.register_function(server.kill, "kill")
+    if transport == "xmlrpc":
+        server = RemotelyServer((host, port), max_workers=max_workers)
+        server.register_multicall_functions()
+        server.register_function(server.run, "run")
+        server.register_function(server.join, "join")
+        server.register_function(server.kill, "kill")
+        server.register_function(server.submit, "submit")
+        server.register_function(server.collect, "collect")
+    elif transport == "binary":
+        server = BinaryRemotelyServer(
+            (host, port), max_workers=max_workers, max_frames=max_frames,
+            max_frame_size=max_frame_size)
+    else:
+        raise ValueError("unknown transport " + str(transport))
     server.register_key(api_key)
     return server
 
 
-class RemotelyServer(AsyncXMLRPCServer):
-    def __init__(self, *args, **kwds):
+def create_local_remotely_server(api_key, max_workers=None,
+                                 transport="xmlrpc"):
+    """
+    create a server on a free port of localhost and serve it in a
+    background thread of the calling process (e.g., for testing without
+    ssh); the port is given by server.server_address[1]
+    """
+    server = create_remotely_server(
+        api_key, port=0, max_workers=max_workers, host="127.0.0.1",
+        transport=transport)
+    server.logRequests = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def execute_function(func_str, args, kwds, defaults=None, kwdefaults=None):
+    """
+    executed in the worker processes of the server
+    """
+    code = marshal.loads(func_str)
+    func = types.FunctionType(code, globals(), "remote_func", defaults)
+    func.__kwdefaults__ = kwdefaults
+
+    if DEBUG_MODE:
+        print("exec function", func)
+        print("func params", args, kwds)
+
+    return func(*args, **kwds)
+
+
+class RemotelyJobs(object):
+    """
+    bounded pool of worker processes and job bookkeeping shared by the
+    servers of the different transports; jobs that are submitted while all
+    workers are busy wait in the queue of the pool
+    """
+
+    def init_jobs(self, max_workers=None):
+        self.api_key = None
+        self.pid = 1
+        self.jobs = {}
+        self.jobs_lock = threading.Lock()
+        self.max_workers = max_workers
+        self.executor = None
+
+    def register_key(self, api_key):
+        """
+        add an api_key for security
+        """
+        self.api_key = api_key
+
+    def check_key(self, api_key):
+        if api_key != self.api_key and self.api_key is not None:
+            raise RemotelyException(" Bad API KEY: " + str(api_key))
+
+    def get_executor(self):
+        with self.jobs_lock:
+            if self.executor is None:
+                self.executor = concurrent.futures.ProcessPoolExecutor(
+                    self.max_workers)
+        return self.executor
+
+    def shutdown_executor(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def add_job(self, api_key, func_str, args, kwds, defaults=None,
+                kwdefaults=None):
+        future = self.get_executor().submit(
+            execute_function, func_str, args, kwds, defaults, kwdefaults)
+        with self.jobs_lock:
+            pid = self.pid
+            self.pid += 1
+            self.jobs[(api_key, pid)] = future
+        return pid
+
+    def get_job(self, api_key, pid):
+        with self.jobs_lock:
+            return self.jobs.get((api_key, pid))
+
+    def pop_job(self, api_key, pid):
+        with self.jobs_lock:
+            return self.jobs.pop((api_key, pid), None)
+
+    def run_job(self, func_str, args, kwds, defaults=None, kwdefaults=None):
+        return self.get_executor().submit(
+            execute_function, func_str, args, kwds, defaults,
+            kwdefaults).result()
+
+    def join_job(self, api_key, pid, timeout=None):
+        output = None
+        future = self.get_job(api_key, pid)
+        if future is not None:
+            try:
+                output = future.result(timeout)
+            except concurrent.futures.TimeoutError:
+                pass
+            else:
+                self.pop_job(api_key, pid)
+        return output
+
+    def kill_job(self, api_key, pid):
+        """
+        cancel a queued job; jobs that are running in a worker of the pool
+        (or have already been dispatched to the workers, which the pool does
+        ahead of time for up to one more job than it has workers) cannot be
+        terminated individually, for them an exception is raised
+        @return True if the job was cancelled, False if the job is unknown
+                or has already finished
+        """
+        output = False
+        future = self.get_job(api_key, pid)
+        if future is not None:
+            output = future.cancel()
+            if output:
+                self.pop_job(api_key, pid)
+            elif future.running():
+                raise RemotelyException(
+                    "Job " + str(pid) + " is running or dispatched to a worker and cannot be "
+                    "killed")
+        return output
+
+    def submit_jobs(self, api_key, functions, jobs):
+        return [self.add_job(api_key, functions[i][0], args, kwds,
+                             *functions[i][1:])
+                for i, args, kwds in jobs]
+
+    def collect_jobs(self, api_key, pids, timeout=None):
+        futures = [self.get_job(api_key, pid) for pid in pids]
+        concurrent.futures.wait([f for f in futures if f is not None],
+                                timeout, concurrent.futures.FIRST_COMPLETED)
+        output = []
+
+        for pid, future in zip(pids, futures):
+            if future is None:
+                output.append((pid, False, RemotelyException(
+                    "Unknown job id " + str(pid))))
+            elif future.done():
+                self.pop_job(api_key, pid)
+                try:
+                    output.append((pid, True, future.result()))
+                except BaseException as exception:
+                    output.append((pid, False, exception))
+
+        return output
+
+
+class RemotelyServer(AsyncXMLRPCServer, RemotelyJobs):
+    def __init__(self, *args, max_workers=None, **kwds):
         """
         """
         SimpleXMLRPCServer.__init__(
             self, *args, use_builtin_types=True, **kwds)
-        self.api_key = None
-        self.pid = 1
-        self.jobs = {}
+        self.init_jobs(max_workers)
 
     def server_bind(self):
         """
@@ -57,88 +224,174 @@ class RemotelyServer(AsyncXMLRPCServer):
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         SimpleXMLRPCServer.server_bind(self)
 
-    def register_key(self, api_key):
+    def server_close(self):
         """
-        add an api_key for security
         """
-        self.api_key = api_key
+        SimpleXMLRPCServer.server_close(self)
+        self.shutdown_executor()
 
     def run(self, api_key, asynchronous, func_str, *args, **kwds):
         """
-        called remotely to run a function in the local thread/process
+        called remotely to run a function in the worker pool
         @api_key: security key 
-        asynchronous: if true the function will be split into a separate
-                      process; use join/kill to manage the process        
+        asynchronous: if true the function will be queued and the job id is
+                      returned; use join/kill to manage the job
         """
-        if api_key != self.api_key and self.api_key is not None:
-            raise RemotelyException(" Bad API KEY: " + str(api_key))
-
-        code = marshal.loads(base64.b64decode(func_str))
-        func = types.FunctionType(code, globals(), "remote_func")
-        
-        if DEBUG_MODE:
-            print("exec function", func)
-            print("func params", args, kwds)
+        self.check_key(api_key)
+        func_str = base64.b64decode(func_str)
 
         if asynchronous:
-            # create a process wrapper and use queue to get func output
-            q = mp.Queue()
-            def wrapper(func,q):
-                def wrapper2(*args, **kwds):
-                    ret = func(*args, **kwds)
-                    q.put(ret)
-                return wrapper2
-
-            p = mp.Process(target=wrapper(func,q), args=args, kwargs=kwds)
-            p.start()
-            self.jobs[(api_key, p.pid)] = (p,q)
-            output = base64.b64encode(pickle.dumps(p.pid))
+            output = self.add_job(api_key, func_str, args, kwds)
         else:
             # block and run
-            output = func(*args, **kwds)
-            output = base64.b64encode(pickle.dumps(output))
+            output = self.run_job(func_str, args, kwds)
+        output = base64.b64encode(pickle.dumps(output))
         return output
 
     def join(self, api_key, pid, timeout=None):
         """
-        Block on the thread until the process is terminated
+        Block on the thread until the job is finished
         @return output from the function call
         """
-        output = None
-        if (api_key,pid) in self.jobs:        
-            p,q = self.jobs[(api_key,pid)]
-            p.join(timeout)
-            if not p.is_alive():
-                del self.jobs[(api_key,pid)]
-            if not q.empty():
-                output = q.get(block=False)
-
+        output = self.join_job(api_key, pid, timeout)
         output = base64.b64encode(pickle.dumps(output))
         return output
 
     def kill(self, api_key, pid, timeout=None):
         """
-        Send kill signal to the job
-        @return True if the job was succesfully terminated
+        Cancel the job (for jobs that are already running, a
+        RemotelyException is raised, as they cannot be cancelled)
+        @return True if the job was succesfully cancelled
         """
-        output = False
-        if (api_key,pid) in self.jobs:        
-            p,q = self.jobs[(api_key,pid)]
-            p.terminate()
-            p.join(timeout)
-            output = not p.is_alive()
-
+        output = self.kill_job(api_key, pid)
         output = base64.b64encode(pickle.dumps(output))
         return output
 
+    def submit(self, api_key, jobs_str):
+        """
+        queue a batch of jobs
+        @param jobs_str: pickled tuple (functions, jobs), where functions is
+                         a list of tuples (marshalled code object, defaults,
+                         keyword defaults) and jobs is a list of tuples
+                         (function index, args, kwds)
+        @return pickled list of job ids
+        """
+        self.check_key(api_key)
+        functions, jobs = pickle.loads(jobs_str)
+        return pickle.dumps(self.submit_jobs(api_key, functions, jobs))
+
+    def collect(self, api_key, pids_str, timeout=None):
+        """
+        wait until at least one of the given jobs is finished or the timeout
+        occurs
+        @return pickled list of tuples (job id, success, output or exception)
+                for all finished jobs
+        """
+        self.check_key(api_key)
+        pids = pickle.loads(pids_str)
+        return pickle.dumps(self.collect_jobs(api_key, pids, timeout))
+
+
+class BinaryRemotelyRequestHandler(socketserver.BaseRequestHandler):
+    """
+    serves one persistent connection: after the key has been checked,
+    requests (method, args, compression) are answered by
+    (success, output or exception), both as remotely_transport messages
+    """
+
+    def handle(self):
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if not remotely_transport.receive_key(sock, self.server.api_key):
+            return
+
+        while True:
+            try:
+                method, args, compression = \
+                    remotely_transport.receive_message(
+                        sock, self.server.max_frames,
+                        self.server.max_frame_size)
+            except (ConnectionError, OSError):
+                break
+
+            try:
+                output = (True, self.server.dispatch(method, args))
+            except BaseException as exception:
+                output = (False, exception)
+
+            try:
+                remotely_transport.send_message(sock, output, compression)
+            except (pickle.PicklingError, TypeError,
+                    AttributeError) as exception:
+                remotely_transport.send_message(
+                    sock, (False, RemotelyException(repr(exception))),
+                    compression)
+
+
+class BinaryRemotelyServer(socketserver.ThreadingTCPServer, RemotelyJobs):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, *args, max_workers=None,
+                 max_frames=remotely_transport.MAX_FRAMES,
+                 max_frame_size=remotely_transport.MAX_FRAME_SIZE, **kwds):
+        """
+        """
+        socketserver.ThreadingTCPServer.__init__(
+            self, *args, BinaryRemotelyRequestHandler, **kwds)
+        self.max_frames = max_frames
+        self.max_frame_size = max_frame_size
+        self.init_jobs(max_workers)
+
+    def server_close(self):
+        """
+        """
+        socketserver.ThreadingTCPServer.server_close(self)
+        self.shutdown_executor()
+
+    def dispatch(self, method, args):
+        # the key has already been checked when the connection was opened
+        api_key = self.api_key
+        if method == "run":
+            asynchronous, function, func_args, func_kwds = args
+            if asynchronous:
+                return self.add_job(api_key, function[0], func_args,
+                                    func_kwds, *function[1:])
+            else:
+                return self.run_job(function[0], func_args, func_kwds,
+                                    *function[1:])
+        elif method == "join":
+            return self.join_job(api_key, *args)
+        elif method == "kill":
+            return self.kill_job(api_key, *args)
+        elif method == "submit":
+            return self.submit_jobs(api_key, *args)
+        elif method == "collect":
+            return self.collect_jobs(api_key, *args)
+        else:
+            raise RemotelyException("Unknown method " + str(method))
+
 
 def main():
     #cmd options 
-    parser = OptionParser()
-    parser.add_argument("--port", dest="port", default=8075, type="int",
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", dest="port", default=8075, type=int,
                     help="server port (default to 8075).")
-    parser.add_argument("--api_key", dest="api_key", default=None, type="string",
+    parser.add_argument("--api_key", dest="api_key", default=None, type=str,
                     help="api key for authenticating against this server.")
+    parser.add_argument("--workers", dest="workers", default=None, type=int,
+                    help="number of worker processes (default to #CPUs).")
+    parser.add_argument("--transport", dest="transport", default="xmlrpc",
+                    choices=["xmlrpc", "binary"],
+                    help="transport protocol (default to xmlrpc).")
+    parser.add_argument("--max_frames", dest="max_frames",
+                    default=remotely_transport.MAX_FRAMES, type=int,
+                    help="maximal number of frames per request of the "
+                    "binary transport.")
+    parser.add_argument("--max_frame_size", dest="max_frame_size",
+                    default=remotely_transport.MAX_FRAME_SIZE, type=int,
+                    help="maximal size of frames of requests of the binary "
+                    "transport in bytes.")
     parser.add_argument('--daemon', dest="daemon", action='store_true', default=False,
                     help='run server as daemon (default false).')
 
@@ -153,7 +406,10 @@ def main():
     #print("API_KEY", args.api_key)
     
     def start_server():
-        server = create_remotely_server(args.api_key, args.port)
+        server = create_remotely_server(
+            args.api_key, args.port, max_workers=args.workers,
+            transport=args.transport, max_frames=args.max_frames,
+            max_frame_size=args.max_frame_size)
         print("starting remote exec server on port %s" % args.port)
         server.serve_forever()
 
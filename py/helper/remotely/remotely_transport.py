@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hmac
+import lzma
+import marshal
+import pickle
+import struct
+import zlib
+
+
+# a message consists of a header (magic, compression, number of frames) and
+# the frames, each of which is prefixed by its (compressed and uncompressed)
+# length; the first frame is a pickle (protocol 5) of the object, the other
+# frames are the raw out-of-band buffers of the pickle (e.g., the data of
+# NumPy arrays, whose dtype and shape are contained in the pickle)
+MAGIC = b"RMT1"
+HEADER = struct.Struct("!4sBI")
+FRAME_HEADER = struct.Struct("!QQ")
+KEY_HEADER = struct.Struct("!4sI")
+
+COMPRESSIONS = {None: 0, "zlib": 1, "lzma": 2}
+
+# default limits for received messages (the headers are only trusted up to
+# these limits, such that malformed or malicious headers cannot make the
+# receiver allocate arbitrary amounts of memory)
+MAX_FRAMES = 1 << 16
+MAX_FRAME_SIZE = 1 << 32
+MAX_KEY_SIZE = 1 << 12
+
+
+def compress(data, compression):
+    if compression == "zlib":
+        return zlib.compress(data, 1)
+    elif compression == "lzma":
+        return lzma.compress(data)
+    else:
+        return data
+
+
+def decompress(data, compression, size):
+    """
+    decompress data, which must decompress to exactly size bytes
+    """
+    if compression == "zlib":
+        decompressor = zlib.decompressobj()
+    elif compression == "lzma":
+        decompressor = lzma.LZMADecompressor()
+    else:
+        decompressor = None
+
+    if decompressor is not None:
+        # decompress at most one byte more than announced
+        data = bytearray(decompressor.decompress(data, size + 1))
+    if len(data) != size:
+        raise ConnectionError("invalid frame size")
+    return data
+
+
+def receive_exactly(sock, size):
+    """
+    receive exactly size bytes into a preallocated buffer
+    """
+    data = bytearray(size)
+    view = memoryview(data)
+    position = 0
+    while position < size:
+        received = sock.recv_into(view[position:])
+        if received == 0:
+            raise ConnectionError("connection closed by peer")
+        position += received
+    return data
+
+
+def send_message(sock, obj, compression=None):
+    """
+    send obj as a length-prefixed binary message
+    @param compression: None, "zlib", or "lzma"
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError("unknown compression " + str(compression))
+    buffers = []
+    data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    frames = [memoryview(data)] + [buffer.raw() for buffer in buffers]
+    sock.sendall(HEADER.pack(MAGIC, COMPRESSIONS[compression], len(frames)))
+
+    for frame in frames:
+        size = frame.nbytes
+        frame = memoryview(compress(frame, compression))
+        sock.sendall(FRAME_HEADER.pack(frame.nbytes, size))
+        sock.sendall(frame)
+
+
+def receive_message(sock, max_frames=MAX_FRAMES,
+                    max_frame_size=MAX_FRAME_SIZE):
+    """
+    receive an object sent by send_message
+    @param max_frames: maximal number of frames (i.e., one plus the number
+                       of out-of-band buffers) of the message
+    @param max_frame_size: maximal size of each frame in bytes (compressed
+                           and uncompressed)
+    """
+    magic, compression_id, number_of_frames = HEADER.unpack(
+        receive_exactly(sock, HEADER.size))
+    if magic != MAGIC:
+        raise ConnectionError("invalid message")
+    compressions = {y: x for x, y in COMPRESSIONS.items()}
+    if compression_id not in compressions:
+        raise ConnectionError("unknown compression " + str(compression_id))
+    if not 1 <= number_of_frames <= max_frames:
+        raise ConnectionError("invalid number of frames " +
+                              str(number_of_frames))
+    compression = compressions[compression_id]
+    frames = []
+
+    for _ in range(number_of_frames):
+        size, uncompressed_size = FRAME_HEADER.unpack(
+            receive_exactly(sock, FRAME_HEADER.size))
+        if max(size, uncompressed_size) > max_frame_size:
+            raise ConnectionError("frame exceeds maximal size of " +
+                                  str(max_frame_size) + " bytes")
+        frames.append(decompress(receive_exactly(sock, size), compression,
+                                 uncompressed_size))
+
+    return pickle.loads(frames[0], buffers=frames[1:])
+
+
+def send_key(sock, api_key):
+    api_key = ("" if api_key is None else api_key).encode()
+    sock.sendall(KEY_HEADER.pack(MAGIC, len(api_key)) + api_key)
+    return receive_exactly(sock, 1) == b"\x01"
+
+
+def receive_key(sock, api_key):
+    """
+    authenticate the peer before unpickling anything it sends
+    @return True if the key of the peer is api_key (or api_key is None)
+    """
+    magic, size = KEY_HEADER.unpack(receive_exactly(sock, KEY_HEADER.size))
+    if (magic != MAGIC) or (size > MAX_KEY_SIZE):
+        return False
+    peer_api_key = bytes(receive_exactly(sock, size))
+    success = ((api_key is None) or
+               hmac.compare_digest(peer_api_key, api_key.encode()))
+    sock.sendall(b"\x01" if success else b"\x00")
+    return success
+
+
+def serialize_function(func):
+    func_code = getattr(func, "func_code", func.__code__)
+    return marshal.dumps(func_code), func.__defaults__, func.__kwdefaults__
@@ -348,7 +348,7 @@ class Stats(object):
     else:
       self.interpolant = helper.function.Interpolant(
           basis, self.convertDomainToGridCoords(self.X),
-          self.L, self.I, self.fX)
+          self.L, self.I, self.fX, solver="auto")
     
     aX = self.interpolant.aX
     assert aX.shape[0] == self.N
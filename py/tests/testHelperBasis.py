@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+
+import unittest
+
+import numpy as np
+
+import helper.basis
+import tests.misc
+
+class TestHelperBasis(tests.misc.CustomTestCase):
+  @staticmethod
+  def getExampleParentFunctions(nu=0):
+    parentFunctions = []
+    
+    for p in range(1, 8):
+      if nu > p: continue
+      parentFunctions.append(("CardinalBSpline({})".format(p),
+                              helper.basis.CardinalBSpline(p, nu=nu)))
+      
+      if p % 2 == 1:
+        parentFunctions.append(("FundamentalSpline({})".format(p),
+                                helper.basis.FundamentalSpline(p, nu=nu)))
+        if nu >= 0:
+          parentFunctions.append(
+              ("WeaklyFundamentalSpline({})".format(p),
+               helper.basis.WeaklyFundamentalSpline(p, nu=nu)))
+    
+    return parentFunctions
+  
+  def testPiecewisePolynomialDerivatives(self):
+    xx = np.linspace(-8, 8, 1601)
+    
+    for nu in [1, 2]:
+      derivatives = dict(self.getExampleParentFunctions(nu=nu))
+      
+      for name, parentFunction in self.getExampleParentFunctions():
+        if name not in derivatives: continue
+        
+        with self.subTest(parentFunction=name, nu=nu):
+          pp = parentFunction.getPiecewisePolynomial().derivative(nu)
+          self.assertAlmostEqual(pp.evaluate(xx),
+                                 derivatives[name].evaluate(xx), atol=1e-10)
+  
+  def testPiecewisePolynomialAntiderivative(self):
+    xx = np.linspace(-8, 8, 1601)
+    
+    for p in range(1, 8):
+      with self.subTest(p=p):
+        pp = helper.basis.CardinalBSpline(p).getPiecewisePolynomial()
+        self.assertAlmostEqual(
+            pp.antiderivative().evaluate(xx),
+            helper.basis.CardinalBSpline(p, nu=-1).evaluate(xx), atol=1e-12)
+  
+  def testPiecewisePolynomialLinearCombination(self):
+    xx = np.linspace(-4, 8, 1201)
+    pp1 = helper.basis.CardinalBSpline(3).getPiecewisePolynomial()
+    pp2 = helper.basis.CardinalBSpline(2).getPiecewisePolynomial().shift(1.5)
+    pp = helper.basis.PiecewisePolynomial.linearCombination(
+        [2, -3], [pp1, pp2])
+    self.assertAlmostEqual(
+        pp.evaluate(xx), 2 * pp1.evaluate(xx) - 3 * pp2.evaluate(xx),
+        atol=1e-12)
+
+
+
+if __name__ == "__main__":
+  unittest.main()
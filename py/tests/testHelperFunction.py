@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+
+import tracemalloc
+import unittest
+
+import numpy as np
+
+import helper.basis
+import helper.function
+import helper.grid
+import tests.misc
+
+class TestHelperFunction(tests.misc.CustomTestCase):
+  @staticmethod
+  def getExampleInterpolants():
+    interpolants = []
+    
+    for p in [1, 3, 5]:
+      for basis1D in [helper.basis.HierarchicalBSpline(p),
+                      helper.basis.HierarchicalNotAKnotBSpline(p),
+                      helper.basis.ModifiedHierarchicalBSpline(p)]:
+        basisName = "{}({})".format(type(basis1D).__name__, p)
+        
+        for d in range(1, 4):
+          if "Modified" in basisName:
+            X, L, I = helper.grid.RegularSparse(5, d).generate()
+          else:
+            X, L, I = helper.grid.RegularSparseBoundary(5, d, 0).generate()
+          
+          basis = (helper.basis.TensorProduct(basis1D, d) if d > 1 else
+                   basis1D)
+          fX = tests.misc.evaluateObjectiveFunction(d, X)
+          interpolant = helper.function.Interpolant(basis, X, L, I, fX)
+          interpolants.append((basisName, d, interpolant))
+    
+    return interpolants
+  
+  def testBatchedEvaluation(self):
+    for basisName, d, interpolant in self.getExampleInterpolants():
+      with self.subTest(basis=basisName, d=d):
+        N = interpolant.X.shape[0]
+        XX = np.random.random((100, d))
+        YYExpected = np.zeros((XX.shape[0],))
+        for k in range(N):
+          YYExpected += interpolant.aX[k] * interpolant._evaluateBasis(k, XX)
+        
+        interpolant.chunkSize = 30
+        self.assertAlmostEqual(interpolant.evaluate(XX), YYExpected,
+                               atol=1e-10)
+        
+        A = np.column_stack([interpolant._evaluateBasis(k, interpolant.X)
+                             for k in range(N)])
+        self.assertAlmostEqual(interpolant.getInterpolationMatrix(), A,
+                               atol=1e-14)
+  
+  def testBatchedEvaluationUnknownSupport(self):
+    # bases without known support (e.g., SGppBasis with unsupported
+    # SG++ basis types) are evaluated on the whole domain
+    class BasisWithoutSupport(helper.basis.HierarchicalBSpline):
+      def getSupport(self, l, i):
+        raise NotImplementedError("Unsupported basis type.")
+    
+    X, L, I = helper.grid.RegularSparseBoundary(4, 2, 0).generate()
+    fX = tests.misc.evaluateObjectiveFunction(2, X)
+    basis = helper.basis.TensorProduct(BasisWithoutSupport(3), 2)
+    interpolant = helper.function.Interpolant(basis, X, L, I, fX)
+    XX = np.random.random((100, 2))
+    YYExpected = np.zeros((XX.shape[0],))
+    for k in range(X.shape[0]):
+      YYExpected += interpolant.aX[k] * interpolant._evaluateBasis(k, XX)
+    self.assertAlmostEqual(interpolant.evaluate(XX), YYExpected, atol=1e-10)
+  
+  def testSparseAssemblyMemory(self):
+    # the intermediates of the sparse assembly must not be (much) larger
+    # than the result (24 bytes per nonzero for value, row, and column)
+    X, L, I = helper.grid.RegularSparseBoundary(6, 3, 0).generate()
+    basis = helper.basis.TensorProduct(helper.basis.HierarchicalBSpline(3), 3)
+    interpolant = helper.function.Interpolant(
+        basis, X, L, I, None, aX=np.zeros((X.shape[0],)))
+    tracemalloc.start()
+    
+    try:
+      A = interpolant.getInterpolationMatrix(sparse=True)
+      peak = tracemalloc.get_traced_memory()[1]
+    finally:
+      tracemalloc.stop()
+    
+    self.assertLess(A.nnz, 0.2 * X.shape[0]**2)
+    self.assertLess(peak, 3 * 24 * A.nnz)
+    
+    interpolant.chunkSize = 100
+    self.assertEqual(
+        abs(interpolant.getInterpolationMatrix(sparse=True) - A).max(), 0)
+  
+  def testBatchedEvaluationVectorValued(self):
+    for basisName, d, interpolant in self.getExampleInterpolants():
+      with self.subTest(basis=basisName, d=d):
+        N = interpolant.X.shape[0]
+        aX = np.random.random((N, 3))
+        vectorInterpolant = helper.function.Interpolant(
+            interpolant.basis, interpolant.X, interpolant.L, interpolant.I,
+            None, aX=aX)
+        XX = np.random.random((50, d))
+        YY = vectorInterpolant.evaluate(XX)
+        
+        for j in range(aX.shape[1]):
+          scalarInterpolant = helper.function.Interpolant(
+              interpolant.basis, interpolant.X, interpolant.L, interpolant.I,
+              None, aX=aX[:,j])
+          self.assertAlmostEqual(YY[:,j], scalarInterpolant.evaluate(XX))
+
+  
+  def testSparseSolvers(self):
+    for basisName, d, interpolant in self.getExampleInterpolants():
+      for solver in ["sparse", "gmres", "bicgstab"]:
+        # iterative solvers converge too slowly for not-a-knot B-splines
+        if (solver != "sparse") and ("NotAKnot" in basisName): continue
+        
+        with self.subTest(basis=basisName, d=d, solver=solver):
+          sparseInterpolant = helper.function.Interpolant(
+              interpolant.basis, interpolant.X, interpolant.L, interpolant.I,
+              interpolant.fX, solver=solver)
+          self.assertAlmostEqual(sparseInterpolant.aX, interpolant.aX,
+                                 atol=1e-8)
+        
+        with self.subTest(basis=basisName, d=d, solver=solver, m=2):
+          fX = np.column_stack((interpolant.fX, 2 * interpolant.fX))
+          sparseInterpolant = helper.function.Interpolant(
+              interpolant.basis, interpolant.X, interpolant.L, interpolant.I,
+              fX, solver=solver)
+          self.assertAlmostEqual(sparseInterpolant.aX[:,1],
+                                 2 * interpolant.aX, atol=1e-8)
+
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+
+import unittest
+
+import numpy as np
+
+import helper.grid
+import tests.misc
+
+class TestHelperGrid(tests.misc.CustomTestCase):
+  @staticmethod
+  def generateWithMeshGrids(L):
+    I = [helper.grid.getHierarchicalIndices(l) for l in L]
+    L = np.vstack([np.tile(l, [I1.shape[0], 1]) for l, I1 in zip(L, I)])
+    return L, np.vstack(I)
+  
+  def testRegularSparse(self):
+    X, L, I = helper.grid.RegularSparse(3, 2).generate()
+    self.assertEqual(L.tolist(), [[2, 1], [2, 1], [1, 2], [1, 2], [1, 1]])
+    self.assertEqual(I.tolist(), [[1, 1], [3, 1], [1, 1], [1, 3], [1, 1]])
+    self.assertAlmostEqual(X, I / 2**L)
+    
+    for d in range(1, 5):
+      for n in range(8):
+        with self.subTest(n=n, d=d):
+          grid = helper.grid.RegularSparse(n, d)
+          X, L, I = grid.generate()
+          self.assertEqual(X.shape, (grid.getSize(), d))
+          self.assertEqual(np.unique(np.column_stack((L, I)), axis=0).shape,
+                           (grid.getSize(), 2 * d))
+          self.assertTrue(np.all(np.sum(L, axis=1) <= n))
+  
+  def testDimensionallyAdaptiveSparse(self):
+    for n, d, b in [(4, 1, 0), (5, 3, 0), (5, 3, 1), (6, 4, 2)]:
+      with self.subTest(n=n, d=d, b=b):
+        L = helper.grid.RegularSparseBoundary(n, d, b).getLevels()
+        X, L2, I2 = helper.grid.DimensionallyAdaptiveSparse(L).generate()
+        L3, I3 = self.generateWithMeshGrids(L)
+        self.assertAlmostEqual(L2, L3)
+        self.assertAlmostEqual(I2, I3)
+        self.assertAlmostEqual(X, I3 / 2**L3)
+  
+  def testGenerateChunks(self):
+    grids = [helper.grid.RegularSparseBoundary(6, 3, 0),
+             helper.grid.RegularSparseBoundary(7, 4, 1),
+             helper.grid.RegularSparse(7, 3)]
+    
+    for grid in grids:
+      X, L, I = grid.generate()
+      
+      for chunkSize in [1, 7, 100, 10000]:
+        with self.subTest(grid=type(grid).__name__, chunkSize=chunkSize):
+          chunks = list(grid.generateChunks(chunkSize=chunkSize))
+          self.assertTrue(all(len(chunk[0]) <= chunkSize for chunk in chunks))
+          X2, L2, I2 = [np.vstack([chunk[j] for chunk in chunks])
+                        for j in range(3)]
+          
+          if isinstance(grid, helper.grid.RegularSparse):
+            # chunks are ordered level by level
+            K, K2 = (np.lexsort(np.column_stack(LI).T)
+                     for LI in [(L, I), (L2, I2)])
+            X, L, I = X[K], L[K], I[K]
+            X2, L2, I2 = X2[K2], L2[K2], I2[K2]
+          
+          self.assertAlmostEqual(L2, L)
+          self.assertAlmostEqual(I2, I)
+          self.assertAlmostEqual(X2, X)
+
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+
+import unittest
+
+import numpy as np
+
+import helper.basis
+import helper.function
+import helper.grid
+import helper.hierarchization
+import tests.misc
+
+class TestHelperHierarchization(tests.misc.CustomTestCase):
+  @staticmethod
+  def getExampleBases():
+    bases = tests.misc.getExampleHierarchicalBases()
+    return [(basisName, d, basis) for basisName, d, basis in bases
+            if (d <= 3) and ("Lagrange" not in basisName) and
+            (not (("Natural" in basisName) and (d >= 3)))]
+  
+  def testConvertToContinuous(self):
+    for d in range(1, 4):
+      for hierarchical in [False, True]:
+        with self.subTest(d=d, hierarchical=hierarchical):
+          l = [3, 2, 1][:d]
+          X, L, I = helper.grid.FullBoundary(l).generate()
+          if not hierarchical:
+            L, I = helper.grid.convertHierarchicalToNodal(L, I, l)
+          K = helper.hierarchization.convertToContinuous(L, I)
+          self.assertAlmostEqual(K, tests.misc.convertToContinuous(L, I))
+          L2, I2 = helper.hierarchization.convertContinuousToHierarchical(K)
+          L3, I3 = tests.misc.convertContinuousToHierarchical(K)
+          self.assertAlmostEqual(L2, L3)
+          self.assertAlmostEqual(I2, I3)
+  
+  def testFullGridHierarchization(self):
+    for basisName, d, basis in self.getExampleBases():
+      for hierarchical in [False, True]:
+        with self.subTest(basis=basisName, d=d, hierarchical=hierarchical):
+          l = [3, 1, 2][:d]
+          distribution = ("clenshawCurtis" if "ClenshawCurtis" in basisName
+                          else "uniform")
+          A, L, I = tests.misc.computeFullGridMatrix(
+              basisName, basis, l, hierarchical=hierarchical,
+              distribution=distribution, parallel=False)
+          L, I = np.reshape(L, (-1, d)), np.reshape(I, (-1, d))
+          X = helper.grid.getCoordinates(L, I, distribution=distribution)
+          fX = np.random.random((X.shape[0], 2))
+          aX = helper.hierarchization.hierarchizeFullGrid(
+              basis, X, L, I, fX, hierarchical=hierarchical)
+          self.assertAlmostEqual(aX, np.linalg.solve(A, fX), atol=1e-8)
+          fX2 = helper.hierarchization.unidirectionalPrinciple(
+              basis, X, L, I, aX, hierarchical=hierarchical,
+              mode="dehierarchize")
+          self.assertAlmostEqual(fX2, fX, atol=1e-8)
+  
+  def testDimensionallyAdaptiveHierarchization(self):
+    for basisName, d, basis in self.getExampleBases():
+      with self.subTest(basis=basisName, d=d):
+        if "Modified" in basisName:
+          X, L, I = helper.grid.RegularSparse(4, d).generate()
+        else:
+          X, L, I = helper.grid.RegularSparseBoundary(4, d, 0).generate()
+        
+        if "ClenshawCurtis" in basisName:
+          X = helper.grid.getCoordinates(L, I, distribution="clenshawCurtis")
+        
+        self.assertTrue(
+            helper.hierarchization.isDimensionallyAdaptive(L, I))
+        fX = tests.misc.evaluateObjectiveFunction(d, X)
+        interpolant = helper.function.Interpolant(
+            basis, X, L, I, fX, solver="auto")
+        self.assertAlmostEqual(
+            interpolant.aX,
+            helper.function.Interpolant(basis, X, L, I, fX).aX,
+            atol=1e-8)
+  
+  def testSpatiallyAdaptiveGridRejected(self):
+    basis = helper.basis.TensorProduct(helper.basis.HierarchicalBSpline(3), 2)
+    X, L, I = tests.misc.generateSpatiallyAdaptiveSparseGrid(2, 30)
+    self.assertFalse(helper.hierarchization.isDimensionallyAdaptive(L, I))
+    fX = tests.misc.evaluateObjectiveFunction(2, X)
+    
+    with self.assertRaises(ValueError):
+      helper.hierarchization.hierarchizeDimensionallyAdaptive(
+          basis, X, L, I, fX)
+
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,167 @@
+#!/usr/bin/python3
+
+import contextlib
+import lzma
+import os
+import pickle
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+
+import helper.hpc
+import tests.misc
+
+def exampleFunction(n, factor=2):
+  exampleFunction.numberOfCalls += 1
+  return {"x" : factor * np.arange(n), "y" : [n, "test"]}
+
+def remoteFunction(x, factor=2):
+  import numpy as np
+  if x < 0: raise ValueError("Negative argument.")
+  return factor * np.array(x)
+
+class TestHelperHpc(tests.misc.CustomTestCase):
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.path = os.path.join(self.directory.name, "test.cache.sqlite")
+    exampleFunction.numberOfCalls = 0
+  
+  def tearDown(self):
+    helper.hpc.clearCacheFile(self.path)
+    helper.hpc.cacheCache.pop(self.path, None)
+    self.directory.cleanup()
+  
+  def testCacheToFile(self):
+    cachedFunction = helper.hpc.cacheToFile(exampleFunction, path=self.path)
+    
+    for _ in range(2):
+      result = cachedFunction(5)
+      self.assertAlmostEqual(result["x"], 2 * np.arange(5))
+      self.assertEqual(result["y"], [5, "test"])
+      self.assertEqual(cachedFunction(5, factor=2)["y"], [5, "test"])
+      self.assertEqual(exampleFunction.numberOfCalls, 1)
+    
+    result["x"][0] = 42
+    self.assertAlmostEqual(cachedFunction(n=5)["x"], 2 * np.arange(5))
+    cachedFunction(5, factor=3)
+    self.assertEqual(exampleFunction.numberOfCalls, 2)
+    
+    # new store instance (as in a new process) only reads the file
+    helper.hpc.cacheCache[self.path].close()
+    del helper.hpc.cacheCache[self.path]
+    cachedFunction = helper.hpc.cacheToFile(exampleFunction, path=self.path)
+    self.assertAlmostEqual(cachedFunction(5, 3)["x"], 3 * np.arange(5))
+    self.assertEqual(exampleFunction.numberOfCalls, 2)
+    
+    helper.hpc.clearCacheFile(self.path)
+    self.assertFalse(os.path.isfile(self.path))
+    cachedFunction(5)
+    self.assertEqual(exampleFunction.numberOfCalls, 3)
+  
+  def testCanonicalKeys(self):
+    cachedFunction = helper.hpc.cacheToFile(exampleFunction, path=self.path)
+    for n in [3, 3.0, np.int64(3), np.float32(3)]: cachedFunction(n)
+    cachedFunction(3, factor=True)
+    cachedFunction(3, factor=1)
+    self.assertEqual(exampleFunction.numberOfCalls, 2)
+    
+    getKey = helper.hpc.CacheStore.getKey
+    self.assertEqual(getKey(({"b" : 1, "a" : 2},)),
+                     getKey(({"a" : 2, "b" : 1},)))
+    self.assertEqual(getKey(frozenset(["x", "y", "z"])),
+                     getKey(frozenset(["z", "y", "x"])))
+    self.assertEqual(getKey(np.arange(3)), getKey(np.arange(3)))
+    self.assertNotEqual(getKey(np.arange(3)), getKey(np.arange(4)))
+    self.assertEqual(getKey(np.array(["a", (1, 2)], dtype=object)),
+                     getKey(np.array(["a", (1.0, 2)], dtype=object)))
+    self.assertNotEqual(getKey(np.array(["a", "b"], dtype=object)),
+                        getKey(np.array(["a", "c"], dtype=object)))
+    self.assertNotEqual(getKey((1, 2)), getKey([1, 2]))
+    self.assertNotEqual(getKey(1.5), getKey(1))
+  
+  def testEvictionAndStatistics(self):
+    cachedFunction = helper.hpc.cacheToFile(
+        exampleFunction, path=self.path, maxBytes=3000)
+    for n in range(5): cachedFunction(100)
+    for n in range(5): cachedFunction(100 + n)
+    # cache hits do not write to the file until the statistics are needed
+    with contextlib.closing(sqlite3.connect(self.path)) as connection:
+      self.assertEqual(connection.execute(
+          "SELECT SUM(hits) FROM entries").fetchone()[0], 0)
+    statistics = helper.hpc.getCacheStatistics(path=self.path)
+    self.assertEqual(statistics["exampleFunction"]["hits"], 5)
+    self.assertEqual(statistics["exampleFunction"]["misses"], 5)
+    self.assertLessEqual(statistics["exampleFunction"]["size"], 3000)
+    self.assertLess(statistics["exampleFunction"]["entries"], 5)
+    # least recently used entries are evicted first
+    cachedFunction(104)
+    self.assertEqual(exampleFunction.numberOfCalls, 5)
+    cachedFunction(100)
+    self.assertEqual(exampleFunction.numberOfCalls, 6)
+    
+    cachedFunction = helper.hpc.cacheToFile(
+        exampleFunction, path=self.path, maxAge=0)
+    cachedFunction(104)
+    self.assertEqual(exampleFunction.numberOfCalls, 7)
+  
+  def testInvalidation(self):
+    cachedFunction = helper.hpc.cacheToFile(exampleFunction, path=self.path)
+    for n in range(3):
+      for factor in range(3): cachedFunction(n, factor=factor)
+    
+    self.assertEqual(helper.hpc.invalidateCache(
+        pattern="exampleFunction(n=1, *)", path=self.path), 3)
+    self.assertEqual(helper.hpc.invalidateCache(
+        "exampleFunction", arguments={"factor" : 2}, path=self.path), 2)
+    self.assertEqual(helper.hpc.invalidateCache(
+        "otherFunction", path=self.path), 0)
+    for n in range(3):
+      for factor in range(3): cachedFunction(n, factor=factor)
+    self.assertEqual(exampleFunction.numberOfCalls, 9 + 5)
+    
+    with helper.hpc.CacheFileIgnorer(path=self.path):
+      cachedFunction(0, factor=0)
+    self.assertEqual(exampleFunction.numberOfCalls, 9 + 5 + 1)
+    cachedFunction(0, factor=0)
+    self.assertEqual(exampleFunction.numberOfCalls, 9 + 5 + 1)
+    
+    cachedFunction(3, factor=np.arange(3))
+    self.assertEqual(helper.hpc.invalidateCache(
+        "exampleFunction", arguments={"factor" : np.arange(3)},
+        path=self.path), 1)
+  
+  def testLegacyCacheFileImport(self):
+    arguments = (("n", 3), ("factor", 2))
+    legacyCache = {"exampleFunction" : {arguments : "legacy"}}
+    with lzma.open(helper.hpc.getLegacyCachePath(self.path), "wb") as f:
+      pickle.dump(legacyCache, f)
+    
+    cachedFunction = helper.hpc.cacheToFile(exampleFunction, path=self.path)
+    self.assertEqual(cachedFunction(3), "legacy")
+    self.assertEqual(exampleFunction.numberOfCalls, 0)
+    statistics = helper.hpc.getCacheStatistics(path=self.path)
+    self.assertEqual(statistics["exampleFunction"]["hits"], 1)
+    self.assertEqual(statistics["exampleFunction"]["misses"], 0)
+  
+  def testRemotelyExecutor(self):
+    with helper.hpc.getRemotelyExecutor(
+        url=helper.hpc.LOCAL_REMOTELY_URL, fallback=False) as executor:
+      futures = [executor.submit(remoteFunction, x) for x in range(20)]
+      futures.append(executor.submit(remoteFunction, 3, factor=3))
+      futures.append(executor.submit(remoteFunction, -1))
+      for x in range(20): self.assertEqual(futures[x].result(), 2 * x)
+      self.assertEqual(futures[20].result(), 9)
+      with self.assertRaises(ValueError): futures[21].result()
+      self.assertAlmostEqual(
+          list(executor.map(remoteFunction, [1, 2], [3, 4])), [3, 8])
+    
+    remoteFunction2 = helper.hpc.executeRemotely(
+        remoteFunction, url=helper.hpc.LOCAL_REMOTELY_URL, fallback=False)
+    self.assertEqual(remoteFunction2(4, 3), 12)
+
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+
+import socket
+import unittest
+
+import numpy as np
+
+import helper.remotely
+import helper.remotely.remotely_transport
+import tests.misc
+
+def remoteFunction(X, factor=2):
+  import numpy as np
+  if np.any(X < 0): raise ValueError("Negative argument.")
+  return factor * np.sin(X)
+
+def sleepFunction(seconds):
+  import time
+  time.sleep(seconds)
+  return seconds
+
+class TestHelperRemotely(tests.misc.CustomTestCase):
+  def testBinaryTransport(self):
+    server = helper.remotely.create_local_remotely_server(
+        "key", max_workers=2, transport="binary")
+    port = server.server_address[1]
+    X = np.random.random((10000, 3))
+    
+    try:
+      for compression in [None, "zlib", "lzma"]:
+        with self.subTest(compression=compression):
+          function = helper.remotely.remotely(
+              "key", "127.0.0.1", port, transport="binary",
+              compression=compression)(remoteFunction)
+          self.assertAlmostEqual(function(X), 2 * np.sin(X))
+          self.assertAlmostEqual(function(X, factor=3), 3 * np.sin(X))
+          with self.assertRaises(ValueError): function(-X)
+          
+          with helper.remotely.RemotelyExecutor(
+                "key", "127.0.0.1", port, transport="binary",
+                compression=compression) as executor:
+            YY = list(executor.map(remoteFunction, [X, 2 * X], [1, 2]))
+          self.assertAlmostEqual(YY[0], np.sin(X))
+          self.assertAlmostEqual(YY[1], 2 * np.sin(2 * X))
+      
+      with self.assertRaises(helper.remotely.RemotelyException):
+        helper.remotely.remotely("wrongKey", "127.0.0.1", port,
+                                 transport="binary")(remoteFunction)(X)
+    finally:
+      server.shutdown()
+      server.server_close()
+  
+  def testKill(self):
+    for transport in ["xmlrpc", "binary"]:
+      with self.subTest(transport=transport):
+        server = helper.remotely.create_local_remotely_server(
+            "key", max_workers=1, transport=transport)
+        
+        try:
+          client = helper.remotely.RemoteClient(
+              "key", "127.0.0.1", server.server_address[1],
+              transport=transport)
+          pid1 = client.run(sleepFunction, 1)
+          # besides the running jobs, the pool dispatches up to one more job
+          # than it has workers
+          for _ in range(2): client.run(sleepFunction, 0)
+          pid3 = client.run(sleepFunction, 0)
+          while not server.get_job("key", pid1).running(): pass
+          # queued jobs are cancelled, running jobs cannot be killed
+          self.assertTrue(client.kill(pid3))
+          with self.assertRaises(helper.remotely.RemotelyException):
+            client.kill(pid1)
+          self.assertFalse(client.kill(pid3))
+          self.assertEqual(client.join(pid1), 1)
+        finally:
+          server.shutdown()
+          server.server_close()
+  
+  def testMessageRoundTrip(self):
+    message = {"X" : np.random.random((100, 5)),
+               "L" : np.arange(10, dtype=np.int32)[::2], "s" : "test"}
+    
+    for compression in [None, "zlib", "lzma"]:
+      with self.subTest(compression=compression):
+        sock1, sock2 = socket.socketpair()
+        
+        try:
+          helper.remotely.remotely_transport.send_message(
+              sock1, message, compression)
+          message2 = helper.remotely.remotely_transport.receive_message(
+              sock2)
+        finally:
+          sock1.close()
+          sock2.close()
+        
+        self.assertEqual(message2["s"], message["s"])
+        self.assertAlmostEqual(message2["X"], message["X"])
+        self.assertAlmostEqual(message2["L"], message["L"])
+        self.assertEqual(message2["L"].dtype, np.int32)
+        self.assertTrue(message2["X"].flags.writeable)
+  
+  def testMessageLimits(self):
+    transport = helper.remotely.remotely_transport
+    message = [np.zeros((1000,)), np.zeros((10,))]
+    
+    for compression in [None, "zlib", "lzma"]:
+      for maxFrames, maxFrameSize in [(2, 100), (3, 7999)]:
+        with self.subTest(compression=compression, maxFrames=maxFrames,
+                          maxFrameSize=maxFrameSize):
+          sock1, sock2 = socket.socketpair()
+          
+          try:
+            transport.send_message(sock1, message, compression)
+            with self.assertRaises(ConnectionError):
+              transport.receive_message(sock2, max_frames=maxFrames,
+                                        max_frame_size=maxFrameSize)
+          finally:
+            sock1.close()
+            sock2.close()
+    
+    # frames that decompress to more than announced are rejected
+    sock1, sock2 = socket.socketpair()
+    
+    try:
+      data = transport.compress(bytes(1000), "zlib")
+      sock1.sendall(transport.HEADER.pack(
+          transport.MAGIC, transport.COMPRESSIONS["zlib"], 1))
+      sock1.sendall(transport.FRAME_HEADER.pack(len(data), 10) + data)
+      with self.assertRaises(ConnectionError):
+        transport.receive_message(sock2)
+    finally:
+      sock1.close()
+      sock2.close()
+
+
+
+if __name__ == "__main__":
+  unittest.main()
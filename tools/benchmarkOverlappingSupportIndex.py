@@ -0,0 +1,133 @@
+"""
+Benchmark of the search for intersections of grid points with negative
+surpluses, which is the first step of the computation of the candidate
+set in IntersectionCandidates and the other intersection search
+strategies. The pairwise comparison of all the grid points is compared
+with the search via the OverlappingSupportIndex on regular sparse grids
+interpolating narrow Gaussian mixtures.
+
+usage: python2 tools/benchmarkOverlappingSupportIndex.py [options]
+(requires pysgpp with the datadriven extensions on the Python path)
+"""
+from optparse import OptionParser
+from itertools import product
+import time
+
+import numpy as np
+
+from pysgpp.extensions.datadriven.uq.operations.sparse_grid import \
+    haveOverlappingSupportByLevelIndex, haveHierarchicalRelationshipByLevelIndex
+from pysgpp.extensions.datadriven.uq.operations.forcePositivity.overlappingSupportIndex import \
+    OverlappingSupportIndex
+
+
+def getRegularSparseGrid(numDims, level):
+    """
+    Enumerate the inner grid points of a regular sparse grid
+    @param numDims: int, number of dimensions
+    @param level: int, level of the sparse grid
+    @return: numpy arrays (levels, indices) of shape (n, numDims)
+    """
+    levels, indices = [], []
+    for levelVector in product(range(1, level + 1), repeat=numDims):
+        if sum(levelVector) > level + numDims - 1:
+            continue
+        for indexVector in product(*[range(1, 2 ** l, 2) for l in levelVector]):
+            levels.append(levelVector)
+            indices.append(indexVector)
+    return np.array(levels, dtype='int64'), np.array(indices, dtype='int64')
+
+
+def gaussianMixture(x, means, sigma):
+    """
+    Unnormalized mixture of isotropic Gaussians
+    @param x: numpy array of shape (n, numDims)
+    @param means: numpy array of shape (m, numDims)
+    @param sigma: float, standard deviation
+    @return: numpy array of length n
+    """
+    ans = np.zeros(x.shape[0])
+    for mean in means:
+        ans += np.exp(-np.sum((x - mean) ** 2, axis=1) / (2 * sigma ** 2))
+    return ans
+
+
+def computeSurpluses(levels, indices, f):
+    """
+    Compute the hierarchical surpluses of the piecewise linear interpolant
+    of f by applying the stencil [-1/2, 1, -1/2] in every dimension
+    @param levels: numpy array of shape (n, numDims)
+    @param indices: numpy array of shape (n, numDims)
+    @param f: function evaluating a numpy array of shape (n, numDims)
+    @return: numpy array of length n
+    """
+    h = 2.0 ** -levels
+    x = indices * h
+    alpha = np.zeros(levels.shape[0])
+    for shifts in product([-1, 0, 1], repeat=levels.shape[1]):
+        shifts = np.array(shifts)
+        weight = np.prod(np.where(shifts == 0, 1.0, -0.5))
+        alpha += weight * f(x + shifts * h)
+    return alpha
+
+
+def findIntersectingPairsPairwise(gps):
+    ans = []
+    for i, gpi in enumerate(gps):
+        for j in xrange(i + 1, len(gps)):
+            gpj = gps[j]
+            if haveOverlappingSupportByLevelIndex(gpi, gpj) and \
+                    not haveHierarchicalRelationshipByLevelIndex(gpi, gpj):
+                ans.append((i, j))
+    return ans
+
+
+def findIntersectingPairsIndexed(gps, numDims):
+    ans = []
+    supportIndex = OverlappingSupportIndex.fromLevelIndex(gps, numDims)
+    for i, gpi in enumerate(gps):
+        js = supportIndex.getOverlapping(*gpi, excludeRelatives=True)
+        ans += [(i, j) for j in js[js > i]]
+    return ans
+
+
+def run(numDims, level, numPeaks, sigma, seed=1234):
+    levels, indices = getRegularSparseGrid(numDims, level)
+    means = np.random.RandomState(seed).uniform(0.2, 0.8, (numPeaks, numDims))
+    alpha = computeSurpluses(levels, indices,
+                             lambda x: gaussianMixture(x, means, sigma))
+
+    gps = [(tuple(levels[i]), tuple(indices[i]))
+           for i in np.where(alpha < -1e-14)[0]]
+
+    start = time.time()
+    expected = findIntersectingPairsPairwise(gps)
+    timePairwise = time.time() - start
+
+    start = time.time()
+    actual = findIntersectingPairsIndexed(gps, numDims)
+    timeIndexed = time.time() - start
+
+    assert sorted(actual) == sorted(expected)
+
+    print "d = %i, l = %i: %6i grid points, %6i negative, %8i intersections: " \
+        "pairwise = %8.3fs, indexed = %8.3fs, speedup = %6.1f" % \
+        (numDims, level, len(alpha), len(gps), len(expected),
+         timePairwise, timeIndexed, timePairwise / max(timeIndexed, 1e-12))
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-d", "--dims", action="store", type="string", default="2,3,4",
+                      dest="dims", help="Comma separated list of dimensions")
+    parser.add_option("-l", "--levels", action="store", type="string", default="4,5,6,7",
+                      dest="levels", help="Comma separated list of sparse grid levels")
+    parser.add_option("-p", "--peaks", action="store", type="int", default=3,
+                      dest="peaks", help="Number of Gaussians in the mixture")
+    parser.add_option("-s", "--sigma", action="store", type="float", default=0.05,
+                      dest="sigma", help="Standard deviation of the Gaussians")
+    (options, args) = parser.parse_args()
+
+    for numDims in [int(d) for d in options.dims.split(",")]:
+        for level in [int(l) for l in options.levels.split(",")]:
+            run(numDims, level, options.peaks, options.sigma)
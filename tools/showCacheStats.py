@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+
+import argparse
+import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "..", "py"))
+import helper.hpc
+
+
+
+def formatSize(size):
+  for unit in ["B", "KiB", "MiB", "GiB"]:
+    if size < 1024: break
+    size /= 1024
+  return ("{:.0f} {}" if unit == "B" else "{:.1f} {}").format(size, unit)
+
+def formatTime(seconds):
+  return str(datetime.timedelta(seconds=round(seconds)))
+
+def formatDate(timestamp):
+  return datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+
+def printFunctions(statistics):
+  print("{:<40} {:>8} {:>11} {:>8} {:>8} {:>11} {:>11}".format(
+      "function", "entries", "size", "hits", "misses", "compute", "saved"))
+  
+  for funcName, x in sorted(statistics.items(),
+                            key=lambda x: -x[1]["size"]):
+    print("{:<40} {:>8} {:>11} {:>8} {:>8} {:>11} {:>11}".format(
+        funcName, x["entries"], formatSize(x["size"]), x["hits"],
+        x["misses"], formatTime(x["computeTime"]),
+        formatTime(x["savedTime"])))
+
+def printEntries(entries, sortKey, numberOfEntries):
+  entries = sorted(entries, key=lambda x: -x[sortKey])
+  if numberOfEntries is not None: entries = entries[:numberOfEntries]
+  print("{:>11} {:>11} {:>6} {:>16}  {}".format(
+      "size", "compute", "hits", "last access", "call"))
+  
+  for x in entries:
+    print("{:>11} {:>11} {:>6} {:>16}  {}".format(
+        formatSize(x["size"]), formatTime(x["computeTime"]), x["hits"],
+        formatDate(x["lastAccess"]), x["callString"]))
+
+
+
+def main():
+  parser = argparse.ArgumentParser(
+    description="Shows statistics of cache files of helper.hpc.cacheToFile")
+  parser.add_argument("path", metavar="PATH",
+                      help="path to the *.cache.sqlite file")
+  parser.add_argument("--function", metavar="NAME",
+                      help="only show entries of this function")
+  parser.add_argument("--sort", choices=["size", "cost", "hits", "age"],
+                      default="size",
+                      help="sort entries by size, recompute cost, "
+                           "number of hits, or last access")
+  parser.add_argument("--number", metavar="N", type=int, default=50,
+                      help="number of entries to show")
+  parser.add_argument("--invalidate", metavar="PATTERN",
+                      help="delete entries whose call strings match this "
+                           "shell-style wildcard pattern "
+                           "(e.g., \"optimizeFuzzy(*seed=3)\")")
+  args = parser.parse_args()
+  
+  if not os.path.isfile(args.path):
+    raise ValueError("Cache file {} does not exist.".format(args.path))
+  
+  cache = helper.hpc.CacheStore(args.path)
+  
+  if args.invalidate is not None:
+    numberOfEntries = cache.invalidate(funcName=args.function,
+                                       pattern=args.invalidate)
+    print("Invalidated {} entries.".format(numberOfEntries))
+    print("")
+  
+  printFunctions(cache.getStatistics())
+  print("")
+  sortKey = {"size" : "size", "cost" : "computeTime", "hits" : "hits",
+             "age" : "lastAccess"}[args.sort]
+  printEntries(cache.getEntries(funcName=args.function), sortKey,
+               args.number)
+  cache.close()
+
+
+
+if __name__ == "__main__":
+  main()